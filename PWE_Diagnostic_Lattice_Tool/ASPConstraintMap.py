@@ -1,7 +1,5 @@
 from .ConstraintMap import ConstraintMap
 from .LogicProgram import LogicProgram
-from PW_explorer.run_clingo import run_clingo
-from PW_explorer.load_worlds import load_worlds
 from .LatticeNode import (
     Node,
     NodeEvalState,
@@ -15,19 +13,47 @@ class ASPConstraintMap(ConstraintMap):
 
     COMP_COUNT_RULE = "on_comp(N) :- #count {P : comp(P)} = N."
     COMP_MAXIMIZE_RULE = "#maximize {N : on_comp(N)}."
+    COMP_MINIMIZE_RULE = "#minimize {N : on_comp(N)}."
 
     def __init__(self, constraints):
         ConstraintMap.__init__(self, constraints)
         self.constraints_set = set(constraints)
         self.encoding = ""
+        self.blocked_down = []
+        self.blocked_up = []
+        self.strictly_blocked_down = []
+        self.strictly_blocked_up = []
+        self.unknown_blocks = {}
         self.reset_explored_set()
 
     def reset_explored_set(self):
         self.encoding = "\n".join(["comp({0}) ; not comp({0}).".format(c) for c in self.constraints])
+        self.blocked_down = []
+        self.blocked_up = []
+        self.strictly_blocked_down = []
+        self.strictly_blocked_up = []
+        self.unknown_blocks = {}
 
-    def get_unexplored(self):
-        map_soln, _ = run_clingo(self.encoding, num_solutions=1)
-        pw_rel_dfs, rel_schemas, pws = load_worlds(map_soln, silent=True)
+    def _get_map_encoding_(self):
+        return "\n".join([self.encoding] + list(self.unknown_blocks.values()))
+
+    @staticmethod
+    def _run_map_encoding_(encoding, num_solutions):
+        # Imported here, so that importing the map doesn't pull in PW_explorer (and pandas)
+        from PW_explorer.run_clingo import run_clingo
+        from PW_explorer.load_worlds import load_worlds
+
+        map_soln, _ = run_clingo(encoding, num_solutions=num_solutions)
+        return load_worlds(map_soln, silent=True)
+
+    def get_unexplored(self, rng=None):
+        """
+        :param rng: (Optional) random.Random. The map's solver always finds the same node first, so w/ an rng the seed
+                    is the closest unexplored node to a random one instead (see get_unexplored_closest)
+        """
+        if rng is not None:
+            return self.get_unexplored_closest([c for c in self.constraints if rng.random() < 0.5])
+        pw_rel_dfs, rel_schemas, pws = self._run_map_encoding_(self._get_map_encoding_(), num_solutions=1)
         if len(pws) == 0:
             return None
         if 'comp_1' not in pw_rel_dfs:
@@ -38,9 +64,8 @@ class ASPConstraintMap(ConstraintMap):
         return comps
 
     def get_unexplored_max(self):
-        map_soln, _ = run_clingo(self.encoding + '\n' + self.COMP_COUNT_RULE + '\n' + self.COMP_MAXIMIZE_RULE,
-                                 num_solutions=0)
-        pw_rel_dfs, rel_schemas, pws = load_worlds(map_soln, silent=True)
+        pw_rel_dfs, rel_schemas, pws = self._run_map_encoding_(self._get_map_encoding_() + '\n' + self.COMP_COUNT_RULE +
+                                                               '\n' + self.COMP_MAXIMIZE_RULE, num_solutions=0)
         if len(pws) == 0:
             return None
         if 'comp_1' not in pw_rel_dfs:
@@ -52,14 +77,131 @@ class ASPConstraintMap(ConstraintMap):
         comps = set(list(comp_1_dfs['x1']))
         return comps
 
-    def block_down(self, n):
-        self.encoding += '\n' + " ; ".join(["comp({})".format(c) for c in (self.constraints_set - set(n))]) + "."
+    def get_unexplored_min(self, required=None):
+        """
+        :param required: (Optional) Constraints the seed must contain
+        """
+        required_rules = [":- not comp({}).".format(c) for c in (required if required is not None else [])]
+        encoding = "\n".join([self._get_map_encoding_(), self.COMP_COUNT_RULE, self.COMP_MINIMIZE_RULE] +
+                             required_rules)
+        pw_rel_dfs, rel_schemas, pws = self._run_map_encoding_(encoding, num_solutions=0)
+        if len(pws) == 0:
+            return None
+        if 'comp_1' not in pw_rel_dfs:
+            return set([])
+        min_pw = min(pws, key=lambda pw: pw.pw_soln)
+        comp_1_dfs = pw_rel_dfs['comp_1']
+        comp_1_dfs = comp_1_dfs[comp_1_dfs['pw'] == min_pw.pw_id]
+        comps = set(list(comp_1_dfs['x1']))
+        return comps
+
+    def get_unexplored_closest(self, target):
+        """
+        :param target: Constraints to find the closest unexplored node to, i.e. the one w/ the fewest constraints added
+                       to or removed from target
+        """
+        target = set(target)
+        distance_rules = [":~ {}comp({}). [1,{}]".format('not ' if c in target else '', c, c) for c in self.constraints]
+        pw_rel_dfs, rel_schemas, pws = self._run_map_encoding_("\n".join([self._get_map_encoding_()] + distance_rules),
+                                                               num_solutions=0)
+        if len(pws) == 0:
+            return None
+        if 'comp_1' not in pw_rel_dfs:
+            return set([])
+        min_pw = min(pws, key=lambda pw: pw.pw_soln)
+        comp_1_dfs = pw_rel_dfs['comp_1']
+        comp_1_dfs = comp_1_dfs[comp_1_dfs['pw'] == min_pw.pw_id]
+        comps = set(list(comp_1_dfs['x1']))
+        return comps
 
-    def block_up(self, n):
-        self.encoding += '\n' + " ; ".join(["not comp({})".format(c) for c in set(n)]) + "."
+    def block_down(self, n, strict=False):
+        """
+        :param strict: Only block the proper ancestors, i.e. leave the node itself as is.
+        """
+        if strict:
+            # No constraint outside n, and not all of n
+            outside = " ".join(["not comp({}),".format(c) for c in (self.constraints_set - set(n))])
+            self.encoding += "".join(['\n:- {} not comp({}).'.format(outside, c) for c in set(n)])
+            self.strictly_blocked_down.append(frozenset(n))
+            return
+        outside = self.constraints_set - set(n)
+        # Blocking down from the top node blocks the whole lattice, an empty disjunction isn't valid ASP though
+        self.encoding += '\n' + (" ; ".join(["comp({})".format(c) for c in outside]) + "." if outside else ":- #true.")
+        self.blocked_down.append(frozenset(n))
+
+    def block_up(self, n, strict=False):
+        """
+        :param strict: Only block the proper descendants, i.e. leave the node itself as is.
+        """
+        if strict:
+            # All of n, and some constraint outside n
+            inside = " ".join(["comp({}),".format(c) for c in set(n)])
+            self.encoding += "".join(['\n:- {} comp({}).'.format(inside, c) for c in (self.constraints_set - set(n))])
+            self.strictly_blocked_up.append(frozenset(n))
+            return
+        self.encoding += '\n' + (" ; ".join(["not comp({})".format(c) for c in set(n)]) + "." if n else ":- #true.")
+        self.blocked_up.append(frozenset(n))
+
+    def _is_explored_(self, n):
+        return any(n <= b for b in self.blocked_down) or any(n >= b for b in self.blocked_up) or \
+            any(n < b for b in self.strictly_blocked_down) or any(n > b for b in self.strictly_blocked_up)
 
     def update_num_pws(self, constraints, num_pws, num_pws_eval_type: NumPWSType):
-        self.nodes[frozenset(constraints)].update_num_pws(num_pws=num_pws, num_pws_eval_type=num_pws_eval_type)
+        n = frozenset(constraints)
+        self.nodes[n].update_num_pws(num_pws=num_pws, num_pws_eval_type=num_pws_eval_type)
+        if num_pws_eval_type != NumPWSType.unevaluated:
+            self.unknown_set.discard(n)
+
+    def mark_unknown(self, constraints):
+        """
+        Record that evaluating this node hit the solver limits (or, for an evaluated node, that its status w.r.t. its
+        neighbours couldn't be confirmed).
+        """
+        n = frozenset(constraints)
+        if self.nodes[n].eval_state != NodeEvalState.evaluated:
+            self.nodes[n].update_eval_state(NodeEvalState.unknown)
+        self.unknown_set.add(n)
+
+    def is_unknown(self, constraints):
+        return frozenset(constraints) in self.unknown_set
+
+    def has_unknown_children(self, constraints):
+        n = frozenset(constraints)
+        return any(n.union({c}) in self.unknown_set for c in self.constraints_set - n)
+
+    def has_unknown_parents(self, constraints):
+        n = frozenset(constraints)
+        return any(n.difference({c}) in self.unknown_set for c in n)
+
+    def block_unknown(self, constraints):
+        """
+        Tentatively block a node whose evaluation hit the solver limits, i.e. only this node is excluded from the
+        unexplored nodes, until it is reopened with reopen_unknown.
+        """
+        n = frozenset(constraints)
+        self.mark_unknown(n)
+        literals = ["comp({})".format(c) for c in n] + ["not comp({})".format(c) for c in self.constraints_set - n]
+        self.unknown_blocks[n] = ":- {}.".format(", ".join(literals) if len(literals) > 0 else "#true")
+
+    def reopen_unknown(self):
+        """
+        Forget the nodes that hit the solver limits so they get evaluated again. The ones that haven't been explored
+        (blocked) since become unexplored again.
+        :return: List of frozensets, the reopened nodes
+        """
+        for n in self.unknown_set:
+            if self.nodes[n].eval_state == NodeEvalState.unknown:
+                self.nodes[n].update_eval_state(NodeEvalState.unevaluated)
+        reopened = [n for n in self.unknown_set if not self._is_explored_(n)]
+        self.unknown_set = set([])
+        self.unknown_blocks = {}
+        return reopened
+
+    def get_unknown(self):
+        """
+        :return: The nodes that hit the solver limits and haven't been explored (blocked) since
+        """
+        return [set(n) for n in self.unknown_set if not self._is_explored_(n)]
 
     def check_node_num_pws(self, constraints):
 
@@ -204,17 +346,32 @@ class ASPConstraintMap(ConstraintMap):
             return k
         return self._check_node_ambiguity_implicit_(constraints)
 
+    def record_extremal(self, kind, constraints):
+        """
+        Record a confirmed MSS/MUS/MAS/MUAS (kind), the way grow/shrink/grow_ambiguous/shrink_unambiguous do.
+        :param kind: 'MSS', 'MUS', 'MAS' or 'MUAS'
+        :param constraints: Constraint set
+        """
+        getattr(self, self.EXTREMAL_SETS[kind]).add(frozenset(constraints))
+
     def grow(self, seed, cnf_prog: LogicProgram, update_map_with_mss=True, update_map_with_intermediate_results=True):
         seed = set(seed)
         iter_set = self.constraints_set - seed
+        skipped = []  # Candidates that couldn't be evaluated within the solver limits
         for c in list(iter_set):
             seed_ = seed.union({c})
             memoized_result = self._check_node_sat_explicit_(seed_)
             if memoized_result is not None:
                 if memoized_result is True:
                     seed.add(c)
+            elif self.is_unknown(seed_):
+                skipped.append(c)
             else:  # memoized_result is None:
                 sat_check = cnf_prog.check_sat(seed_)
+                if sat_check is None:  # Hit the solver limits
+                    self.mark_unknown(seed_)
+                    skipped.append(c)
+                    continue
                 if sat_check:
                     seed.add(c)
                 if update_map_with_intermediate_results:
@@ -223,22 +380,36 @@ class ASPConstraintMap(ConstraintMap):
                     else:  # if sat_check is False:
                         self.update_num_pws(seed_, num_pws=0, num_pws_eval_type=NumPWSType.exact)
 
-        if update_map_with_mss:
-            self.maximal_satisfiable_constraint_subsets.add(frozenset(seed))
+        unresolved = [c for c in skipped if self._check_node_sat_explicit_(seed.union({c})) is not False]
+        if len(unresolved) > 0:
+            # Can't tell if seed is maximal until its unresolved children are evaluated
+            for c in unresolved:
+                self.mark_unknown(seed.union({c}))
+            if self._check_node_sat_explicit_(seed) is None:
+                self.update_num_pws(seed, num_pws=1, num_pws_eval_type=NumPWSType.atleast)
+        elif update_map_with_mss:
+            self.record_extremal('MSS', seed)
 
         return seed
 
     def shrink(self, seed, cnf_prog: LogicProgram, update_map_with_mus=True, update_map_with_intermediate_results=True):
         seed = set(seed)
         iter_set = seed.copy()
+        skipped = []  # Candidates that couldn't be evaluated within the solver limits
         for c in iter_set:
             seed_ = seed.difference({c})
             memoized_result = self._check_node_sat_explicit_(seed_)
             if memoized_result is not None:
                 if memoized_result is False:
                     seed.remove(c)
+            elif self.is_unknown(seed_):
+                skipped.append(c)
             else:  # memoized_result is None
                 sat_check = cnf_prog.check_sat(seed_)
+                if sat_check is None:  # Hit the solver limits
+                    self.mark_unknown(seed_)
+                    skipped.append(c)
+                    continue
                 if not sat_check:
                     seed.remove(c)
                 if update_map_with_intermediate_results:
@@ -247,8 +418,15 @@ class ASPConstraintMap(ConstraintMap):
                     else:  # if sat_check is False:
                         self.update_num_pws(seed_, num_pws=0, num_pws_eval_type=NumPWSType.exact)
 
-        if update_map_with_mus:
-            self.minimal_unsatisfiable_constraint_subsets.add(frozenset(seed))
+        unresolved = [c for c in skipped if self._check_node_sat_explicit_(seed.difference({c})) is not True]
+        if len(unresolved) > 0:
+            # Can't tell if seed is minimal until its unresolved parents are evaluated
+            for c in unresolved:
+                self.mark_unknown(seed.difference({c}))
+            if self._check_node_sat_explicit_(seed) is None:
+                self.update_num_pws(seed, num_pws=0, num_pws_eval_type=NumPWSType.exact)
+        elif update_map_with_mus:
+            self.record_extremal('MUS', seed)
 
         return seed
 
@@ -256,14 +434,21 @@ class ASPConstraintMap(ConstraintMap):
                        update_map_with_intermediate_results=True):
         seed = set(seed)
         iter_set = self.constraints_set - seed
+        skipped = []  # Candidates that couldn't be evaluated within the solver limits
         for c in list(iter_set):
             seed_ = seed.union({c})
             memoized_result = self._check_node_ambiguity_explicit_(seed_)
             if memoized_result is not None:
                 if memoized_result == NodeAmbiguityType.ambiguous:
                     seed.add(c)
+            elif self.is_unknown(seed_):
+                skipped.append(c)
             else:  # memoized_result is None
                 amb_check = cnf_prog.check_ambiguity(seed_)
+                if amb_check is None:  # Hit the solver limits
+                    self.mark_unknown(seed_)
+                    skipped.append(c)
+                    continue
                 if amb_check == NodeAmbiguityType.ambiguous:
                     seed.add(c)
                 if update_map_with_intermediate_results:
@@ -274,22 +459,37 @@ class ASPConstraintMap(ConstraintMap):
                     elif amb_check == NodeAmbiguityType.unsat:
                         self.update_num_pws(seed_, num_pws=0, num_pws_eval_type=NumPWSType.exact)
 
-        if update_map_with_mas:
-            self.maximal_ambiguous_constraint_subsets.add(frozenset(seed))
+        unresolved = [c for c in skipped if self._check_node_ambiguity_explicit_(seed.union({c})) not in
+                      [NodeAmbiguityType.unambiguous, NodeAmbiguityType.unsat]]
+        if len(unresolved) > 0:
+            # Can't tell if seed is maximal until its unresolved children are evaluated
+            for c in unresolved:
+                self.mark_unknown(seed.union({c}))
+            if self._check_node_ambiguity_explicit_(seed) is None:
+                self.update_num_pws(seed, num_pws=2, num_pws_eval_type=NumPWSType.atleast)
+        elif update_map_with_mas:
+            self.record_extremal('MAS', seed)
         return seed
 
     def shrink_unambiguous(self, seed, cnf_prog: LogicProgram, update_map_with_muas=True,
                            update_map_with_intermediate_results=True):
         seed = set(seed)
         iter_set = seed.copy()
+        skipped = []  # Candidates that couldn't be evaluated within the solver limits
         for c in iter_set:
             seed_ = seed.difference({c})
             memoized_result = self._check_node_ambiguity_explicit_(seed_)
             if memoized_result is not None:
                 if memoized_result == NodeAmbiguityType.unambiguous:
                     seed.remove(c)
+            elif self.is_unknown(seed_):
+                skipped.append(c)
             else:  # memoized_result is None
                 amb_check = cnf_prog.check_ambiguity(seed_)
+                if amb_check is None:  # Hit the solver limits
+                    self.mark_unknown(seed_)
+                    skipped.append(c)
+                    continue
                 if amb_check == NodeAmbiguityType.unambiguous:
                     seed.remove(c)
                 if update_map_with_intermediate_results:
@@ -300,6 +500,14 @@ class ASPConstraintMap(ConstraintMap):
                     elif amb_check == NodeAmbiguityType.unsat:
                         self.update_num_pws(seed_, num_pws=0, num_pws_eval_type=NumPWSType.exact)
 
-        if update_map_with_muas:
-            self.minimal_unambiguous_constraint_subsets.add(frozenset(seed))
+        unresolved = [c for c in skipped
+                      if self._check_node_ambiguity_explicit_(seed.difference({c})) != NodeAmbiguityType.ambiguous]
+        if len(unresolved) > 0:
+            # Can't tell if seed is minimal until its unresolved parents are evaluated
+            for c in unresolved:
+                self.mark_unknown(seed.difference({c}))
+            if self._check_node_ambiguity_explicit_(seed) is None:
+                self.update_num_pws(seed, num_pws=1, num_pws_eval_type=NumPWSType.exact)
+        elif update_map_with_muas:
+            self.record_extremal('MUAS', seed)
         return seed
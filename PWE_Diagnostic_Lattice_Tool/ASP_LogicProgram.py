@@ -1,24 +1,111 @@
 from .LogicProgram import LogicProgram
-from PW_explorer.run_clingo import run_clingo
-from PW_explorer.run_dlv import run_dlv
-from PW_explorer.load_worlds import load_worlds
-from .LatticeNode import NodeAmbiguityType
+from .LatticeNode import NodeAmbiguityType, NumPWSType
+import itertools
 
 
 class ASP_LogicProgram(LogicProgram):
 
-    def __init__(self, initial_encoding: str, constraint_keyword: str='comp', reasoner: str='clingo'):
+    def __init__(self, initial_encoding: str, constraint_keyword: str='comp', reasoner: str='clingo',
+                 constraints: list=None, projection: list=None):
         """
         :param initial_encoding: Encoding w/o any of the constraints turned on.
         :param constraint_keyword: The arity 1 relation name to use to turn constraints on.
         :param reasoner: Reasoner to use. Choices: 'clingo' (default) or 'dlv'.
+        :param constraints: (Optional) All the constraints that will be switched on/off. Only used to pre-declare
+                            the activation atoms when the clingo python module is available.
+        :param projection: (Optional) Relations to project the solutions onto, as 'name/arity' strings or
+                           (name, arity) tuples. Solutions that only differ outside these relations are counted once,
+                           both for the ambiguity checks and for counting the solutions.
         """
         LogicProgram.__init__(self)
         self.encoding = initial_encoding
         self.constraint_keyword = constraint_keyword
         self.reasoner = reasoner
+        self.constraints = list(constraints) if constraints is not None else []
+        self.projection = None
+        if projection is not None:
+            self.projection = [tuple(p.split('/')) if isinstance(p, str) else tuple(p) for p in projection]
+            self.projection = [(name.strip(), int(arity)) for name, arity in self.projection]
+        self._control = None
+        self._control_constraints = frozenset([])
+        self._activation_symbols = {}
+
+    def set_limits(self, timeout: float=None, conflict_limit: int=None):
+        LogicProgram.set_limits(self, timeout=timeout, conflict_limit=conflict_limit)
+        if ((timeout is not None) or (conflict_limit is not None)) and (not self.use_clingo_api()):
+            print("Solver limits need the clingo python module (and the clingo reasoner), they will be ignored.")
+
+    @staticmethod
+    def _import_clingo_():
+        try:
+            import clingo
+        except ImportError:
+            return None
+        return clingo
+
+    def use_clingo_api(self) -> bool:
+        """
+        Whether queries are answered in-process using the clingo python module (one grounding, re-used across
+        queries), instead of running the reasoner from scratch for every query.
+        """
+        return (self.reasoner == 'clingo') and (self._import_clingo_() is not None)
+
+    def _get_control_(self, constraints):
+        """
+        Get a grounded clingo Control that declares an external activation atom for every constraint in constraints
+        (and every constraint seen so far). The Control is re-used as long as no new constraint shows up.
+        """
+        needed = self._control_constraints.union(constraints).union(self.constraints)
+        if (self._control is None) or (needed != self._control_constraints):
+            clingo = self._import_clingo_()
+            ctl = clingo.Control(['--warn=none'] + (['--project'] if self.projection is not None else []))
+            externals = "\n".join(["#external {}({}).".format(self.constraint_keyword, c)
+                                   for c in sorted(needed, key=str)])
+            ctl.add("base", [], "\n".join([self.encoding, externals, self._get_projection_directives_()]))
+            ctl.ground([("base", [])])
+            self._control = ctl
+            self._control_constraints = frozenset(needed)
+            self._activation_symbols = {c: clingo.parse_term("{}({})".format(self.constraint_keyword, c))
+                                        for c in needed}
+        return self._control
+
+    def _get_projection_directives_(self, extra_relations: list=()):
+        if self.projection is None:
+            return ""
+        return "\n".join(["#project {}/{}.".format(name, arity) for name, arity in list(extra_relations) +
+                          self.projection])
+
+    def _solve_(self, constraints, num_pws: int):
+        """
+        Count the answer sets (upto num_pws, 0 --> all) with exactly the given constraints turned on, using the
+        shared clingo Control. The answer sets are only counted as they stream in, never stored.
+        The search is cut short if it runs into self.timeout or self.conflict_limit.
+        :return: (number of answer sets found, whether the search space was exhausted)
+        """
+        constraints = set(constraints)
+        ctl = self._get_control_(constraints)
+        for c, sym in self._activation_symbols.items():
+            ctl.assign_external(sym, c in constraints)
+        ctl.configuration.solve.models = str(num_pws)
+        ctl.configuration.solve.solve_limit = str(self.conflict_limit) if self.conflict_limit is not None \
+            else 'umax,umax'
+
+        num_models = [0]
+
+        def on_model(_):
+            num_models[0] += 1
+
+        with ctl.solve(on_model=on_model, async_=True) as handle:
+            if (self.timeout is not None) and (not handle.wait(self.timeout)):
+                handle.cancel()
+            solve_result = handle.get()
+        return num_models[0], solve_result.exhausted
 
     def run_reasoner(self, constraints: list, num_pws: int):
+        # PW_explorer (and pandas through it) is only needed when the reasoner is run out of process
+        from PW_explorer.run_clingo import run_clingo
+        from PW_explorer.run_dlv import run_dlv
+        from PW_explorer.load_worlds import load_worlds
 
         run_reasoner_func = {'clingo': run_clingo,
                              'dlv': run_dlv,
@@ -28,15 +115,72 @@ class ASP_LogicProgram(LogicProgram):
         pw_rel_dfs, rel_schemas, pws = load_worlds(map_soln, silent=True)
         return pw_rel_dfs, rel_schemas, pws
 
-    def get_num_solutions(self, constraints: list):
-        _, _, pws = self.run_reasoner(constraints=constraints, num_pws=0)
+    def _count_projected_pws_(self, constraints, num_pws: int) -> int:
+        """
+        Count the distinct projections of the solutions (upto num_pws, 0 --> all) when the reasoner can't project
+        by itself. All the solutions have to be loaded for this.
+        """
+        pw_rel_dfs, _, pws = self.run_reasoner(constraints, num_pws=0)
+        projections = set([])
+        for pw in pws:
+            projection = []
+            for name, arity in self.projection:
+                rel_name = '{}_{}'.format(name, arity)
+                if rel_name in pw_rel_dfs:
+                    rel_df = pw_rel_dfs[rel_name]
+                    rel_df = rel_df[rel_df['pw'] == pw.pw_id].drop(columns='pw')
+                    projection.append(frozenset(rel_df.itertuples(index=False, name=None)))
+            projections.add(tuple(projection))
+            if (num_pws > 0) and (len(projections) >= num_pws):
+                break
+        return len(projections)
+
+    def _count_pws_(self, constraints, num_pws: int):
+        """
+        :return: The number of solutions (upto num_pws, 0 --> all), or None if the solver limits were hit first
+        """
+        if self.use_clingo_api():
+            found, exhausted = self._solve_(constraints, num_pws=num_pws)
+            if (not exhausted) and ((num_pws <= 0) or (found < num_pws)):
+                return None
+            return found
+        if self.projection is not None:
+            return self._count_projected_pws_(constraints, num_pws=num_pws)
+        _, _, pws = self.run_reasoner(constraints, num_pws=num_pws)
         return len(pws)
 
-    def check_sat(self, constraints):
+    def count_solutions(self, constraints, max_count: int=0) -> tuple:
+        """
+        Count the solutions without materialising them (with the clingo python module), stopping at max_count.
+        :param constraints: Constraints to turn on
+        :param max_count: Stop counting after these many solutions (0 --> count all)
+        :return: (num_pws, NumPWSType.exact) or (max_count, NumPWSType.atleast) if the cap was hit
+        """
+        if self.use_clingo_api():
+            # Ask for one extra solution to tell if the cap was hit
+            num_pws, exhausted = self._solve_(constraints, num_pws=(max_count + 1) if max_count > 0 else 0)
+            if (max_count > 0) and (num_pws > max_count):
+                return max_count, NumPWSType.atleast
+            if exhausted:
+                return num_pws, NumPWSType.exact
+            # Hit the solver limits
+            return (num_pws, NumPWSType.atleast) if num_pws > 0 else (-1, NumPWSType.unevaluated)
+
+        # Ask for one extra solution to tell if the cap was hit
+        num_pws = self._count_pws_(constraints, num_pws=(max_count + 1) if max_count > 0 else 0)
+        if (max_count > 0) and (num_pws > max_count):
+            return max_count, NumPWSType.atleast
+        return num_pws, NumPWSType.exact
 
-        _, _, pws = self.run_reasoner(constraints, num_pws=1)
+    def get_num_solutions(self, constraints: list):
+        return self.count_solutions(constraints)[0]
+
+    def check_sat(self, constraints):
 
-        return len(pws) >= 1
+        num_pws = self._count_pws_(constraints, num_pws=1)
+        if num_pws is None:  # Hit the solver limits
+            return None
+        return num_pws >= 1
 
     def check_ambiguity(self, constraints) -> NodeAmbiguityType:
         """
@@ -44,11 +188,96 @@ class ASP_LogicProgram(LogicProgram):
         NodeAmbiguityType.unambiguous == 1 --> UNAMBIGUOUS (SAT)
         NodeAmbiguityType.ambiguous   == 2 --> AMBIGUOUS   (SAT)
         """
-        _, _, pws = self.run_reasoner(constraints, num_pws=2)
+        num_pws = self._count_pws_(constraints, num_pws=2)
 
-        if len(pws) >= 2:
+        if num_pws is None:  # Hit the solver limits
+            return None
+        elif num_pws >= 2:
             return NodeAmbiguityType.ambiguous
-        elif len(pws) == 1:
+        elif num_pws == 1:
             return NodeAmbiguityType.unambiguous
         else:
             return NodeAmbiguityType.unsat
+
+    def get_sat_activation_patterns(self, constraints: list, count_upto: int=1) -> dict:
+        """
+        Get every satisfiable activation pattern of the constraints in a single clingo run. A choice rule over the
+        activation atoms lets clingo pick the pattern. For count_upto == 1 the answer sets are projected onto the
+        activation atoms, so every pattern is reported exactly once. Otherwise the answer sets are enumerated and a
+        pattern is ruled out (with a clause added during the search) as soon as count_upto of its answer sets are seen.
+        The run counts as a single query for self.timeout and self.conflict_limit. If it's cut short, only the patterns
+        seen count_upto times are known, every other pattern is reported as None.
+        :param constraints: All the constraints that can be switched on/off
+        :param count_upto: Count the solutions of each pattern upto this number (1 --> SAT, 2 --> ambiguity)
+        :return: Dict: frozenset of the constraints turned on --> number of solutions (capped at count_upto), or None
+                 if the solver limits were hit before the pattern was settled. Patterns that are not in the dict are
+                 UNSAT.
+        """
+        if not self.use_clingo_api():
+            return LogicProgram.get_sat_activation_patterns(self, constraints, count_upto=count_upto)
+
+        clingo = self._import_clingo_()
+        choice_rule = "{{{}}}.".format("; ".join(["{}({})".format(self.constraint_keyword, c) for c in constraints]))
+        activation_symbols = {c: clingo.parse_term("{}({})".format(self.constraint_keyword, c)) for c in constraints}
+
+        if count_upto <= 1:
+            ctl = clingo.Control(['--warn=none', '--project'])
+            ctl.add("base", [], "\n".join([self.encoding, choice_rule,
+                                           "#project {}/1.".format(self.constraint_keyword)]))
+        elif self.projection is not None:
+            # Count the projected solutions per pattern
+            ctl = clingo.Control(['--warn=none', '--project'])
+            ctl.add("base", [], "\n".join([self.encoding, choice_rule,
+                                           self._get_projection_directives_([(self.constraint_keyword, 1)])]))
+        else:
+            ctl = clingo.Control(['--warn=none'])
+            ctl.add("base", [], self.encoding + '\n' + choice_rule)
+        ctl.ground([("base", [])])
+        ctl.configuration.solve.models = "0"
+        ctl.configuration.solve.solve_limit = str(self.conflict_limit) if self.conflict_limit is not None \
+            else 'umax,umax'
+
+        patterns = {}
+
+        def on_model(model):
+            pattern = frozenset([c for c, sym in activation_symbols.items() if model.contains(sym)])
+            patterns[pattern] = patterns.get(pattern, 0) + 1
+            if patterns[pattern] >= count_upto:
+                # Seen enough answer sets for this pattern, rule it out for the rest of the search
+                model.context.add_clause([(sym, c not in pattern) for c, sym in activation_symbols.items()])
+
+        with ctl.solve(on_model=on_model, async_=True) as handle:
+            if (self.timeout is not None) and (not handle.wait(self.timeout)):
+                handle.cancel()
+            solve_result = handle.get()
+        if solve_result.exhausted:
+            return patterns
+
+        # Hit the solver limits: the patterns not seen count_upto times may still have (more) answer sets
+        known = dict([(pattern, count) for pattern, count in patterns.items() if count >= count_upto])
+        for r in range(len(constraints) + 1):
+            for pattern in itertools.combinations(constraints, r):
+                known.setdefault(frozenset(pattern), None)
+        return known
+
+    def check_sat_many(self, constraints_list: list) -> list:
+        """
+        Batched version of check_sat. With the clingo python module, all the subsets are evaluated on a single
+        grounding by switching the activation atoms (declared #external) between solve calls.
+        """
+        if not self.use_clingo_api():
+            return LogicProgram.check_sat_many(self, constraints_list)
+        constraints_list = [set(constraints) for constraints in constraints_list]
+        self._get_control_(set().union(*constraints_list))  # Ground once for the whole batch
+        return [self.check_sat(constraints) for constraints in constraints_list]
+
+    def check_ambiguity_many(self, constraints_list: list) -> list:
+        """
+        Batched version of check_ambiguity. With the clingo python module, all the subsets are evaluated on a single
+        grounding by switching the activation atoms (declared #external) between solve calls.
+        """
+        if not self.use_clingo_api():
+            return LogicProgram.check_ambiguity_many(self, constraints_list)
+        constraints_list = [set(constraints) for constraints in constraints_list]
+        self._get_control_(set().union(*constraints_list))  # Ground once for the whole batch
+        return [self.check_ambiguity(constraints) for constraints in constraints_list]
@@ -6,13 +6,42 @@ from .LatticeNode import (
     NumPWSType,
     NodeAmbiguityType,
 )
+from collections import defaultdict
 import itertools
+import math
 import random
 from .PowersetBitLib import PowersetBitLib
 
 
 class BitConstraintMap(ConstraintMap):
 
+    # Status --> set of nodes with that status, for the per-level statistics
+    STATUS_SETS = {
+        'explored': 'explored_set',
+        'sat': 'satisfiable_set',
+        'unsat': 'unsatisfiable_set',
+        'ambiguous': 'ambiguous_set',
+    }
+
+    # Default cap on the number of changes kept in the change log, see log_change
+    MAX_CHANGE_LOG = 10000
+
+    # Known result type --> (evaluate_*_many method, statuses it must have, PowersetBitLib function for its neighbours,
+    # statuses they must all have), to verify the known results with, see seed_map
+    SEED_CHECKS = {
+        'MSS': ('evaluate_sat_many', [True], 'get_children', [False]),
+        'MUS': ('evaluate_sat_many', [False], 'get_parents', [True]),
+        'MAS': ('evaluate_ambiguity_many', [NodeAmbiguityType.ambiguous], 'get_children',
+                [NodeAmbiguityType.unambiguous, NodeAmbiguityType.unsat]),
+        'MUAS': ('evaluate_ambiguity_many', [NodeAmbiguityType.unambiguous], 'get_parents',
+                 [NodeAmbiguityType.ambiguous]),
+    }
+    # Search --> (known result type --> direction to block it in), see seed_map
+    SEED_BLOCKS = {
+        'sat': {'MSS': 'down', 'MUS': 'up'},
+        'ambiguity': {'MUS': 'up', 'MAS': 'down', 'MUAS': 'up'},
+    }
+
     def __init__(self, constraints: list):
         ConstraintMap.__init__(self, constraints)
         self.constraints_set = set(constraints)
@@ -22,10 +51,144 @@ class BitConstraintMap(ConstraintMap):
         self.satisfiable_set = set([])
         self.unsatisfiable_set = set([])
         self.ambiguous_set = set([])
+        # (kind, node) tuples, see log_change
+        self.change_log = []
+        self.change_log_offset = 0  # Number of entries trimmed off the front of change_log
+        self.max_change_log = self.MAX_CHANGE_LOG
+        # Status --> number of nodes with that status per level (i.e. number of constraints turned on)
+        self.level_counts = {status: [0] * (self.num_constraints + 1) for status in self.STATUS_SETS}
 
     def reset_explored_set(self):
         self.unexplored_set = set(range(2 ** self.num_constraints))
         self.explored_set = set([])
+        self.level_counts['explored'] = [0] * (self.num_constraints + 1)
+        self.log_change('all')
+
+    def _add_to_status_set_(self, status, nodes):
+        """
+        Add the nodes to the set for status (see STATUS_SETS), keeping the per-level counts up to date. Only the newly
+        added nodes are counted, bucketed by level in one pass.
+        """
+        status_set = getattr(self, self.STATUS_SETS[status])
+        nodes = nodes if isinstance(nodes, (list, set, frozenset)) else list(nodes)
+        # Typically none of them is in the set yet (e.g. a whole new region blocked), which is a cheap check
+        added = nodes if status_set.isdisjoint(nodes) else set(nodes).difference(status_set)
+        if len(added) > 0:
+            status_set.update(added)
+            counts = self.level_counts[status]
+            for level, count in PowersetBitLib.count_levels(added).items():
+                counts[level] += count
+        if status == 'explored':
+            self.unexplored_set.difference_update(nodes)
+
+    def recount_level_stats(self):
+        """
+        Recount the per-level statistics from scratch. Only needed if the status sets were modified directly.
+        """
+        for status, set_name in self.STATUS_SETS.items():
+            counts = [0] * (self.num_constraints + 1)
+            for level, count in PowersetBitLib.count_levels(getattr(self, set_name)).items():
+                counts[level] = count
+            self.level_counts[status] = counts
+
+    def get_level_stats(self):
+        """
+        Number of nodes per level (i.e. number of constraints turned on) and status, kept up to date as the map is
+        explored, so it is cheap enough to call after every step.
+        'sat', 'unsat' and 'ambiguous' are the nodes whose status is known through the sets found so far (not the
+        individually evaluated nodes), 'unknown' are the nodes that hit the solver limits.
+        :return: List of dicts (one per level) with keys: 'level', 'total', 'explored', 'unexplored', 'sat', 'unsat',
+                 'ambiguous', 'unknown'
+        """
+        unknown = [0] * (self.num_constraints + 1)
+        for n in self.get_unknown(return_ints=True):
+            unknown[PowersetBitLib.get_num_set_bits(n)] += 1
+        tentatively_blocked = [0] * (self.num_constraints + 1)
+        for n in self.unknown_set:
+            if (n not in self.explored_set) and (n not in self.unexplored_set):
+                tentatively_blocked[PowersetBitLib.get_num_set_bits(n)] += 1
+
+        stats = []
+        for level in range(self.num_constraints + 1):
+            total = math.comb(self.num_constraints, level)
+            stats.append({
+                'level': level,
+                'total': total,
+                'explored': self.level_counts['explored'][level],
+                'unexplored': total - self.level_counts['explored'][level] - tentatively_blocked[level],
+                'sat': self.level_counts['sat'][level],
+                'unsat': self.level_counts['unsat'][level],
+                'ambiguous': self.level_counts['ambiguous'][level],
+                'unknown': unknown[level],
+            })
+        return stats
+
+    def get_num_explored(self):
+        return len(self.explored_set)
+
+    def log_change(self, kind, n=None):
+        """
+        Record a change to the map, so views of the map can catch up without starting over (see get_changes_since).
+        :param kind: 'node' (the status of n changed), 'down' (the status of n and its ancestors might have changed),
+                     'up' (the status of n and its descendants might have changed), 'MSS'/'MUS'/'MAS'/'MUAS' (n was
+                     added to the corresponding set) or 'all' (anything might have changed, n is None)
+        :param n: int, the node
+        The log is capped at max_change_log entries: once full, it is emptied, and the views that hadn't caught up
+        start over (see get_changes_since). So a map w/o any views doesn't grow it past the cap.
+        """
+        self.change_log.append((kind, n))
+        if len(self.change_log) > self.max_change_log:
+            self.trim_change_log()
+
+    def get_change_index(self):
+        """
+        :return: The index of the next change, to pass to get_changes_since later on
+        """
+        return self.change_log_offset + len(self.change_log)
+
+    def get_changes_since(self, idx):
+        """
+        :param idx: Index returned by get_change_index (or get_changes_since) earlier on
+        :return: (list of (kind, node) changes since idx, index to use next time)
+        """
+        if idx < self.change_log_offset:
+            # Those changes have been trimmed off
+            return [('all', None)], self.get_change_index()
+        return self.change_log[idx - self.change_log_offset:], self.get_change_index()
+
+    def trim_change_log(self, idx=None):
+        """
+        Drop the changes before idx (default: all of them). Views that haven't caught up to idx have to start over.
+        """
+        idx = self.get_change_index() if idx is None else idx
+        del self.change_log[:max(idx - self.change_log_offset, 0)]
+        self.change_log_offset = max(idx, self.change_log_offset)
+
+    def get_changed_nodes(self, changes, nodes=None):
+        """
+        :param changes: List of (kind, node) changes, as returned by get_changes_since
+        :param nodes: (Optional) Set of ints to restrict the result to. Cheaper than expanding the changed regions if
+                      only a few nodes are of interest.
+        :return: Set of ints, the nodes whose status might have changed, or None if anything might have changed
+                 (and nodes is None)
+        """
+        changed = set([])
+        for kind, n in changes:
+            if kind == 'all':
+                return set(nodes) if nodes is not None else None
+            if kind == 'down':
+                if nodes is not None:
+                    changed.update([m for m in nodes if PowersetBitLib.is_ancestor(m, n)])
+                else:
+                    changed.update(PowersetBitLib.get_ancestors(n, self.num_constraints))
+            elif kind == 'up':
+                if nodes is not None:
+                    changed.update([m for m in nodes if PowersetBitLib.is_descendant(m, n)])
+                else:
+                    changed.update(PowersetBitLib.get_descendants(n, self.num_constraints))
+            elif (nodes is None) or (n in nodes):
+                changed.add(n)
+        return changed
 
     def int_to_constraint_set(self, n):
         return [self.constraints[self.num_constraints - i - 1] for i in range(self.num_constraints - 1, -1, -1) if
@@ -54,8 +217,68 @@ class BitConstraintMap(ConstraintMap):
 
     def update_num_pws(self, constraints, num_pws, num_pws_eval_type: NumPWSType):
 
-        self.nodes[self.__constraints_to_int_helper__(constraints)].update_num_pws(num_pws=num_pws,
-                                                                                   num_pws_eval_type=num_pws_eval_type)
+        n = self.__constraints_to_int_helper__(constraints)
+        self.nodes[n].update_num_pws(num_pws=num_pws, num_pws_eval_type=num_pws_eval_type)
+        if num_pws_eval_type != NumPWSType.unevaluated:
+            self.unknown_set.discard(n)
+        self.log_change('node', n)
+
+    def mark_unknown(self, constraints):
+        """
+        Record that evaluating this node hit the solver limits (or, for an evaluated node, that its status w.r.t. its
+        neighbours couldn't be confirmed).
+        """
+        n = self.__constraints_to_int_helper__(constraints)
+        if self.nodes[n].eval_state != NodeEvalState.evaluated:
+            self.nodes[n].update_eval_state(NodeEvalState.unknown)
+        self.unknown_set.add(n)
+        self.log_change('node', n)
+
+    def is_unknown(self, constraints):
+        return self.__constraints_to_int_helper__(constraints) in self.unknown_set
+
+    def has_unknown_children(self, constraints):
+        n = self.__constraints_to_int_helper__(constraints)
+        return any(c in self.unknown_set for c in PowersetBitLib.get_children(n, self.num_constraints))
+
+    def has_unknown_parents(self, constraints):
+        n = self.__constraints_to_int_helper__(constraints)
+        return any(p in self.unknown_set for p in PowersetBitLib.get_parents(n, self.num_constraints))
+
+    def block_unknown(self, constraints):
+        """
+        Tentatively block a node whose evaluation hit the solver limits, i.e. only this node is taken out of the
+        unexplored set, until it is reopened with reopen_unknown.
+        """
+        n = self.__constraints_to_int_helper__(constraints)
+        self.mark_unknown(n)
+        self.unexplored_set.discard(n)
+
+    def reopen_unknown(self):
+        """
+        Forget the nodes that hit the solver limits so they get evaluated again. The ones that haven't been explored
+        (blocked) since are put back into the unexplored set.
+        :return: List of ints, the reopened nodes
+        """
+        reopened = []
+        for n in self.unknown_set:
+            if self.nodes[n].eval_state == NodeEvalState.unknown:
+                self.nodes[n].update_eval_state(NodeEvalState.unevaluated)
+            if n not in self.explored_set:
+                self.unexplored_set.add(n)
+                reopened.append(n)
+            self.log_change('node', n)
+        self.unknown_set = set([])
+        return reopened
+
+    def get_unknown(self, return_ints=False):
+        """
+        :return: The nodes that hit the solver limits and haven't been explored (blocked) since
+        """
+        unknown = sorted([n for n in self.unknown_set if n not in self.explored_set])
+        if return_ints:
+            return unknown
+        return [set(self.int_to_constraint_set(n)) for n in unknown]
 
     def _check_node_num_pws_explicit_(self, constraints, check_against_memoized_sets=True):
 
@@ -289,14 +512,17 @@ class BitConstraintMap(ConstraintMap):
         # return self._check_node_ambiguity_implicit_(constraints)
         return k
 
-    def get_unexplored(self, return_seed_int=False):
+    def get_unexplored(self, return_seed_int=False, rng: random.Random=None):
+        """
+        :param rng: (Optional) random.Random to pick the seed with (default: the random module)
+        """
 
         if len(self.unexplored_set) <= 0:
             if return_seed_int:
                 return None, None
             return None
 
-        node = random.sample(self.unexplored_set, 1)[0]
+        node = (rng if rng is not None else random).choice(tuple(self.unexplored_set))
         if return_seed_int:
             return self.int_to_constraint_set(node), node
         return self.int_to_constraint_set(node)
@@ -313,19 +539,61 @@ class BitConstraintMap(ConstraintMap):
             return self.int_to_constraint_set(seed), seed
         return self.int_to_constraint_set(seed)
 
-    def block_down(self, constraints, constraints_int: int=None):
+    def get_unexplored_min(self, return_seed_int=False, required=None):
+        """
+        :param required: (Optional) Constraints the seed must contain
+        """
+        required_int = self.constraint_set_to_int(required) if required is not None else 0
+        seed = min((n for n in self.unexplored_set if n & required_int == required_int),
+                   key=PowersetBitLib.get_num_set_bits, default=None)
+        if seed is None:
+            if return_seed_int:
+                return None, None
+            return None
+
+        if return_seed_int:
+            return self.int_to_constraint_set(seed), seed
+        return self.int_to_constraint_set(seed)
+
+    def get_unexplored_closest(self, target, return_seed_int=False):
+        """
+        :param target: Constraints (or their int representation) to find the closest unexplored node to, i.e. the one
+                       w/ the fewest constraints added to or removed from target
+        """
+        target_int = self.__constraints_to_int_helper__(target)
+        if len(self.unexplored_set) <= 0:
+            if return_seed_int:
+                return None, None
+            return None
+
+        seed = min(self.unexplored_set, key=lambda n: PowersetBitLib.get_num_set_bits(n ^ target_int))
+        if return_seed_int:
+            return self.int_to_constraint_set(seed), seed
+        return self.int_to_constraint_set(seed)
+
+    def block_down(self, constraints, constraints_int: int=None, strict=False):
+        """
+        :param strict: Only block the proper ancestors, i.e. leave the node itself as is.
+        """
         if constraints_int is None:
             constraints_int = self.constraint_set_to_int(constraints)
         ancestors = PowersetBitLib.get_ancestors(constraints_int, self.num_constraints)
-        self.unexplored_set.difference_update(ancestors)
-        self.explored_set.update(ancestors)
+        if strict:
+            ancestors.remove(constraints_int)
+        self._add_to_status_set_('explored', ancestors)
+        self.log_change('down', constraints_int)
 
-    def block_up(self, constraints, constraints_int: int=None):
+    def block_up(self, constraints, constraints_int: int=None, strict=False):
+        """
+        :param strict: Only block the proper descendants, i.e. leave the node itself as is.
+        """
         if constraints_int is None:
             constraints_int = self.constraint_set_to_int(constraints)
         descendants = PowersetBitLib.get_descendants(constraints_int, self.num_constraints)
-        self.unexplored_set.difference_update(descendants)
-        self.explored_set.update(descendants)
+        if strict:
+            descendants.remove(constraints_int)
+        self._add_to_status_set_('explored', descendants)
+        self.log_change('up', constraints_int)
 
     def grow(self, seed, cnf_prog, seed_int: int=None, update_map_with_mss=True,
              update_map_with_intermediate_results=True, return_mss_int=False):
@@ -334,6 +602,7 @@ class BitConstraintMap(ConstraintMap):
         if seed_int is None:
             seed_int = self.constraint_set_to_int(seed)  # Potential MSS
 
+        skipped = []  # Candidates that couldn't be evaluated within the solver limits
         n = seed_int
         for i in range(self.num_constraints - 1, -1, -1):
             bit = (n >> i) & 1
@@ -347,9 +616,14 @@ class BitConstraintMap(ConstraintMap):
                     if memoized_result is True:
                         seed.add(c)
                         seed_int = seed_plus_c_int
+                elif seed_plus_c_int in self.unknown_set:
+                    skipped.append(i)
                 else:  # memoized_result is None:
                     sat_check = cnf_prog.check_sat(seed_plus_c)
-                    if sat_check:
+                    if sat_check is None:  # Hit the solver limits
+                        self.mark_unknown(seed_plus_c_int)
+                        skipped.append(i)
+                    elif sat_check:
                         seed.add(c)
                         seed_int = seed_plus_c_int
                     else:
@@ -364,13 +638,15 @@ class BitConstraintMap(ConstraintMap):
                     #     else:  # if sat_check is False:
                     #         self.update_num_pws(seed_plus_c_int, num_pws=0, num_pws_eval_type=NumPWSType.exact)
 
-        if update_map_with_mss:
-            self.maximal_satisfiable_constraint_subsets.add(seed_int)
-            sat_ancestors = set(PowersetBitLib.get_ancestors(seed_int, self.num_constraints))
-            unsat_descendants = set(PowersetBitLib.get_descendants(seed_int, self.num_constraints)).difference(
-                {seed_int})
-            self.satisfiable_set.update(sat_ancestors)
-            self.unsatisfiable_set.update(unsat_descendants)
+        unresolved = [i for i in skipped if self._check_node_sat_explicit_(seed_int + (1 << i)) is not False]
+        if len(unresolved) > 0:
+            # Can't tell if seed is maximal until its unresolved children are evaluated
+            for i in unresolved:
+                self.mark_unknown(seed_int + (1 << i))
+            if self._check_node_sat_explicit_(seed_int) is None:
+                self.update_num_pws(seed_int, num_pws=1, num_pws_eval_type=NumPWSType.atleast)
+        elif update_map_with_mss:
+            self.record_extremal('MSS', seed_int)
 
         if return_mss_int:
             return seed, seed_int
@@ -383,6 +659,7 @@ class BitConstraintMap(ConstraintMap):
         if seed_int is None:
             seed_int = self.constraint_set_to_int(seed)  # Potential MUS
 
+        skipped = []  # Candidates that couldn't be evaluated within the solver limits
         n = seed_int
         for i in range(self.num_constraints - 1, -1, -1):
             bit = (n >> i) & 1
@@ -397,9 +674,14 @@ class BitConstraintMap(ConstraintMap):
                     if memoized_result is False:
                         seed.remove(c)
                         seed_int = seed_minus_c_int
+                elif seed_minus_c_int in self.unknown_set:
+                    skipped.append(i)
                 else:  # memoized_result is None:
                     sat_check = cnf_prog.check_sat(seed_minus_c)
-                    if not sat_check:
+                    if sat_check is None:  # Hit the solver limits
+                        self.mark_unknown(seed_minus_c_int)
+                        skipped.append(i)
+                    elif not sat_check:
                         seed.remove(c)
                         seed_int = seed_minus_c_int
                     else:
@@ -412,12 +694,15 @@ class BitConstraintMap(ConstraintMap):
                     #     else:  # if sat_check is False:
                     #         self.update_num_pws(seed_minus_c_int, num_pws=0, num_pws_eval_type=NumPWSType.exact)
 
-        if update_map_with_mus:
-            self.minimal_unsatisfiable_constraint_subsets.add(seed_int)
-            sat_ancestors = set(PowersetBitLib.get_ancestors(seed_int, self.num_constraints)).difference({seed_int})
-            unsat_descendants = set(PowersetBitLib.get_descendants(seed_int, self.num_constraints))
-            self.satisfiable_set.update(sat_ancestors)
-            self.unsatisfiable_set.update(unsat_descendants)
+        unresolved = [i for i in skipped if self._check_node_sat_explicit_(seed_int - (1 << i)) is not True]
+        if len(unresolved) > 0:
+            # Can't tell if seed is minimal until its unresolved parents are evaluated
+            for i in unresolved:
+                self.mark_unknown(seed_int - (1 << i))
+            if self._check_node_sat_explicit_(seed_int) is None:
+                self.update_num_pws(seed_int, num_pws=0, num_pws_eval_type=NumPWSType.exact)
+        elif update_map_with_mus:
+            self.record_extremal('MUS', seed_int)
 
         if return_mus_int:
             return seed, seed_int
@@ -429,6 +714,7 @@ class BitConstraintMap(ConstraintMap):
         if seed_int is None:
             seed_int = self.constraint_set_to_int(seed)  # Potential MAS
 
+        skipped = []  # Candidates that couldn't be evaluated within the solver limits
         n = seed_int
         for i in range(self.num_constraints - 1, -1, -1):
             bit = (n >> i) & 1
@@ -442,9 +728,14 @@ class BitConstraintMap(ConstraintMap):
                     if memoized_result == NodeAmbiguityType.ambiguous:
                         seed.add(c)
                         seed_int = seed_plus_c_int
+                elif seed_plus_c_int in self.unknown_set:
+                    skipped.append(i)
                 else:  # memoized_result is None
                     amb_check = cnf_prog.check_ambiguity(seed_plus_c)
-                    if amb_check == NodeAmbiguityType.ambiguous:
+                    if amb_check is None:  # Hit the solver limits
+                        self.mark_unknown(seed_plus_c_int)
+                        skipped.append(i)
+                    elif amb_check == NodeAmbiguityType.ambiguous:
                         seed.add(c)
                         seed_int = seed_plus_c_int
                     else:
@@ -462,11 +753,16 @@ class BitConstraintMap(ConstraintMap):
                     #     elif amb_check == NodeAmbiguityType.unsat:
                     #         self.update_num_pws(seed_plus_c_int, num_pws=0, num_pws_eval_type=NumPWSType.exact)
 
-        if update_map_with_mas:
-            self.maximal_ambiguous_constraint_subsets.add(seed_int)
-            amb_ancestors = set(PowersetBitLib.get_ancestors(seed_int, self.num_constraints))
-            self.ambiguous_set.update(amb_ancestors)
-            self.satisfiable_set.update(amb_ancestors)
+        unresolved = [i for i in skipped if self._check_node_ambiguity_explicit_(seed_int + (1 << i)) not in
+                      [NodeAmbiguityType.unambiguous, NodeAmbiguityType.unsat]]
+        if len(unresolved) > 0:
+            # Can't tell if seed is maximal until its unresolved children are evaluated
+            for i in unresolved:
+                self.mark_unknown(seed_int + (1 << i))
+            if self._check_node_ambiguity_explicit_(seed_int) is None:
+                self.update_num_pws(seed_int, num_pws=2, num_pws_eval_type=NumPWSType.atleast)
+        elif update_map_with_mas:
+            self.record_extremal('MAS', seed_int)
 
         if return_mas_int:
             return seed, seed_int
@@ -479,6 +775,7 @@ class BitConstraintMap(ConstraintMap):
         if seed_int is None:
             seed_int = self.constraint_set_to_int(seed)  # Potential MUAS
 
+        skipped = []  # Candidates that couldn't be evaluated within the solver limits
         n = seed_int
         for i in range(self.num_constraints - 1, -1, -1):
             bit = (n >> i) & 1
@@ -492,9 +789,14 @@ class BitConstraintMap(ConstraintMap):
                     if memoized_result == NodeAmbiguityType.unambiguous:
                         seed.remove(c)
                         seed_int = seed_minus_c_int
+                elif seed_minus_c_int in self.unknown_set:
+                    skipped.append(i)
                 else:  # memoized_result is None
                     amb_check = cnf_prog.check_ambiguity(seed_minus_c)
-                    if amb_check == NodeAmbiguityType.unambiguous:
+                    if amb_check is None:  # Hit the solver limits
+                        self.mark_unknown(seed_minus_c_int)
+                        skipped.append(i)
+                    elif amb_check == NodeAmbiguityType.unambiguous:
                         seed.remove(c)
                         seed_int = seed_minus_c_int
 
@@ -508,17 +810,446 @@ class BitConstraintMap(ConstraintMap):
                         elif amb_check == NodeAmbiguityType.unsat:
                             self.update_num_pws(seed_minus_c_int, num_pws=0, num_pws_eval_type=NumPWSType.exact)
 
-        if update_map_with_muas:
-            self.minimal_unambiguous_constraint_subsets.add(seed_int)
-            amb_ancestors = set(PowersetBitLib.get_ancestors(seed_int, self.num_constraints)).difference({seed_int})
-            self.ambiguous_set.update(amb_ancestors)
-            self.satisfiable_set.update(amb_ancestors)
-            self.satisfiable_set.add(seed_int)
+        unresolved = [i for i in skipped
+                      if self._check_node_ambiguity_explicit_(seed_int - (1 << i)) != NodeAmbiguityType.ambiguous]
+        if len(unresolved) > 0:
+            # Can't tell if seed is minimal until its unresolved parents are evaluated
+            for i in unresolved:
+                self.mark_unknown(seed_int - (1 << i))
+            if self._check_node_ambiguity_explicit_(seed_int) is None:
+                self.update_num_pws(seed_int, num_pws=1, num_pws_eval_type=NumPWSType.exact)
+        elif update_map_with_muas:
+            self.record_extremal('MUAS', seed_int)
 
         if return_muas_int:
             return seed, seed_int
         return seed
 
+    def evaluate_sat_many(self, nodes: list, cnf_prog: LogicProgram, update_map_with_results=True):
+        """
+        Get the SAT status of many nodes at once. Nodes whose status can be inferred from the map are not sent to the
+        cnf_prog, the rest are evaluated in a single batch (LogicProgram.check_sat_many).
+        :param nodes: List of nodes (ints or constraint sets)
+        :param cnf_prog: LogicProgram to evaluate the unknown nodes with
+        :param update_map_with_results: Record the newly evaluated nodes in the map
+        :return: List of bools (None for the nodes that hit the solver limits), one per node (in the same order)
+        """
+        nodes = [self.__constraints_to_int_helper__(n) for n in nodes]
+        results = [self._check_node_sat_explicit_(n) for n in nodes]
+        to_evaluate = sorted(set([n for n, r in zip(nodes, results) if r is None]))
+
+        if len(to_evaluate) > 0:
+            sat_checks = cnf_prog.check_sat_many([self.int_to_constraint_set(n) for n in to_evaluate])
+            evaluated = dict(zip(to_evaluate, sat_checks))
+            if update_map_with_results:
+                for n, sat_check in evaluated.items():
+                    if sat_check is None:  # Hit the solver limits
+                        self.mark_unknown(n)
+                    elif sat_check:
+                        self.update_num_pws(n, num_pws=1, num_pws_eval_type=NumPWSType.atleast)
+                    else:
+                        self.update_num_pws(n, num_pws=0, num_pws_eval_type=NumPWSType.exact)
+            results = [evaluated[n] if r is None else r for n, r in zip(nodes, results)]
+
+        return results
+
+    def evaluate_ambiguity_many(self, nodes: list, cnf_prog: LogicProgram, update_map_with_results=True):
+        """
+        Get the ambiguity status of many nodes at once. Nodes whose status can be inferred from the map are not sent to
+        the cnf_prog, the rest are evaluated in a single batch (LogicProgram.check_ambiguity_many).
+        :param nodes: List of nodes (ints or constraint sets)
+        :param cnf_prog: LogicProgram to evaluate the unknown nodes with
+        :param update_map_with_results: Record the newly evaluated nodes in the map
+        :return: List of NodeAmbiguityType (None for the nodes that hit the solver limits), one per node (in the same
+                 order)
+        """
+        nodes = [self.__constraints_to_int_helper__(n) for n in nodes]
+        results = [self._check_node_ambiguity_explicit_(n) for n in nodes]
+        to_evaluate = sorted(set([n for n, r in zip(nodes, results) if r is None]))
+
+        if len(to_evaluate) > 0:
+            amb_checks = cnf_prog.check_ambiguity_many([self.int_to_constraint_set(n) for n in to_evaluate])
+            evaluated = dict(zip(to_evaluate, amb_checks))
+            if update_map_with_results:
+                for n, amb_check in evaluated.items():
+                    if amb_check is None:  # Hit the solver limits
+                        self.mark_unknown(n)
+                    elif amb_check == NodeAmbiguityType.ambiguous:
+                        self.update_num_pws(n, num_pws=2, num_pws_eval_type=NumPWSType.atleast)
+                    elif amb_check == NodeAmbiguityType.unambiguous:
+                        self.update_num_pws(n, num_pws=1, num_pws_eval_type=NumPWSType.exact)
+                    elif amb_check == NodeAmbiguityType.unsat:
+                        self.update_num_pws(n, num_pws=0, num_pws_eval_type=NumPWSType.exact)
+            results = [evaluated[n] if r is None else r for n, r in zip(nodes, results)]
+
+        return results
+
+    def record_extremal(self, kind, constraints):
+        """
+        Record a confirmed MSS/MUS/MAS/MUAS (kind), w/ the statuses that follow from it (and the change log entries).
+        grow/shrink/grow_ambiguous/shrink_unambiguous record their results through here, and so do the MARCO loops for
+        the seeds they take as they are (see SeedStrategy.extremal), so both end up w/ the same map.
+        :param kind: 'MSS', 'MUS', 'MAS' or 'MUAS'
+        :param constraints: Node (int or constraint set)
+        """
+        self._seed_node_(kind, self.__constraints_to_int_helper__(constraints), extremal=True, block=None)
+
+    def _seed_node_(self, kind, n, extremal, block):
+        """
+        Apply a known result (see seed_map) the way grow/shrink/grow_ambiguous/shrink_unambiguous would.
+        :param extremal: Record n as a kind, else only the statuses that follow from n's own status are marked
+        :param block: 'up', 'down' or None
+        """
+        ancestors = set(PowersetBitLib.get_ancestors(n, self.num_constraints))
+        if kind == 'MUS':
+            self._add_to_status_set_('unsat', PowersetBitLib.get_descendants(n, self.num_constraints))
+            if extremal:
+                self._add_to_status_set_('sat', ancestors.difference({n}))
+        elif kind == 'MSS':
+            self._add_to_status_set_('sat', ancestors)
+            if extremal:
+                self._add_to_status_set_('unsat', set(PowersetBitLib.get_descendants(n, self.num_constraints))
+                                         .difference({n}))
+        elif kind == 'MAS':
+            self._add_to_status_set_('ambiguous', ancestors)
+            self._add_to_status_set_('sat', ancestors)
+        else:  # kind == 'MUAS'
+            self._add_to_status_set_('sat', ancestors)
+            if extremal:
+                self._add_to_status_set_('ambiguous', ancestors.difference({n}))
+
+        if extremal:
+            getattr(self, self.EXTREMAL_SETS[kind]).add(n)
+            self.log_change(kind, n)
+        self.log_change('down', n)
+        self.log_change('up', n)
+        if block == 'up':
+            self.block_up(None, constraints_int=n)
+        elif block == 'down':
+            self.block_down(None, constraints_int=n)
+
+    def seed_map(self, mss_es=(), mus_es=(), mas_es=(), muas_es=(), node_results=None, cnf_prog: LogicProgram=None,
+                 search: str=None):
+        """
+        Warm start the map with results known from elsewhere (a previous run, domain experts, ...), so that the
+        algorithms only search the rest of the lattice. They only return the results they find, the seeded ones are in
+        the map's MSS/MUS/MAS/MUAS sets.
+        Every known result is applied as grow/shrink/grow_ambiguous/shrink_unambiguous would apply it: recorded, with
+        the statuses that follow from it marked, and the region it settles blocked for the search:
+            'sat': MUSes are blocked up and MSSes down (for marco*)
+            'ambiguity': MUSes and MUASes are blocked up and MASes down (for marco_ambiguous*)
+        :param mss_es: Known MSSes, ints or constraint sets. Same for mus_es, mas_es and muas_es.
+        :param node_results: (Optional) Dict: node (int or constraint set) --> (num_pws, NumPWSType), known node
+                             results, recorded before anything else
+        :param cnf_prog: (Optional) LogicProgram to verify the known results with. Only what the map can't infer is
+                         evaluated, in batches (see evaluate_sat_many / evaluate_ambiguity_many). A node whose own
+                         status holds but whose neighbours show it isn't minimal/maximal (or couldn't be evaluated
+                         within the solver limits) is rejected, but the statuses and blocks that follow from its own
+                         status are still applied. Without a cnf_prog, the known results are trusted.
+        :param search: 'sat' or 'ambiguity', see above (default: 'ambiguity' if any MASes/MUASes are given, else 'sat')
+        :return: Dict: 'MSS', 'MUS', 'MAS', 'MUAS' --> {'accepted': ints, 'rejected': ints}
+        """
+        known = {'MSS': mss_es, 'MUS': mus_es, 'MAS': mas_es, 'MUAS': muas_es}
+        if search is None:
+            search = 'ambiguity' if (len(mas_es) > 0) or (len(muas_es) > 0) else 'sat'
+        if search not in self.SEED_BLOCKS:
+            print("Unknown search: {}, choices: {}".format(search, ", ".join(sorted(self.SEED_BLOCKS.keys()))))
+            return None
+
+        for node, (num_pws, num_pws_type) in (node_results or {}).items():
+            self.update_num_pws(node, num_pws=num_pws, num_pws_eval_type=num_pws_type)
+
+        seeded = {}
+        for kind, nodes in known.items():
+            nodes = sorted(set([self.__constraints_to_int_helper__(node) for node in nodes]))
+            block = self.SEED_BLOCKS[search].get(kind)
+            if cnf_prog is None:
+                for n in nodes:
+                    self._seed_node_(kind, n, extremal=True, block=block)
+                seeded[kind] = {'accepted': nodes, 'rejected': []}
+                continue
+
+            evaluate_name, statuses, neighbours_name, neighbour_statuses = self.SEED_CHECKS[kind]
+            evaluate = getattr(self, evaluate_name)
+            get_neighbours = getattr(PowersetBitLib, neighbours_name)
+            holding = [n for n, status in zip(nodes, evaluate(nodes, cnf_prog)) if status in statuses]
+            for n in holding:  # Before evaluating the neighbours, they're often settled by these
+                self._seed_node_(kind, n, extremal=False, block=None)
+
+            neighbours = dict([(n, get_neighbours(n, self.num_constraints)) for n in holding])
+            to_evaluate = sorted(set(itertools.chain.from_iterable(neighbours.values())))
+            neighbour_status = dict(zip(to_evaluate, evaluate(to_evaluate, cnf_prog)))
+            accepted = [n for n in holding if all(neighbour_status[m] in neighbour_statuses for m in neighbours[n])]
+            accepted_set = set(accepted)
+            for n in holding:
+                self._seed_node_(kind, n, extremal=n in accepted_set, block=block)
+            seeded[kind] = {'accepted': accepted, 'rejected': [n for n in nodes if n not in accepted_set]}
+
+        return seeded
+
+    def seed_statuses(self, sat_nodes=(), unsat_nodes=(), ambiguous_nodes=(), unambiguous_nodes=(), search: str=None):
+        """
+        Warm start the map with the known status of some nodes (e.g. from a coarser, group level map, see
+        HierarchicalDiagnosis), trusted as they are. The statuses that follow from them are marked, and the regions
+        they settle for the search are blocked, leaving the nodes themselves unexplored (they might be results):
+            'sat': below the SAT nodes, above the UNSAT ones (for marco*)
+            'ambiguity': below the ambiguous nodes, above the unambiguous and the UNSAT ones (for marco_ambiguous*)
+        :param sat_nodes: Nodes known to be SAT, ints or constraint sets. Same for the other statuses.
+        :param search: 'sat' or 'ambiguity' (default: 'ambiguity' if any (un)ambiguous nodes are given, else 'sat')
+        """
+        if search is None:
+            search = 'ambiguity' if (len(ambiguous_nodes) > 0) or (len(unambiguous_nodes) > 0) else 'sat'
+        if search not in self.SEED_BLOCKS:
+            print("Unknown search: {}, choices: {}".format(search, ", ".join(sorted(self.SEED_BLOCKS.keys()))))
+            return
+
+        for status, nodes, down, block in [('sat', sat_nodes, True, search == 'sat'),
+                                           ('unsat', unsat_nodes, False, True),
+                                           ('ambiguous', ambiguous_nodes, True, search == 'ambiguity'),
+                                           ('unambiguous', unambiguous_nodes, False, search == 'ambiguity')]:
+            for n in set([self.__constraints_to_int_helper__(node) for node in nodes]):
+                if down:
+                    ancestors = PowersetBitLib.get_ancestors(n, self.num_constraints)
+                    self._add_to_status_set_('sat', ancestors)
+                    if status == 'ambiguous':
+                        self._add_to_status_set_('ambiguous', ancestors)
+                    if block:
+                        self.block_down(None, constraints_int=n, strict=True)
+                    else:
+                        self.log_change('down', n)
+                else:
+                    if status == 'unsat':
+                        self._add_to_status_set_('unsat', PowersetBitLib.get_descendants(n, self.num_constraints))
+                    else:
+                        self._add_to_status_set_('sat', PowersetBitLib.get_ancestors(n, self.num_constraints))
+                        self.log_change('down', n)
+                    if block:
+                        self.block_up(None, constraints_int=n, strict=True)
+                    else:
+                        self.log_change('up', n)
+
+    def _get_search_(self, search):
+        if search is None:
+            search = 'ambiguity' if (len(self.maximal_ambiguous_constraint_subsets) > 0) or \
+                                    (len(self.minimal_unambiguous_constraint_subsets) > 0) else 'sat'
+        if search not in self.SEED_BLOCKS:
+            print("Unknown search: {}, choices: {}".format(search, ", ".join(sorted(self.SEED_BLOCKS.keys()))))
+            return None
+        return search
+
+    def _set_constraints_(self, constraints: list):
+        self.constraints = constraints
+        self.num_constraints = len(constraints)
+        self.constraints_set = set(constraints)
+        self.constraint_to_int_map = dict(zip(constraints, range(self.num_constraints)))
+
+    def _remap_nodes_(self, func, keep=None):
+        """
+        Renumber all the nodes the map knows about (sets, node results, unknown nodes) with func, dropping the ones
+        keep (if given) returns False for. The per-level statistics need to be recounted afterwards.
+        """
+        set_names = list(self.STATUS_SETS.values()) + list(self.EXTREMAL_SETS.values()) + ['unexplored_set',
+                                                                                          'unknown_set']
+        for set_name in set_names:
+            setattr(self, set_name, set([func(n) for n in getattr(self, set_name) if (keep is None) or keep(n)]))
+        nodes = self.nodes
+        self.nodes = defaultdict(Node)
+        for n, node in nodes.items():
+            if (keep is None) or keep(n):
+                self.nodes[func(n)] = node
+
+    def add_constraint(self, constraint, index: int=None, search: str=None):
+        """
+        Lift the map to one more constraint, keeping what still holds: the nodes with the new constraint turned off
+        keep their status (and their MUSes and MUASes stay minimal), and with it turned on, the UNSAT nodes stay UNSAT.
+        The old MSSes and MASes might not be maximal anymore, so they are reopened (to be found again, if they still
+        are) along with the nodes with the new constraint turned on, except the ones the remaining results settle
+        (blocked up from the MUSes, and for the 'ambiguity' search the MUASes as well, see seed_map).
+        To edit a constraint, remove it (see remove_constraint) and add the new version.
+        :param constraint: The new constraint
+        :param index: Position of the new constraint in the constraints (default: last)
+        :param search: 'sat' or 'ambiguity', what the map is being explored for (default: 'ambiguity' if it has any
+                       MASes/MUASes, else 'sat')
+        :return: List of ints, the reopened MSSes and MASes
+        """
+        if constraint in self.constraints_set:
+            print("Constraint already in the map: {}".format(constraint))
+            return None
+        search = self._get_search_(search)
+        if search is None:
+            return None
+        old_num_constraints = self.num_constraints
+        index = old_num_constraints if index is None else index
+        bit = old_num_constraints - index  # Of the new constraint, once inserted
+
+        reopened = self.maximal_satisfiable_constraint_subsets.union(self.maximal_ambiguous_constraint_subsets)
+        unsat = self.unsatisfiable_set
+        self.maximal_satisfiable_constraint_subsets = set([])
+        self.maximal_ambiguous_constraint_subsets = set([])
+        self._remap_nodes_(lambda n: PowersetBitLib.insert_bit(n, bit))
+        self._set_constraints_(self.constraints[:index] + [constraint] + self.constraints[index:])
+        self.recount_level_stats()
+
+        reopened = sorted([PowersetBitLib.insert_bit(n, bit) for n in reopened])
+        self.explored_set.difference_update(reopened)
+        self.unexplored_set.update(reopened)
+        self.unexplored_set.update([PowersetBitLib.insert_bit(n, bit, 1) for n in range(2 ** old_num_constraints)])
+        lifted_unsat = [PowersetBitLib.insert_bit(n, bit, 1) for n in unsat]
+        self._add_to_status_set_('unsat', lifted_unsat)
+        self._add_to_status_set_('explored', lifted_unsat)
+        self.recount_level_stats()
+        self.log_change('all')
+        for kind, direction in self.SEED_BLOCKS[search].items():
+            if direction == 'up':
+                for n in getattr(self, self.EXTREMAL_SETS[kind]):
+                    self.block_up(None, constraints_int=n)
+        return reopened
+
+    def remove_constraint(self, constraint):
+        """
+        Project the map onto the nodes with the constraint turned off, which is exactly the lattice w/o it: their
+        status, and the MUSes and MUASes among them, still hold. The old MSSes (MASes) w/ the constraint give the
+        candidates for the new ones, once the constraint is dropped from them: the ones that are maximal among the
+        candidates and the remaining MSSes (MASes), and whose children the map knows to be UNSAT (not ambiguous), are
+        recorded as such, the other maximal ones are reopened.
+        :param constraint: Constraint to remove
+        :return: List of ints, the reopened candidates
+        """
+        if constraint not in self.constraints_set:
+            print("Constraint not in the map: {}".format(constraint))
+            return None
+        bit = self.num_constraints - self.constraint_to_int_map[constraint] - 1
+        mask = 1 << bit
+
+        candidates = {}
+        for kind in ['MSS', 'MAS']:
+            candidates[kind] = set([PowersetBitLib.remove_bit(n, bit) for n in getattr(self, self.EXTREMAL_SETS[kind])
+                                    if n & mask])
+        self._remap_nodes_(lambda n: PowersetBitLib.remove_bit(n, bit), keep=lambda n: (n & mask) == 0)
+        self._set_constraints_([c for c in self.constraints if c != constraint])
+        self.recount_level_stats()
+        self.log_change('all')
+
+        reopened = []
+        for kind, nodes in candidates.items():
+            extremal = getattr(self, self.EXTREMAL_SETS[kind])
+            pool = extremal.union(nodes)
+            for n in sorted(nodes.difference(extremal)):
+                if any((m != n) and PowersetBitLib.is_ancestor(n, m) for m in pool):
+                    continue  # Not maximal, stays blocked
+                children = PowersetBitLib.get_children(n, self.num_constraints)
+                if kind == 'MSS':
+                    confirmed = all(self.check_sat(child) is False for child in children)
+                else:
+                    confirmed = all(self.check_ambiguity(child) in [NodeAmbiguityType.unambiguous,
+                                                                     NodeAmbiguityType.unsat] for child in children)
+                if confirmed:
+                    self._seed_node_(kind, n, extremal=True, block=None)
+                else:
+                    self.explored_set.discard(n)
+                    self.unexplored_set.add(n)
+                    reopened.append(n)
+        self.recount_level_stats()
+        return reopened
+
+    def get_num_pws(self, seed, cnf_prog: LogicProgram, max_count: int=0, update_map_with_result=True):
+        """
+        Get the number of PWs of seed, counting them with the cnf_prog (upto max_count) only if the map doesn't
+        already know enough.
+        :param seed: Node (int or constraint set)
+        :param cnf_prog: LogicProgram to count the PWs with
+        :param max_count: Stop counting after these many PWs (0 --> count all)
+        :param update_map_with_result: Record the count in the map
+        :return: (num_pws, NumPWSType)
+        """
+        n = self.__constraints_to_int_helper__(seed)
+        num_pws, num_pws_type = self.check_node_num_pws(n)
+        if num_pws_type == NumPWSType.exact:
+            return num_pws, num_pws_type
+        if (num_pws_type == NumPWSType.atleast) and (max_count > 0) and (num_pws >= max_count):
+            return num_pws, num_pws_type
+
+        lower = num_pws if num_pws_type == NumPWSType.atleast else 0
+        num_pws, num_pws_type, hit_limits = self._count_num_pws_(n, cnf_prog, max_count=max_count, lower=lower)
+        if update_map_with_result:
+            if num_pws_type != NumPWSType.unevaluated:
+                self.update_num_pws(n, num_pws=num_pws, num_pws_eval_type=num_pws_type)
+            if hit_limits:  # Keep the bound, but have the node counted again
+                self.mark_unknown(n)
+        return num_pws, num_pws_type
+
+    def _count_num_pws_(self, n, cnf_prog: LogicProgram, max_count: int=0, lower: int=0):
+        """
+        Count the PWs of n w/ the cnf_prog (upto max_count). A count that hits the solver limits is only a lower
+        bound (if any PW was found at all), so the better of it and the known lower bound is kept.
+        :param lower: Known lower bound on the number of PWs of n
+        :return: (num_pws, NumPWSType, whether the solver limits were hit)
+        """
+        num_pws, num_pws_type = cnf_prog.count_solutions(self.int_to_constraint_set(n), max_count=max_count)
+        if (num_pws_type == NumPWSType.exact) or ((max_count > 0) and (num_pws >= max_count)):
+            return num_pws, num_pws_type, False
+        lower = max(lower, num_pws)
+        if lower > 0:
+            return lower, NumPWSType.atleast, True
+        return -1, NumPWSType.unevaluated, True
+
+    def annotate_num_pws(self, nodes, cnf_prog: LogicProgram, max_count: int=0, update_map_with_results=True):
+        """
+        Get the number of PWs of many nodes, using monotonicity to avoid counting where possible: adding constraints
+        can only remove PWs, so an exact count bounds the counts of all its descendants from above, and any count
+        bounds the counts of all its ancestors from below. A node is only counted (upto max_count) if these bounds,
+        together with what the map already knows, don't pin its count down.
+        The nodes are visited from both ends of the lattice towards the middle so that the middle levels get bounds
+        from both sides.
+        :param nodes: Nodes (ints or constraint sets) to annotate
+        :param cnf_prog: LogicProgram to count the PWs with
+        :param max_count: Stop counting after these many PWs (0 --> count all)
+        :param update_map_with_results: Record the counts in the map (Node.num_pws)
+        :return: Dict: node (int) --> (num_pws, NumPWSType)
+        """
+        levels = {}
+        for n in set(map(self.__constraints_to_int_helper__, nodes)):
+            levels.setdefault(PowersetBitLib.get_num_set_bits(n), []).append(n)
+        level_order = sorted(levels.keys())
+        # Alternate between the lowest and highest remaining levels
+        level_order = [level_order[(i // 2) if (i % 2 == 0) else -(i // 2) - 1] for i in range(len(level_order))]
+
+        annotated = {}
+        for level in level_order:
+            for n in levels[level]:
+                num_pws, num_pws_type = self.check_node_num_pws(n)
+                if num_pws_type == NumPWSType.exact:
+                    annotated[n] = (num_pws, num_pws_type)
+                    continue
+
+                lower = num_pws if num_pws_type == NumPWSType.atleast else 0
+                upper = None
+                for m, (m_num_pws, m_num_pws_type) in annotated.items():
+                    if PowersetBitLib.is_ancestor(m, n):
+                        if m_num_pws_type == NumPWSType.exact:
+                            upper = m_num_pws if upper is None else min(upper, m_num_pws)
+                    elif PowersetBitLib.is_descendant(m, n):
+                        lower = max(lower, m_num_pws)
+
+                if (upper is not None) and (upper <= lower):
+                    num_pws, num_pws_type = upper, NumPWSType.exact
+                elif (max_count > 0) and (lower >= max_count):
+                    num_pws, num_pws_type = lower, NumPWSType.atleast
+                else:
+                    num_pws, num_pws_type, hit_limits = self._count_num_pws_(n, cnf_prog, max_count=max_count,
+                                                                             lower=lower)
+                    if (num_pws_type == NumPWSType.atleast) and (upper is not None) and (num_pws >= upper):
+                        num_pws, num_pws_type, hit_limits = upper, NumPWSType.exact, False
+
+                annotated[n] = (num_pws, num_pws_type)
+                if update_map_with_results:
+                    if num_pws_type != NumPWSType.unevaluated:
+                        self.update_num_pws(n, num_pws=num_pws, num_pws_eval_type=num_pws_type)
+                    if hit_limits:  # Keep the bound, but have the node counted again
+                        self.mark_unknown(n)
+
+        return annotated
+
     def get_all_nodes_num_pws(self):
 
         num_pws = {k: (None, None) for k in range(2**self.num_constraints)}
@@ -568,13 +1299,73 @@ class BitConstraintMap(ConstraintMap):
 
         return node_to_sat
 
-    # TODO
-    def get_all_nodes_ambiguity_status(self):
-        pass
+    def get_node_num_pws(self, constraints):
+        """
+        Single node version of get_all_nodes_num_pws, i.e. the same result for this node, without going over the
+        whole lattice.
+        :return: (num_pws, NumPWSType) or (None, None) if nothing is known about the node
+        """
+        n = self.__constraints_to_int_helper__(constraints)
 
+        pot_missed = (n not in self.minimal_unambiguous_constraint_subsets) and (n not in self.satisfiable_set) and \
+                     (n not in self.unsatisfiable_set) and \
+                     any(PowersetBitLib.is_ancestor(m, n) for m in self.minimal_unambiguous_constraint_subsets)
+        if (n in self.unexplored_set) or pot_missed:
+            return self._check_node_num_pws_explicit_(n, check_against_memoized_sets=False)
 
+        if n in self.minimal_unambiguous_constraint_subsets:
+            return 1, NumPWSType.exact
+        if n in self.ambiguous_set:
+            explicit_check = self._check_node_num_pws_explicit_(n, check_against_memoized_sets=False)
+            if (explicit_check[0] is not None) and (explicit_check[1] == NumPWSType.atleast):
+                return max(2, explicit_check[0]), NumPWSType.atleast
+            if (explicit_check[0] is not None) and (explicit_check[1] == NumPWSType.exact):
+                return explicit_check
+            return 2, NumPWSType.atleast
+        if n in self.unsatisfiable_set:
+            return 0, NumPWSType.exact
+        if n in self.satisfiable_set:
+            explicit_check = self._check_node_num_pws_explicit_(n, check_against_memoized_sets=False)
+            return explicit_check if explicit_check[0] is not None else (1, NumPWSType.atleast)
+        return None, None
 
+    def get_node_sat(self, constraints):
+        """
+        Single node version of get_all_nodes_sat.
+        :return: bool or None if unknown
+        """
+        return self._check_node_sat_explicit_(constraints)
 
+    def get_node_ambiguity_status(self, constraints):
+        """
+        Ambiguity status of a node, from the information available in the map. On top of the known number of PWs,
+        uses the fact that a SAT descendant of a MUAS is UNAMBIGUOUS too (adding constraints never adds PWs).
+        :return: NodeAmbiguityType or None if unknown
+        """
+        n = self.__constraints_to_int_helper__(constraints)
 
+        num_pws, num_pws_type = self.get_node_num_pws(n)
+        if num_pws_type == NumPWSType.exact:
+            if num_pws >= 2:
+                return NodeAmbiguityType.ambiguous
+            return NodeAmbiguityType.unambiguous if num_pws == 1 else NodeAmbiguityType.unsat
+        if (num_pws_type == NumPWSType.atleast) and (num_pws >= 2):
+            return NodeAmbiguityType.ambiguous
 
+        is_sat = self.get_node_sat(n)
+        if is_sat is False:
+            return NodeAmbiguityType.unsat
+        if is_sat and any(PowersetBitLib.is_ancestor(m, n) for m in self.minimal_unambiguous_constraint_subsets):
+            return NodeAmbiguityType.unambiguous
+        return None
 
+    def get_all_nodes_ambiguity_status(self, chunk_size: int=4096):
+        """
+        Ambiguity status of every node of the lattice, chunk by chunk, so that only chunk_size nodes are held in memory
+        at any point.
+        :param chunk_size: Number of nodes per chunk
+        :return: Generator over dicts (one per chunk of consecutive nodes): int --> NodeAmbiguityType (None if unknown)
+        """
+        num_nodes = 2 ** self.num_constraints
+        for start in range(0, num_nodes, chunk_size):
+            yield {n: self.get_node_ambiguity_status(n) for n in range(start, min(start + chunk_size, num_nodes))}
@@ -0,0 +1,169 @@
+from .GroupedLogicProgram import GroupedLogicProgram
+from .LogicProgram import LogicProgram
+from collections import defaultdict
+import itertools
+import random
+import re
+
+
+class ConstraintEquivalence:
+    """
+    Pre-analysis that finds classes of equivalent constraints, i.e. constraints that have the same effect whether one,
+    some or all of them are turned on. Every such class collapses into a single constraint of a quotient lattice (half
+    the size for every extra member), the diagnosis runs over it (see get_grouped_program) and the results are expanded
+    back out (see expand_result):
+        - a MUS/MUAS has at most one member of a class, any one will do
+        - an MSS/MAS has either all or none of the members of a class
+    Classes are found from the encoding (constraints whose rules are identical up to the constraint name, see
+    get_syntactic_classes) and/or from oracle probes (see refine_by_probes).
+    """
+
+    @staticmethod
+    def _import_clingo_ast_():
+        try:
+            import clingo.ast
+        except ImportError:
+            return None
+        return clingo.ast
+
+    @staticmethod
+    def get_statements(encoding: str):
+        """
+        :return: List of the statements of the encoding, normalised by the clingo parser if it is available, else
+                 split on the full stops ending them (w/ the comments removed)
+        """
+        clingo_ast = ConstraintEquivalence._import_clingo_ast_()
+        if clingo_ast is not None:
+            statements = []
+            clingo_ast.parse_string(encoding, lambda stmt: statements.append(str(stmt)))
+            return [s for s in statements if not s.startswith('%')]
+        encoding = re.sub(r'%\*.*?\*%', ' ', encoding, flags=re.DOTALL)
+        encoding = re.sub(r'%[^\n]*', ' ', encoding)
+        statements = re.split(r'(?<!\.)\.(?![.\w])', encoding)
+        return [' '.join(s.split()) for s in statements if s.strip() != '']
+
+    @staticmethod
+    def get_syntactic_classes(encoding: str, constraints: list, constraint_keyword: str='comp'):
+        """
+        Constraints are equivalent if the statements they appear in (as constraint_keyword(c)) are identical once the
+        constraint is renamed. Constraints that don't appear anywhere form a class (they have no effect). Bails out
+        (every constraint in its own class) if the constraint_keyword relation is used with anything other than the
+        constraints themselves, e.g. with variables.
+        :return: List of classes (lists of constraints, in the order of constraints), singletons included
+        """
+        # The encoding only has the constraints' names, e.g. comp(1) for the constraint 1 (an int)
+        by_name = dict([(str(c), c) for c in constraints])
+        occurrence = re.compile(r'(?<![\w\'])' + re.escape(constraint_keyword) + r'\(\s*([^()]*?)\s*\)')
+        mention = re.compile(r'(?<![\w\'])' + re.escape(constraint_keyword) + r'\(')
+
+        signatures = defaultdict(list)
+        for statement in ConstraintEquivalence.get_statements(encoding):
+            args = occurrence.findall(statement)
+            if len(args) != len(mention.findall(statement)) or any(a not in by_name for a in args):
+                print("'{}' is used w/ something other than the constraints in: {}, no syntactic "
+                      "equivalences.".format(constraint_keyword, statement))
+                return [[c] for c in constraints]
+            for name in set(args):
+                normalised = occurrence.sub(lambda m: '{}(_)'.format(constraint_keyword) if m.group(1) == name
+                                            else m.group(0), statement)
+                signatures[by_name[name]].append(normalised)
+
+        classes = defaultdict(list)
+        for c in constraints:
+            classes[tuple(sorted(signatures[c]))].append(c)
+        return list(classes.values())
+
+    @staticmethod
+    def refine_by_probes(cnf_prog: LogicProgram, classes: list, num_probes: int=8, seed=0):
+        """
+        Split the classes using the oracle. Equivalent constraints a and b give the same ambiguity status for R + {a},
+        R + {b} and R + {a, b}, for any subset R (not only the small random ones tried here):
+            - first, the classes are split on the status of R + {c} for every constraint c (one batch per R)
+            - then, every constraint is only kept with the first constraint of its class if R + {a, b} agrees with
+              them as well, for every R and for all the other constraints (the constraints w/o a or w/o b)
+        This can only split classes, so on its own (starting from all the constraints in one class) the classes are
+        only as good as the probes.
+        :param classes: List of classes (lists of constraints)
+        :param num_probes: Number of subsets R to try (the first one is empty, the rest are random)
+        :return: List of classes
+        """
+        constraints = list(itertools.chain.from_iterable(classes))
+        rng = random.Random(seed)
+        probes = [set([])] + [set(rng.sample(constraints, rng.randint(1, len(constraints))))
+                              for _ in range(num_probes - 1)]
+
+        def get_statuses(subsets):
+            # Hitting the solver limits can't confirm anything, so those never match
+            return [status if status is not None else object() for status in cnf_prog.check_ambiguity_many(subsets)]
+
+        signatures = defaultdict(list)
+        for probe in probes:
+            for c, status in zip(constraints, get_statuses([probe.union({c}) for c in constraints])):
+                signatures[c].append(status)
+        all_constraints = set(constraints)
+        without = dict(zip(constraints, get_statuses([all_constraints.difference({c}) for c in constraints])))
+        everything = get_statuses([all_constraints])[0]
+
+        refined = []
+        for cls in classes:
+            split = defaultdict(list)
+            for c in cls:
+                split[tuple(signatures[c])].append(c)
+            for candidates in split.values():
+                while len(candidates) > 0:
+                    rep, rest = candidates[0], candidates[1:]
+                    pairs = get_statuses([probe.union({rep, c}) for c in rest for probe in probes])
+                    same = [c for i, c in enumerate(rest) if pairs[i * len(probes):(i + 1) * len(probes)] ==
+                            signatures[rep] and without[rep] == without[c] == everything]
+                    refined.append([rep] + same)
+                    candidates = [c for c in rest if c not in same]
+        return refined
+
+    @staticmethod
+    def get_classes(cnf_prog: LogicProgram, constraints: list=None, num_probes: int=8, seed=0, probes_only=False):
+        """
+        Syntactic classes for programs with an encoding (e.g. ASP_LogicProgram), double checked with num_probes
+        probes. Other programs only have the probes to go on, which can only tell constraints apart: w/ probes_only,
+        all the constraints start out in a single class (so the classes are only as good as the probes), else every
+        constraint is in a class of its own.
+        :param constraints: (Optional) Constraints to classify (default: cnf_prog.constraints)
+        :return: List of classes (lists of constraints), singletons included
+        """
+        constraints = list(constraints if constraints is not None else cnf_prog.constraints)
+        if hasattr(cnf_prog, 'encoding') and hasattr(cnf_prog, 'constraint_keyword'):
+            classes = ConstraintEquivalence.get_syntactic_classes(cnf_prog.encoding, constraints,
+                                                                  cnf_prog.constraint_keyword)
+        elif probes_only:
+            classes = [constraints]
+        else:
+            classes = [[c] for c in constraints]
+        if (num_probes > 0) and any(len(cls) > 1 for cls in classes):
+            classes = ConstraintEquivalence.refine_by_probes(cnf_prog, classes, num_probes=num_probes, seed=seed)
+        return classes
+
+    @staticmethod
+    def get_grouped_program(cnf_prog: LogicProgram, classes: list):
+        """
+        :return: GroupedLogicProgram over the quotient lattice, every class named after its first member
+        """
+        return GroupedLogicProgram(cnf_prog, dict([(cls[0], cls) for cls in classes]))
+
+    @staticmethod
+    def expand_result(result, result_type: str, groups: dict):
+        """
+        :param result: Result over the quotient lattice (set of class names)
+        :param result_type: 'MUS', 'MSS', 'MUAS' or 'MAS'
+        :param groups: Dict: class name --> members (e.g. GroupedLogicProgram.groups)
+        :return: List of the corresponding results over the constraints
+        """
+        if result_type in ['MUS', 'MUAS']:
+            return [set(choice) for choice in itertools.product(*[groups[g] for g in sorted(result, key=str)])]
+        members = set([])
+        for g in result:
+            members.update(groups[g])
+        return [members]
+
+    @staticmethod
+    def expand_results(results: list, result_type: str, groups: dict):
+        return list(itertools.chain.from_iterable(ConstraintEquivalence.expand_result(r, result_type, groups)
+                                                  for r in results))
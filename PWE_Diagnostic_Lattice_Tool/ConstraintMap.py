@@ -10,6 +10,14 @@ from collections import defaultdict
 
 class ConstraintMap:
 
+    # Result type --> set it's recorded in
+    EXTREMAL_SETS = {
+        'MSS': 'maximal_satisfiable_constraint_subsets',
+        'MUS': 'minimal_unsatisfiable_constraint_subsets',
+        'MAS': 'maximal_ambiguous_constraint_subsets',
+        'MUAS': 'minimal_unambiguous_constraint_subsets',
+    }
+
     def __init__(self, constraints: list):
         self.constraints = constraints
         self.num_constraints = len(self.constraints)
@@ -18,6 +26,7 @@ class ConstraintMap:
         self.maximal_ambiguous_constraint_subsets = set([])
         self.minimal_unambiguous_constraint_subsets = set([])
         self.nodes = defaultdict(Node)
+        self.unknown_set = set([])
 
     def reset_explored_set(self):
         pass
@@ -37,16 +46,50 @@ class ConstraintMap:
     def check_sat(self, constraints):
         pass
 
-    def get_unexplored(self):
+    def get_unexplored(self, rng=None):
         pass
 
     def get_unexplored_max(self):
         pass
 
-    def block_down(self, constraints):
+    def get_unexplored_min(self, required=None):
+        pass
+
+    def get_unexplored_closest(self, target):
+        pass
+
+    def block_down(self, constraints, strict=False):
+        pass
+
+    def block_up(self, constraints, strict=False):
         pass
 
-    def block_up(self, constraints):
+    def mark_unknown(self, constraints):
+        pass
+
+    def is_unknown(self, constraints):
+        pass
+
+    def has_unknown_children(self, constraints):
+        pass
+
+    def has_unknown_parents(self, constraints):
+        pass
+
+    def block_unknown(self, constraints):
+        pass
+
+    def reopen_unknown(self):
+        pass
+
+    def get_unknown(self):
+        pass
+
+    def record_extremal(self, kind, constraints):
+        """
+        Record a confirmed MSS/MUS/MAS/MUAS (kind), along w/ whatever grow/shrink/grow_ambiguous/shrink_unambiguous
+        record with it.
+        """
         pass
 
     def grow(self, seed, cnf_prog: LogicProgram):
@@ -61,6 +104,14 @@ class ConstraintMap:
     def shrink_unambiguous(self, seed, cnf_prog: LogicProgram):
         pass
 
+    def evaluate_sat_many(self, nodes: list, cnf_prog: LogicProgram):
+        pass
+
+    def evaluate_ambiguity_many(self, nodes: list, cnf_prog: LogicProgram):
+        pass
+
     def get_num_pws(self, seed, cnf_prog: LogicProgram):
-        # TODO
+        pass
+
+    def annotate_num_pws(self, nodes, cnf_prog: LogicProgram):
         pass
@@ -0,0 +1,197 @@
+from .BitConstraintMap import BitConstraintMap
+from .LatticeNode import NodeEvalState, NumPWSType
+import json
+
+
+class ConstraintMapIO:
+    """
+    Columnar export/import of a BitConstraintMap. Only the nodes the map knows something about are stored (one row per
+    node, the node being a uint64 bitmask as in BitConstraintMap), every other node is unexplored and unevaluated.
+    Columns:
+        mask                                    uint64, the node
+        explored, unexplored, unknown           bool, membership of the explored / unexplored / unknown sets
+        sat, unsat, ambiguous                   bool, membership of the memoized SAT / UNSAT / AMBIGUOUS sets
+        mss, mus, mas, muas                     bool, membership of the extremal sets
+        eval_state                              int8, NodeEvalState value
+        num_pws                                 int64, -1 if unevaluated
+        num_pws_type                            str, NumPWSType value ('?', 'n', 'n+')
+    The constraints (the names for the bits, most significant first) are stored alongside, as strings along w/ their
+    types (see CONSTRAINT_TYPES), so that e.g. int constraints are restored as ints.
+    """
+
+    BOOL_COLUMNS = [
+        ('explored', 'explored_set'),
+        ('unexplored', 'unexplored_set'),
+        ('unknown', 'unknown_set'),
+        ('sat', 'satisfiable_set'),
+        ('unsat', 'unsatisfiable_set'),
+        ('ambiguous', 'ambiguous_set'),
+        ('mss', 'maximal_satisfiable_constraint_subsets'),
+        ('mus', 'minimal_unsatisfiable_constraint_subsets'),
+        ('mas', 'maximal_ambiguous_constraint_subsets'),
+        ('muas', 'minimal_unambiguous_constraint_subsets'),
+    ]
+    MAX_CONSTRAINTS = 64
+    # Type name --> type, of the constraints that can be exported
+    CONSTRAINT_TYPES = {'str': str, 'int': int}
+
+    @staticmethod
+    def _import_pyarrow_():
+        try:
+            import pyarrow
+            import pyarrow.parquet
+        except ImportError:
+            return None
+        return pyarrow
+
+    @staticmethod
+    def to_columns(cmap: BitConstraintMap):
+        """
+        :return: Dict: column name --> numpy array (see the class docstring), plus 'constraints' (array of str) and
+                 'constraint_types' (array of str, keys of CONSTRAINT_TYPES). None if the map has too many constraints
+                 for uint64 masks, or constraints of other types.
+        """
+        import numpy as np
+
+        if cmap.num_constraints > ConstraintMapIO.MAX_CONSTRAINTS:
+            print("Columnar export supports upto {} constraints.".format(ConstraintMapIO.MAX_CONSTRAINTS))
+            return None
+        constraint_types = [type(c).__name__ for c in cmap.constraints]
+        if any(t not in ConstraintMapIO.CONSTRAINT_TYPES for t in constraint_types):
+            print("Columnar export only supports constraints of type: {}.".format(
+                ", ".join(ConstraintMapIO.CONSTRAINT_TYPES.keys())))
+            return None
+
+        # The unexplored set is usually the bulk of the lattice, the nodes outside of it are the informative ones
+        rows = set(cmap.nodes.keys()).union(cmap.unknown_set)
+        for _, set_name in ConstraintMapIO.BOOL_COLUMNS:
+            if set_name != 'unexplored_set':
+                rows.update(getattr(cmap, set_name))
+        rows = sorted(rows)
+
+        columns = {'mask': np.array(rows, dtype=np.uint64)}
+        for col, set_name in ConstraintMapIO.BOOL_COLUMNS:
+            node_set = getattr(cmap, set_name)
+            columns[col] = np.array([n in node_set for n in rows], dtype=bool)
+
+        eval_state, num_pws, num_pws_type = [], [], []
+        for n in rows:
+            node = cmap.nodes[n] if n in cmap.nodes else None
+            eval_state.append(node.eval_state.value if node is not None else NodeEvalState.unevaluated.value)
+            num_pws.append(node.num_pws if (node is not None) and (node.num_pws is not None) else -1)
+            num_pws_type.append(node.num_pws_eval_type.value if node is not None else NumPWSType.unevaluated.value)
+        columns['eval_state'] = np.array(eval_state, dtype=np.int8)
+        columns['num_pws'] = np.array(num_pws, dtype=np.int64)
+        columns['num_pws_type'] = np.array(num_pws_type, dtype=str)
+        columns['constraints'] = np.array([str(c) for c in cmap.constraints], dtype=str)
+        columns['constraint_types'] = np.array(constraint_types, dtype=str)
+        return columns
+
+    @staticmethod
+    def from_columns(columns: dict, constraints: list=None):
+        """
+        Rebuild a BitConstraintMap from the columns returned by to_columns (or loaded from a file).
+        :param columns: Dict: column name --> array
+        :param constraints: (Optional) Constraints to use, instead of columns['constraints']
+        :return: BitConstraintMap
+        """
+        if constraints is None:
+            # Files written before the types were stored only have str constraints
+            constraint_types = columns['constraint_types'] if 'constraint_types' in columns else \
+                ['str'] * len(columns['constraints'])
+            constraints = [ConstraintMapIO.CONSTRAINT_TYPES[str(t)](str(c))
+                           for c, t in zip(columns['constraints'], constraint_types)]
+        cmap = BitConstraintMap(constraints)
+
+        masks = columns['mask'].tolist()
+        for col, set_name in ConstraintMapIO.BOOL_COLUMNS:
+            flags = columns[col].tolist()
+            if set_name == 'unexplored_set':
+                # Every node without a row is unexplored, only drop the ones with a row that aren't
+                cmap.unexplored_set.difference_update([n for n, flag in zip(masks, flags) if not flag])
+            else:
+                getattr(cmap, set_name).update([n for n, flag in zip(masks, flags) if flag])
+
+        num_pws_types = {t.value: t for t in NumPWSType}
+        eval_states = {s.value: s for s in NodeEvalState}
+        for n, eval_state, num_pws, num_pws_type in zip(masks, columns['eval_state'].tolist(),
+                                                        columns['num_pws'].tolist(),
+                                                        columns['num_pws_type'].tolist()):
+            if (eval_state == NodeEvalState.unevaluated.value) and (num_pws_type == NumPWSType.unevaluated.value):
+                continue
+            node = cmap.nodes[n]
+            node.eval_state = eval_states[eval_state]
+            node.num_pws = num_pws
+            node.num_pws_eval_type = num_pws_types[num_pws_type]
+
+        cmap.recount_level_stats()
+        cmap.log_change('all')
+        return cmap
+
+    @staticmethod
+    def save_npz(cmap: BitConstraintMap, path, compressed=False):
+        """
+        Save the map as a numpy .npz archive: the columns, plus the extremal sets as separate mask arrays ('MSS',
+        'MUS', 'MAS', 'MUAS'). Uncompressed by default, for the fastest loads.
+        """
+        import numpy as np
+
+        columns = ConstraintMapIO.to_columns(cmap)
+        if columns is None:
+            return
+        for col in ['mss', 'mus', 'mas', 'muas']:
+            columns[col.upper()] = columns['mask'][columns[col]]
+        (np.savez_compressed if compressed else np.savez)(path, **columns)
+
+    @staticmethod
+    def load_npz(path, as_columns=False):
+        """
+        :param as_columns: Return the dict of arrays instead of rebuilding the BitConstraintMap (for analytics that
+                           don't need the map itself)
+        :return: BitConstraintMap (or dict of arrays)
+        """
+        import numpy as np
+
+        with np.load(path, allow_pickle=False) as npz:
+            columns = {k: npz[k] for k in npz.files}
+        if as_columns:
+            return columns
+        return ConstraintMapIO.from_columns(columns)
+
+    @staticmethod
+    def save_parquet(cmap: BitConstraintMap, path):
+        """
+        Save the map as a Parquet file (needs pyarrow). The constraints (and their types) go into the schema metadata.
+        """
+        pa = ConstraintMapIO._import_pyarrow_()
+        if pa is None:
+            print("Parquet export needs pyarrow (pip install pyarrow).")
+            return
+        columns = ConstraintMapIO.to_columns(cmap)
+        if columns is None:
+            return
+        constraints = columns.pop('constraints').tolist()
+        constraint_types = columns.pop('constraint_types').tolist()
+        table = pa.table(columns)
+        table = table.replace_schema_metadata({'constraints': json.dumps(constraints),
+                                               'constraint_types': json.dumps(constraint_types)})
+        pa.parquet.write_table(table, path)
+
+    @staticmethod
+    def load_parquet(path, as_columns=False):
+        """
+        :param as_columns: Return the dict of arrays instead of rebuilding the BitConstraintMap
+        :return: BitConstraintMap (or dict of arrays)
+        """
+        pa = ConstraintMapIO._import_pyarrow_()
+        if pa is None:
+            print("Parquet import needs pyarrow (pip install pyarrow).")
+            return None
+        table = pa.parquet.read_table(path)
+        columns = {name: table.column(name).to_numpy() for name in table.column_names}
+        columns['constraints'] = json.loads(table.schema.metadata[b'constraints'])
+        if b'constraint_types' in table.schema.metadata:
+            columns['constraint_types'] = json.loads(table.schema.metadata[b'constraint_types'])
+        if as_columns:
+            return columns
+        return ConstraintMapIO.from_columns(columns)
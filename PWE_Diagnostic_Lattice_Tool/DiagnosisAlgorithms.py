@@ -1,12 +1,38 @@
 from .ConstraintMap import ConstraintMap
 from .BitConstraintMap import BitConstraintMap
 from .LogicProgram import LogicProgram
-from .LatticeNode import NodeAmbiguityType
-import numpy as np
+from .LatticeNode import NodeAmbiguityType, NumPWSType
+from .PowersetBitLib import PowersetBitLib
+from .SeedStrategies import SeedStrategy, RandomSeed, LargestFirst
+import math
+import time
 
 
 class DiagnosisAlgorithmsHelpers:
 
+    @staticmethod
+    def memoize_sat(seed, cmap: ConstraintMap, sat_check):
+        """
+        Record the cnf_prog's SAT result for seed in the cmap, so that it's never asked for again (e.g. by grow or
+        shrink, when seed turns out not to be extremal).
+        """
+        if sat_check is True:
+            cmap.update_num_pws(seed, num_pws=1, num_pws_eval_type=NumPWSType.atleast)
+        elif sat_check is False:
+            cmap.update_num_pws(seed, num_pws=0, num_pws_eval_type=NumPWSType.exact)
+
+    @staticmethod
+    def memoize_ambiguity(seed, cmap: ConstraintMap, amb_check):
+        """
+        Ambiguity version of memoize_sat.
+        """
+        if amb_check == NodeAmbiguityType.ambiguous:
+            cmap.update_num_pws(seed, num_pws=2, num_pws_eval_type=NumPWSType.atleast)
+        elif amb_check == NodeAmbiguityType.unambiguous:
+            cmap.update_num_pws(seed, num_pws=1, num_pws_eval_type=NumPWSType.exact)
+        elif amb_check == NodeAmbiguityType.unsat:
+            cmap.update_num_pws(seed, num_pws=0, num_pws_eval_type=NumPWSType.exact)
+
     @staticmethod
     def check_sat(seed, cmap: ConstraintMap, cnf_prog: LogicProgram):
         """
@@ -15,12 +41,16 @@ class DiagnosisAlgorithmsHelpers:
         :param seed: Set of constraints
         :param cmap: ConstraintMap Object
         :param cnf_prog: LogicProgram Object
-        :return: bool
+        :return: bool (None if seed already hit the solver limits, or hits them now)
         """
         cmap_inference = cmap.check_sat(constraints=seed)
         if cmap_inference is not None:
             return cmap_inference
-        return cnf_prog.check_sat(constraints=seed)
+        if cmap.is_unknown(seed):
+            return None
+        sat_check = cnf_prog.check_sat(constraints=seed)
+        DiagnosisAlgorithmsHelpers.memoize_sat(seed, cmap, sat_check)
+        return sat_check
 
     @staticmethod
     def check_sat_bit_optimized(seed, cmap: BitConstraintMap, cnf_prog: LogicProgram, seed_int: int=None):
@@ -32,14 +62,18 @@ class DiagnosisAlgorithmsHelpers:
         :param cmap: ConstraintMap Object
         :param cnf_prog: LogicProgram Object
         :param seed_int: Int representation of seed
-        :return: bool
+        :return: bool (None if seed already hit the solver limits, or hits them now)
         """
         cmap_inference = (cmap.check_sat(constraints=seed_int)) if (seed_int is not None) \
             else (cmap.check_sat(constraints=seed))
 
         if cmap_inference is not None:
             return cmap_inference
-        return cnf_prog.check_sat(constraints=seed)
+        if cmap.is_unknown(seed_int if seed_int is not None else seed):
+            return None
+        sat_check = cnf_prog.check_sat(constraints=seed)
+        DiagnosisAlgorithmsHelpers.memoize_sat(seed_int if seed_int is not None else seed, cmap, sat_check)
+        return sat_check
 
     @staticmethod
     def check_ambiguity(seed, cmap: ConstraintMap, cnf_prog: LogicProgram):
@@ -49,12 +83,16 @@ class DiagnosisAlgorithmsHelpers:
         :param seed: Set of constraints
         :param cmap: ConstraintMap Object
         :param cnf_prog: LogicProgram Object
-        :return: bool
+        :return: NodeAmbiguityType (None if seed already hit the solver limits, or hits them now)
         """
         cmap_inference = cmap.check_ambiguity(constraints=seed)
         if cmap_inference is not None:
             return cmap_inference
-        return cnf_prog.check_ambiguity(constraints=seed)
+        if cmap.is_unknown(seed):
+            return None
+        amb_check = cnf_prog.check_ambiguity(constraints=seed)
+        DiagnosisAlgorithmsHelpers.memoize_ambiguity(seed, cmap, amb_check)
+        return amb_check
 
     @staticmethod
     def check_ambiguity_bit_optimized(seed, cmap: BitConstraintMap, cnf_prog: LogicProgram, seed_int: int=None):
@@ -66,56 +104,75 @@ class DiagnosisAlgorithmsHelpers:
         :param cmap: ConstraintMap Object
         :param cnf_prog: LogicProgram Object
         :param seed_int: Int representation of seed
-        :return: bool
+        :return: NodeAmbiguityType (None if seed already hit the solver limits, or hits them now)
         """
         cmap_inference = (cmap.check_ambiguity(constraints=seed_int)) if (seed_int is not None) \
             else (cmap.check_ambiguity(constraints=seed))
         if cmap_inference is not None:
             return cmap_inference
-        return cnf_prog.check_ambiguity(constraints=seed)
-
-
-class DiagnosisAlgorithms:
+        if cmap.is_unknown(seed_int if seed_int is not None else seed):
+            return None
+        amb_check = cnf_prog.check_ambiguity(constraints=seed)
+        DiagnosisAlgorithmsHelpers.memoize_ambiguity(seed_int if seed_int is not None else seed, cmap, amb_check)
+        return amb_check
 
     @staticmethod
-    def marco(cmap: ConstraintMap, cnf_prog: LogicProgram, min_mss_to_find=np.infty, min_mus_to_find=np.infty):
+    def report_progress(cmap: BitConstraintMap, progress_callback, start_time, **found):
         """
-        To get the Minimal Unsatisfiable Constraint Subsets (MUSes) and Maximal Consistent Constraint Subsets (MSSes).
-        Will stop after finding min_mss_to_find MSSes and min_mus_to_find MUSes, if these many exist.
-        Stops once the map has been completely explored.
-        Based on: Fast, Flexible MUS Enumeration by Liffiton et. al.
-        (https://sun.iwu.edu/~mliffito/marco/)
-        :param cmap: A ConstraintMap object to explore
-        :param cnf_prog: A LogicProgram to find the MSSes and MUSes for
-        :param min_mss_to_find: Minimum number of MSSes to find. (default: infinity i.e. all)
-        :param min_mus_to_find: Minimum number of MUSes to find. (default: infinity i.e. all)
-        :return: (MUSes, MSSes) : both are lists, containing sets of constraint subsets
+        Call progress_callback (if any) with a dict describing how far the exploration of cmap got: 'explored', 'total',
+        'fraction', 'elapsed' and 'eta' (in seconds, extrapolated from the exploration rate so far; None until some
+        node is explored), 'levels' (the per-level counts, see BitConstraintMap.get_level_stats), along with the counts
+        passed as found (e.g. num_mus=...).
         """
+        if progress_callback is None:
+            return
+        total = 2 ** cmap.num_constraints
+        explored = cmap.get_num_explored()
+        elapsed = time.time() - start_time
+        progress_callback(dict(found, explored=explored, total=total, fraction=explored / total, elapsed=elapsed,
+                               eta=(elapsed * (total - explored) / explored) if explored > 0 else None,
+                               levels=cmap.get_level_stats()))
 
-        mus_es = []
-        mss_es = []
+    @staticmethod
+    def report_result(result_callback, result_type: str, result):
+        """
+        Call result_callback (if any) with a newly confirmed result.
+        :param result_type: 'MUS', 'MSS', 'MUAS' or 'MAS'
+        :param result: Set of constraints
+        """
+        if result_callback is not None:
+            result_callback(result_type, result)
 
-        seed = cmap.get_unexplored()
-        while (seed is not None) and ((len(mus_es) < min_mus_to_find) or (len(mss_es) < min_mss_to_find)):
+    @staticmethod
+    def get_limits(cnf_prog: LogicProgram):
+        return getattr(cnf_prog, 'timeout', None), getattr(cnf_prog, 'conflict_limit', None)
 
-            if DiagnosisAlgorithmsHelpers.check_sat(seed=seed, cmap=cmap, cnf_prog=cnf_prog):
-                mss = cmap.grow(seed, cnf_prog)
-                mss_es.append(mss)
-                cmap.block_down(mss)
-            else:  # if UNSATISFIABLE
-                mus = cmap.shrink(seed, cnf_prog)
-                mus_es.append(mus)
-                cmap.block_up(mus)
+    @staticmethod
+    def retry_unknown(cmap: ConstraintMap, cnf_prog: LogicProgram, retry_limit_factor=2):
+        """
+        Reopen the nodes that hit the solver limits and relax the cnf_prog's limits by retry_limit_factor, so that
+        they can be evaluated again.
+        :param cmap: ConstraintMap Object
+        :param cnf_prog: LogicProgram Object
+        :param retry_limit_factor: Factor to multiply the timeout and the conflict limit by
+        :return: bool, whether any node was reopened
+        """
+        if len(cmap.reopen_unknown()) <= 0:
+            return False
+        timeout, conflict_limit = DiagnosisAlgorithmsHelpers.get_limits(cnf_prog)
+        if timeout is not None:
+            cnf_prog.timeout = timeout * retry_limit_factor
+        if conflict_limit is not None:
+            cnf_prog.conflict_limit = int(conflict_limit * retry_limit_factor)
+        return True
 
-            seed = cmap.get_unexplored()
 
-        return mus_es, mss_es
+class DiagnosisAlgorithms:
 
     @staticmethod
-    def marco_bit_optimized(cmap: BitConstraintMap, cnf_prog: LogicProgram, min_mss_to_find=np.infty,
-                            min_mus_to_find=np.infty):
+    def marco(cmap: ConstraintMap, cnf_prog: LogicProgram, min_mss_to_find=math.inf, min_mus_to_find=math.inf,
+              max_retries=1, retry_limit_factor=2, return_unknown=False, seed_strategy: SeedStrategy=None):
         """
-        Bit optimized version of the MARCO algorithm.
         To get the Minimal Unsatisfiable Constraint Subsets (MUSes) and Maximal Consistent Constraint Subsets (MSSes).
         Will stop after finding min_mss_to_find MSSes and min_mus_to_find MUSes, if these many exist.
         Stops once the map has been completely explored.
@@ -125,34 +182,73 @@ class DiagnosisAlgorithms:
         :param cnf_prog: A LogicProgram to find the MSSes and MUSes for
         :param min_mss_to_find: Minimum number of MSSes to find. (default: infinity i.e. all)
         :param min_mus_to_find: Minimum number of MUSes to find. (default: infinity i.e. all)
+        :param max_retries: Number of extra rounds for the nodes that hit the cnf_prog's solver limits (see
+                            LogicProgram.set_limits), with the limits multiplied by retry_limit_factor every round
+        :param retry_limit_factor: Factor to relax the solver limits by, for every retry round
+        :param return_unknown: Also return the nodes that are still unresolved once the retries are exhausted
+        :param seed_strategy: (Optional) SeedStrategy picking the seeds (default: RandomSeed, any unexplored node)
         :return: (MUSes, MSSes) : both are lists, containing sets of constraint subsets
+                 (MUSes, MSSes, Unknown) if return_unknown
         """
 
         mus_es = []
         mss_es = []
 
-        seed, seed_int = cmap.get_unexplored(return_seed_int=True)  # OPT1
+        limits = DiagnosisAlgorithmsHelpers.get_limits(cnf_prog)
+        num_retries = 0
+        strategy = seed_strategy if seed_strategy is not None else RandomSeed()
+        strategy.start({'MUS': min_mus_to_find, 'MSS': min_mss_to_find})
+
+        seed = strategy.get_seed(cmap)
         while (seed is not None) and ((len(mus_es) < min_mus_to_find) or (len(mss_es) < min_mss_to_find)):
 
-            if DiagnosisAlgorithmsHelpers.check_sat_bit_optimized(seed=seed, seed_int=seed_int, cmap=cmap,
-                                                                  cnf_prog=cnf_prog):
-                mss, mss_int = cmap.grow(seed=seed, cnf_prog=cnf_prog, seed_int=seed_int, return_mss_int=True)  # OPT2
-                mss_es.append(mss)
-                cmap.block_down(constraints=mss, constraints_int=mss_int)  # OPT3
+            sat_check = DiagnosisAlgorithmsHelpers.check_sat(seed=seed, cmap=cmap, cnf_prog=cnf_prog)
+            if sat_check is None:  # Hit the solver limits, retried later
+                cmap.block_unknown(seed)
+            elif sat_check:
+                mss = seed if strategy.extremal == 'max' else cmap.grow(seed, cnf_prog)
+                if cmap.has_unknown_children(mss):  # Not confirmed maximal, retried later
+                    cmap.update_num_pws(mss, num_pws=1, num_pws_eval_type=NumPWSType.atleast)
+                    cmap.block_down(mss, strict=True)
+                    cmap.block_unknown(mss)
+                else:
+                    mss_es.append(mss)
+                    if strategy.extremal == 'max':  # Taken as is, recorded as grow would
+                        cmap.record_extremal('MSS', mss)
+                    strategy.update('MSS', mss)
+                    cmap.block_down(mss)
             else:  # if UNSATISFIABLE
-                mus, mus_int = cmap.shrink(seed=seed, cnf_prog=cnf_prog, seed_int=seed_int, return_mus_int=True)  # OPT2
-                mus_es.append(mus)
-                cmap.block_up(constraints=mus, constraints_int=mus_int)  # OPT3
-
-            seed, seed_int = cmap.get_unexplored(return_seed_int=True)  # OPT1
-
+                mus = seed if strategy.extremal == 'min' else cmap.shrink(seed, cnf_prog)
+                if cmap.has_unknown_parents(mus):  # Not confirmed minimal, retried later
+                    cmap.update_num_pws(mus, num_pws=0, num_pws_eval_type=NumPWSType.exact)
+                    cmap.block_up(mus, strict=True)
+                    cmap.block_unknown(mus)
+                else:
+                    mus_es.append(mus)
+                    if strategy.extremal == 'min':  # Taken as is, recorded as shrink would
+                        cmap.record_extremal('MUS', mus)
+                    strategy.update('MUS', mus)
+                    cmap.block_up(mus)
+
+            seed = strategy.get_seed(cmap)
+            if (seed is None) and (num_retries < max_retries) and \
+                    DiagnosisAlgorithmsHelpers.retry_unknown(cmap, cnf_prog, retry_limit_factor=retry_limit_factor):
+                num_retries += 1
+                seed = strategy.get_seed(cmap)
+
+        if num_retries > 0:
+            cnf_prog.timeout, cnf_prog.conflict_limit = limits
+        if return_unknown:
+            return mus_es, mss_es, cmap.get_unknown()
         return mus_es, mss_es
 
     @staticmethod
-    def marco_plus(cmap: ConstraintMap, cnf_prog: LogicProgram, min_mss_to_find=np.infty, min_mus_to_find=np.infty):
+    def marco_bit_optimized(cmap: BitConstraintMap, cnf_prog: LogicProgram, min_mss_to_find=math.inf,
+                            min_mus_to_find=math.inf, max_retries=1, retry_limit_factor=2, return_unknown=False,
+                            progress_callback=None, result_callback=None, seed_strategy: SeedStrategy=None):
         """
+        Bit optimized version of the MARCO algorithm.
         To get the Minimal Unsatisfiable Constraint Subsets (MUSes) and Maximal Consistent Constraint Subsets (MSSes).
-        This algorithm is best for finding few MSSes, since it tries biggest subsets first.
         Will stop after finding min_mss_to_find MSSes and min_mus_to_find MUSes, if these many exist.
         Stops once the map has been completely explored.
         Based on: Fast, Flexible MUS Enumeration by Liffiton et. al.
@@ -161,69 +257,117 @@ class DiagnosisAlgorithms:
         :param cnf_prog: A LogicProgram to find the MSSes and MUSes for
         :param min_mss_to_find: Minimum number of MSSes to find. (default: infinity i.e. all)
         :param min_mus_to_find: Minimum number of MUSes to find. (default: infinity i.e. all)
+        :param max_retries: Number of extra rounds for the nodes that hit the cnf_prog's solver limits (see
+                            LogicProgram.set_limits), with the limits multiplied by retry_limit_factor every round
+        :param retry_limit_factor: Factor to relax the solver limits by, for every retry round
+        :param return_unknown: Also return the nodes that are still unresolved once the retries are exhausted
+        :param progress_callback: (Optional) Function to call after every step with the progress so far, see
+                                  DiagnosisAlgorithmsHelpers.report_progress
+        :param result_callback: (Optional) Function to call with (type, result) as soon as a result is confirmed, e.g.
+                                ('MUS', {constraints}). For streaming the results out.
+        :param seed_strategy: (Optional) SeedStrategy picking the seeds (default: RandomSeed, any unexplored node)
         :return: (MUSes, MSSes) : both are lists, containing sets of constraint subsets
+                 (MUSes, MSSes, Unknown) if return_unknown
         """
 
         mus_es = []
         mss_es = []
 
-        seed = cmap.get_unexplored_max()
-        while (seed is not None) and ((len(mus_es) < min_mus_to_find) or (len(mss_es) < min_mss_to_find)):
-
-            if DiagnosisAlgorithmsHelpers.check_sat(seed=seed, cmap=cmap, cnf_prog=cnf_prog):
-                mss = seed
-                mss_es.append(mss)
-                cmap.block_down(mss)
-            else:  # if Unsatisfiable
-                mus = cmap.shrink(seed, cnf_prog)
-                mus_es.append(mus)
-                cmap.block_up(mus)
+        limits = DiagnosisAlgorithmsHelpers.get_limits(cnf_prog)
+        num_retries = 0
+        start_time = time.time()
+        strategy = seed_strategy if seed_strategy is not None else RandomSeed()
+        strategy.start({'MUS': min_mus_to_find, 'MSS': min_mss_to_find})
 
-            seed = cmap.get_unexplored_max()
+        seed, seed_int = strategy.get_seed(cmap, return_seed_int=True)  # OPT1
+        while (seed is not None) and ((len(mus_es) < min_mus_to_find) or (len(mss_es) < min_mss_to_find)):
 
+            sat_check = DiagnosisAlgorithmsHelpers.check_sat_bit_optimized(seed=seed, seed_int=seed_int, cmap=cmap,
+                                                                           cnf_prog=cnf_prog)
+            if sat_check is None:  # Hit the solver limits, retried later
+                cmap.block_unknown(seed_int)
+            elif sat_check:
+                if strategy.extremal == 'max':
+                    mss, mss_int = seed, seed_int
+                else:
+                    mss, mss_int = cmap.grow(seed=seed, cnf_prog=cnf_prog, seed_int=seed_int,
+                                             return_mss_int=True)  # OPT2
+                if cmap.has_unknown_children(mss_int):  # Not confirmed maximal, retried later
+                    cmap.update_num_pws(mss_int, num_pws=1, num_pws_eval_type=NumPWSType.atleast)
+                    cmap.block_down(constraints=mss, constraints_int=mss_int, strict=True)  # OPT3
+                    cmap.block_unknown(mss_int)
+                else:
+                    mss_es.append(mss)
+                    if strategy.extremal == 'max':  # Taken as is, recorded as grow would
+                        cmap.record_extremal('MSS', mss_int)
+                    strategy.update('MSS', mss)
+                    DiagnosisAlgorithmsHelpers.report_result(result_callback, 'MSS', mss)
+                    cmap.block_down(constraints=mss, constraints_int=mss_int)  # OPT3
+            else:  # if UNSATISFIABLE
+                if strategy.extremal == 'min':
+                    mus, mus_int = seed, seed_int
+                else:
+                    mus, mus_int = cmap.shrink(seed=seed, cnf_prog=cnf_prog, seed_int=seed_int,
+                                               return_mus_int=True)  # OPT2
+                if cmap.has_unknown_parents(mus_int):  # Not confirmed minimal, retried later
+                    cmap.update_num_pws(mus_int, num_pws=0, num_pws_eval_type=NumPWSType.exact)
+                    cmap.block_up(constraints=mus, constraints_int=mus_int, strict=True)  # OPT3
+                    cmap.block_unknown(mus_int)
+                else:
+                    mus_es.append(mus)
+                    if strategy.extremal == 'min':  # Taken as is, recorded as shrink would
+                        cmap.record_extremal('MUS', mus_int)
+                    strategy.update('MUS', mus)
+                    DiagnosisAlgorithmsHelpers.report_result(result_callback, 'MUS', mus)
+                    cmap.block_up(constraints=mus, constraints_int=mus_int)  # OPT3
+
+            DiagnosisAlgorithmsHelpers.report_progress(cmap, progress_callback, start_time, num_mus=len(mus_es),
+                                                       num_mss=len(mss_es))
+
+            seed, seed_int = strategy.get_seed(cmap, return_seed_int=True)  # OPT1
+            if (seed is None) and (num_retries < max_retries) and \
+                    DiagnosisAlgorithmsHelpers.retry_unknown(cmap, cnf_prog, retry_limit_factor=retry_limit_factor):
+                num_retries += 1
+                seed, seed_int = strategy.get_seed(cmap, return_seed_int=True)  # OPT1
+
+        if num_retries > 0:
+            cnf_prog.timeout, cnf_prog.conflict_limit = limits
+        if return_unknown:
+            return mus_es, mss_es, cmap.get_unknown()
         return mus_es, mss_es
 
     @staticmethod
-    def marco_plus_bit_optimized(cmap: BitConstraintMap, cnf_prog: LogicProgram, min_mss_to_find=np.infty,
-                                 min_mus_to_find=np.infty):
+    def marco_plus(cmap: ConstraintMap, cnf_prog: LogicProgram, min_mss_to_find=math.inf, min_mus_to_find=math.inf,
+                   max_retries=1, retry_limit_factor=2, return_unknown=False):
         """
-        Bit optimized version of the MARCO PLUS algorithm.
-        To get the Minimal Unsatisfiable Constraint Subsets (MUSes) and Maximal Consistent Constraint Subsets (MSSes).
+        MARCO w/ the biggest subsets tried first (the LargestFirst seed strategy), see marco.
         This algorithm is best for finding few MSSes, since it tries biggest subsets first.
-        Will stop after finding min_mss_to_find MSSes and min_mus_to_find MUSes, if these many exist.
-        Stops once the map has been completely explored.
-        Based on: Fast, Flexible MUS Enumeration by Liffiton et. al.
-        (https://sun.iwu.edu/~mliffito/marco/)
-        :param cmap: A ConstraintMap object to explore
-        :param cnf_prog: A LogicProgram to find the MSSes and MUSes for
-        :param min_mss_to_find: Minimum number of MSSes to find. (default: infinity i.e. all)
-        :param min_mus_to_find: Minimum number of MUSes to find. (default: infinity i.e. all)
-        :return: (MUSes, MSSes) : both are lists, containing sets of constraint subsets
         """
+        return DiagnosisAlgorithms.marco(cmap, cnf_prog, min_mss_to_find=min_mss_to_find,
+                                         min_mus_to_find=min_mus_to_find, max_retries=max_retries,
+                                         retry_limit_factor=retry_limit_factor, return_unknown=return_unknown,
+                                         seed_strategy=LargestFirst())
 
-        mus_es = []
-        mss_es = []
-
-        seed, seed_int = cmap.get_unexplored_max(return_seed_int=True)  # OPT1
-        while (seed is not None) and ((len(mus_es) < min_mus_to_find) or (len(mss_es) < min_mss_to_find)):
-
-            if DiagnosisAlgorithmsHelpers.check_sat_bit_optimized(seed=seed, seed_int=seed_int, cmap=cmap,
-                                                                  cnf_prog=cnf_prog):
-                mss, mss_int = seed, seed_int  # OPT2
-                mss_es.append(mss)
-                cmap.block_down(constraints=mss, constraints_int=mss_int)  # OPT3
-            else:  # if Unsatisfiable
-                mus, mus_int = cmap.shrink(seed=seed, cnf_prog=cnf_prog, seed_int=seed_int, return_mus_int=True)  # OPT2
-                mus_es.append(mus)
-                cmap.block_up(constraints=mus, constraints_int=mus_int)  # OPT3
-
-            seed, seed_int = cmap.get_unexplored_max(return_seed_int=True)  # OPT1
-
-        return mus_es, mss_es
+    @staticmethod
+    def marco_plus_bit_optimized(cmap: BitConstraintMap, cnf_prog: LogicProgram, min_mss_to_find=math.inf,
+                                 min_mus_to_find=math.inf, max_retries=1, retry_limit_factor=2,
+                                 return_unknown=False,
+                                 progress_callback=None, result_callback=None):
+        """
+        Bit optimized version of the MARCO PLUS algorithm, see marco_plus and marco_bit_optimized.
+        This algorithm is best for finding few MSSes, since it tries biggest subsets first.
+        """
+        return DiagnosisAlgorithms.marco_bit_optimized(cmap, cnf_prog, min_mss_to_find=min_mss_to_find,
+                                                       min_mus_to_find=min_mus_to_find, max_retries=max_retries,
+                                                       retry_limit_factor=retry_limit_factor,
+                                                       return_unknown=return_unknown,
+                                                       progress_callback=progress_callback,
+                                                       result_callback=result_callback, seed_strategy=LargestFirst())
 
     @staticmethod
-    def marco_ambiguous(cmap: ConstraintMap, cnf_prog: LogicProgram, min_mas_to_find=np.infty,
-                        min_muas_to_find=np.infty):
+    def marco_ambiguous(cmap: ConstraintMap, cnf_prog: LogicProgram, min_mas_to_find=math.inf,
+                        min_muas_to_find=math.inf, max_retries=1, retry_limit_factor=2, return_unknown=False,
+                        seed_strategy: SeedStrategy=None):
         """
         To get the Minimal Unambiguous Constraint Subsets (MUASes) and Maximal Ambiguous Constraint Subsets (MASes).
         MUAS: Set of constraints such that they produce a unique solution and removing any constraints would
@@ -238,36 +382,83 @@ class DiagnosisAlgorithms:
         :param cnf_prog: A LogicProgram to find the MSSes and MUSes for
         :param min_mas_to_find: Minimum number of MASes to find. (default: infinity i.e. all)
         :param min_muas_to_find: Minimum number of MUASes to find. (default: infinity i.e. all)
+        :param max_retries: Number of extra rounds for the nodes that hit the cnf_prog's solver limits (see
+                            LogicProgram.set_limits), with the limits multiplied by retry_limit_factor every round
+        :param retry_limit_factor: Factor to relax the solver limits by, for every retry round
+        :param return_unknown: Also return the nodes that are still unresolved once the retries are exhausted
+        :param seed_strategy: (Optional) SeedStrategy picking the seeds (default: RandomSeed, any unexplored node)
         :return: (MUASes, MASes) : both are lists, containing sets of constraint subsets
+                 (MUASes, MASes, Unknown) if return_unknown
         """
 
         muas_es = []  # Minimal Unambiguous Subsets
         mas_es = []   # Maximal Ambiguous Subsets
 
-        seed = cmap.get_unexplored()
+        limits = DiagnosisAlgorithmsHelpers.get_limits(cnf_prog)
+        num_retries = 0
+        strategy = seed_strategy if seed_strategy is not None else RandomSeed()
+        strategy.start({'MUAS': min_muas_to_find, 'MAS': min_mas_to_find})
+
+        seed = strategy.get_seed(cmap)
         while (seed is not None) and ((len(muas_es) < min_muas_to_find) or (len(mas_es) < min_mas_to_find)):
 
             amb_check = DiagnosisAlgorithmsHelpers.check_ambiguity(seed=seed, cmap=cmap, cnf_prog=cnf_prog)
 
-            if amb_check == NodeAmbiguityType.unambiguous:
-                muas = cmap.shrink_unambiguous(seed, cnf_prog)
-                muas_es.append(muas)
-                cmap.block_up(muas)
+            if amb_check is None:  # Hit the solver limits, retried later
+                cmap.block_unknown(seed)
+            elif amb_check == NodeAmbiguityType.unambiguous:
+                muas = seed if strategy.extremal == 'min' else cmap.shrink_unambiguous(seed, cnf_prog)
+                if cmap.has_unknown_parents(muas):  # Not confirmed minimal, retried later
+                    cmap.update_num_pws(muas, num_pws=1, num_pws_eval_type=NumPWSType.exact)
+                    cmap.block_up(muas, strict=True)
+                    cmap.block_unknown(muas)
+                else:
+                    muas_es.append(muas)
+                    if strategy.extremal == 'min':  # Taken as is, recorded as shrink_unambiguous would
+                        cmap.record_extremal('MUAS', muas)
+                    strategy.update('MUAS', muas)
+                    cmap.block_up(muas)
             elif amb_check == NodeAmbiguityType.ambiguous:
-                mas = cmap.grow_ambiguous(seed, cnf_prog)
-                mas_es.append(mas)
-                cmap.block_down(mas)
+                mas = seed if strategy.extremal == 'max' else cmap.grow_ambiguous(seed, cnf_prog)
+                if cmap.has_unknown_children(mas):  # Not confirmed maximal, retried later
+                    cmap.update_num_pws(mas, num_pws=2, num_pws_eval_type=NumPWSType.atleast)
+                    cmap.block_down(mas, strict=True)
+                    cmap.block_unknown(mas)
+                else:
+                    mas_es.append(mas)
+                    if strategy.extremal == 'max':  # Taken as is, recorded as grow_ambiguous would
+                        cmap.record_extremal('MAS', mas)
+                    strategy.update('MAS', mas)
+                    cmap.block_down(mas)
             else:  # amb_check == NodeAmbiguityType.unsat
-                mus = cmap.shrink(seed, cnf_prog)
-                cmap.block_up(mus)
-
-            seed = cmap.get_unexplored()
-
+                mus = seed if strategy.extremal == 'min' else cmap.shrink(seed, cnf_prog)
+                if cmap.has_unknown_parents(mus):  # Not confirmed minimal, retried later
+                    cmap.update_num_pws(mus, num_pws=0, num_pws_eval_type=NumPWSType.exact)
+                    cmap.block_up(mus, strict=True)
+                    cmap.block_unknown(mus)
+                else:
+                    if strategy.extremal == 'min':  # Taken as is, recorded as shrink would
+                        cmap.record_extremal('MUS', mus)
+                    cmap.block_up(mus)
+
+            seed = strategy.get_seed(cmap)
+            if (seed is None) and (num_retries < max_retries) and \
+                    DiagnosisAlgorithmsHelpers.retry_unknown(cmap, cnf_prog, retry_limit_factor=retry_limit_factor):
+                num_retries += 1
+                seed = strategy.get_seed(cmap)
+
+        if num_retries > 0:
+            cnf_prog.timeout, cnf_prog.conflict_limit = limits
+        if return_unknown:
+            return muas_es, mas_es, cmap.get_unknown()
         return muas_es, mas_es
 
     @staticmethod
-    def marco_ambiguous_bit_optimized(cmap: BitConstraintMap, cnf_prog: LogicProgram, min_mas_to_find=np.infty,
-                                      min_muas_to_find=np.infty):
+    def marco_ambiguous_bit_optimized(cmap: BitConstraintMap, cnf_prog: LogicProgram, min_mas_to_find=math.inf,
+                                      min_muas_to_find=math.inf, max_retries=1, retry_limit_factor=2,
+                                      return_unknown=False,
+                                      progress_callback=None, result_callback=None,
+                                      seed_strategy: SeedStrategy=None):
         """
         Bit optimized version of the MARCO AMBIGUOUS algorithm.
         To get the Minimal Unambiguous Constraint Subsets (MUASes) and Maximal Ambiguous Constraint Subsets (MASes).
@@ -283,124 +474,207 @@ class DiagnosisAlgorithms:
         :param cnf_prog: A LogicProgram to find the MSSes and MUSes for
         :param min_mas_to_find: Minimum number of MASes to find. (default: infinity i.e. all)
         :param min_muas_to_find: Minimum number of MUASes to find. (default: infinity i.e. all)
+        :param max_retries: Number of extra rounds for the nodes that hit the cnf_prog's solver limits (see
+                            LogicProgram.set_limits), with the limits multiplied by retry_limit_factor every round
+        :param retry_limit_factor: Factor to relax the solver limits by, for every retry round
+        :param return_unknown: Also return the nodes that are still unresolved once the retries are exhausted
+        :param progress_callback: (Optional) Function to call after every step with the progress so far, see
+                                  DiagnosisAlgorithmsHelpers.report_progress
+        :param result_callback: (Optional) Function to call with (type, result) as soon as a result is confirmed, e.g.
+                                ('MUS', {constraints}). For streaming the results out.
+        :param seed_strategy: (Optional) SeedStrategy picking the seeds (default: RandomSeed, any unexplored node)
         :return: (MUASes, MASes) : both are lists, containing sets of constraint subsets
+                 (MUASes, MASes, Unknown) if return_unknown
         """
 
         muas_es = []  # Minimal Unambiguous Subsets
         mas_es = []   # Maximal Ambiguous Subsets
 
-        seed, seed_int = cmap.get_unexplored(return_seed_int=True)  # OPT1
+        limits = DiagnosisAlgorithmsHelpers.get_limits(cnf_prog)
+        num_retries = 0
+        start_time = time.time()
+        strategy = seed_strategy if seed_strategy is not None else RandomSeed()
+        strategy.start({'MUAS': min_muas_to_find, 'MAS': min_mas_to_find})
+
+        seed, seed_int = strategy.get_seed(cmap, return_seed_int=True)  # OPT1
         while (seed is not None) and ((len(muas_es) < min_muas_to_find) or (len(mas_es) < min_mas_to_find)):
 
             amb_check = DiagnosisAlgorithmsHelpers.check_ambiguity_bit_optimized(seed=seed, seed_int=seed_int,
                                                                                  cmap=cmap, cnf_prog=cnf_prog)
 
-            if amb_check == NodeAmbiguityType.unambiguous:
-                # OPT2
-                muas, muas_int = cmap.shrink_unambiguous(seed, cnf_prog, seed_int=seed_int, return_muas_int=True)
-                muas_es.append(muas)
-                cmap.block_up(constraints=muas, constraints_int=muas_int)  # OPT3
+            if amb_check is None:  # Hit the solver limits, retried later
+                cmap.block_unknown(seed_int)
+            elif amb_check == NodeAmbiguityType.unambiguous:
+                if strategy.extremal == 'min':
+                    muas, muas_int = seed, seed_int
+                else:
+                    # OPT2
+                    muas, muas_int = cmap.shrink_unambiguous(seed, cnf_prog, seed_int=seed_int, return_muas_int=True)
+                if cmap.has_unknown_parents(muas_int):  # Not confirmed minimal, retried later
+                    cmap.update_num_pws(muas_int, num_pws=1, num_pws_eval_type=NumPWSType.exact)
+                    cmap.block_up(constraints=muas, constraints_int=muas_int, strict=True)  # OPT3
+                    cmap.block_unknown(muas_int)
+                else:
+                    muas_es.append(muas)
+                    if strategy.extremal == 'min':  # Taken as is, recorded as shrink_unambiguous would
+                        cmap.record_extremal('MUAS', muas_int)
+                    strategy.update('MUAS', muas)
+                    DiagnosisAlgorithmsHelpers.report_result(result_callback, 'MUAS', muas)
+                    cmap.block_up(constraints=muas, constraints_int=muas_int)  # OPT3
             elif amb_check == NodeAmbiguityType.ambiguous:
-                mas, mas_int = cmap.grow_ambiguous(seed, cnf_prog, seed_int=seed_int, return_mas_int=True)  # OPT2
-                mas_es.append(mas)
-                cmap.block_down(constraints=mas, constraints_int=mas_int)  # OPT3
+                if strategy.extremal == 'max':
+                    mas, mas_int = seed, seed_int
+                else:
+                    mas, mas_int = cmap.grow_ambiguous(seed, cnf_prog, seed_int=seed_int, return_mas_int=True)  # OPT2
+                if cmap.has_unknown_children(mas_int):  # Not confirmed maximal, retried later
+                    cmap.update_num_pws(mas_int, num_pws=2, num_pws_eval_type=NumPWSType.atleast)
+                    cmap.block_down(constraints=mas, constraints_int=mas_int, strict=True)  # OPT3
+                    cmap.block_unknown(mas_int)
+                else:
+                    mas_es.append(mas)
+                    if strategy.extremal == 'max':  # Taken as is, recorded as grow_ambiguous would
+                        cmap.record_extremal('MAS', mas_int)
+                    strategy.update('MAS', mas)
+                    DiagnosisAlgorithmsHelpers.report_result(result_callback, 'MAS', mas)
+                    cmap.block_down(constraints=mas, constraints_int=mas_int)  # OPT3
             else:  # amb_check == NodeAmbiguityType.unsat
-                mus, mus_int = cmap.shrink(seed, cnf_prog, seed_int=seed_int, return_mus_int=True)  # OPT2
-                cmap.block_up(constraints=mus, constraints_int=mus_int)  # OPT3
-
-            seed, seed_int = cmap.get_unexplored(return_seed_int=True)  # OPT1
-
+                if strategy.extremal == 'min':
+                    mus, mus_int = seed, seed_int
+                else:
+                    mus, mus_int = cmap.shrink(seed, cnf_prog, seed_int=seed_int, return_mus_int=True)  # OPT2
+                if cmap.has_unknown_parents(mus_int):  # Not confirmed minimal, retried later
+                    cmap.update_num_pws(mus_int, num_pws=0, num_pws_eval_type=NumPWSType.exact)
+                    cmap.block_up(constraints=mus, constraints_int=mus_int, strict=True)  # OPT3
+                    cmap.block_unknown(mus_int)
+                else:
+                    if strategy.extremal == 'min':  # Taken as is, recorded as shrink would
+                        cmap.record_extremal('MUS', mus_int)
+                    cmap.block_up(constraints=mus, constraints_int=mus_int)  # OPT3
+
+            DiagnosisAlgorithmsHelpers.report_progress(cmap, progress_callback, start_time, num_muas=len(muas_es),
+                                                       num_mas=len(mas_es))
+
+            seed, seed_int = strategy.get_seed(cmap, return_seed_int=True)  # OPT1
+            if (seed is None) and (num_retries < max_retries) and \
+                    DiagnosisAlgorithmsHelpers.retry_unknown(cmap, cnf_prog, retry_limit_factor=retry_limit_factor):
+                num_retries += 1
+                seed, seed_int = strategy.get_seed(cmap, return_seed_int=True)  # OPT1
+
+        if num_retries > 0:
+            cnf_prog.timeout, cnf_prog.conflict_limit = limits
+        if return_unknown:
+            return muas_es, mas_es, cmap.get_unknown()
         return muas_es, mas_es
 
     @staticmethod
-    def marco_ambiguous_plus(cmap: ConstraintMap, cnf_prog: LogicProgram, min_mas_to_find=np.infty,
-                             min_muas_to_find=np.infty):
+    def marco_ambiguous_plus(cmap: ConstraintMap, cnf_prog: LogicProgram, min_mas_to_find=math.inf,
+                             min_muas_to_find=math.inf, max_retries=1, retry_limit_factor=2,
+                             return_unknown=False):
         """
-        To get the Minimal Unambiguous Constraint Subsets (MUASes) and Maximal Ambiguous Constraint Subsets (MASes).
+        MARCO AMBIGUOUS w/ the biggest subsets tried first (the LargestFirst seed strategy), see marco_ambiguous.
         This algorithm is best for finding few MASes, since it tries biggest subsets first.
-        MUAS: Set of constraints such that they produce a unique solution and removing any constraints would
-        increase the number of solutions.
-        MAS: Set of constraints such that they have multiple (> 1) solutions and adding any constraint would
-        make it either unambiguous (unique solution) or unsatisfiable (no solution)
-        Will stop after finding min_mas_to_find MASes and min_muas_to_find MUASes, if these many exist.
-        Stops once the map has been completely explored.
-        Based on the algorithm in: Fast, Flexible MUS Enumeration by Liffiton et. al.
-        (https://sun.iwu.edu/~mliffito/marco/)
-        :param cmap: A ConstraintMap object to explore
-        :param cnf_prog: A LogicProgram to find the MSSes and MUSes for
-        :param min_mas_to_find: Minimum number of MASes to find. (default: infinity i.e. all)
-        :param min_muas_to_find: Minimum number of MUASes to find. (default: infinity i.e. all)
-        :return: (MUASes, MASes) : both are lists, containing sets of constraint subsets
         """
-
-        muas_es = []  # Minimal Unambiguous Subsets
-        mas_es = []  # Maximal Ambiguous Subsets
-
-        seed = cmap.get_unexplored_max()
-        while (seed is not None) and ((len(muas_es) < min_muas_to_find) or (len(mas_es) < min_mas_to_find)):
-
-            amb_check = DiagnosisAlgorithmsHelpers.check_ambiguity(seed=seed, cmap=cmap, cnf_prog=cnf_prog)
-
-            if amb_check == NodeAmbiguityType.unambiguous:
-                muas = cmap.shrink_unambiguous(seed, cnf_prog)
-                muas_es.append(muas)
-                cmap.block_up(muas)
-            elif amb_check == NodeAmbiguityType.ambiguous:
-                mas = seed
-                mas_es.append(mas)
-                cmap.block_down(mas)
-            else:  # amb_check == NodeAmbiguityType.unsat
-                mus = cmap.shrink(seed, cnf_prog)
-                cmap.block_up(mus)
-
-            seed = cmap.get_unexplored_max()
-
-        return muas_es, mas_es
+        return DiagnosisAlgorithms.marco_ambiguous(cmap, cnf_prog, min_mas_to_find=min_mas_to_find,
+                                                   min_muas_to_find=min_muas_to_find, max_retries=max_retries,
+                                                   retry_limit_factor=retry_limit_factor,
+                                                   return_unknown=return_unknown, seed_strategy=LargestFirst())
 
     @staticmethod
-    def marco_ambiguous_plus_bit_optimized(cmap: BitConstraintMap, cnf_prog: LogicProgram, min_mas_to_find=np.infty,
-                                           min_muas_to_find=np.infty):
+    def marco_ambiguous_plus_bit_optimized(cmap: BitConstraintMap, cnf_prog: LogicProgram, min_mas_to_find=math.inf,
+                                           min_muas_to_find=math.inf, max_retries=1, retry_limit_factor=2,
+                                           return_unknown=False,
+                                           progress_callback=None, result_callback=None):
         """
-        Bit optimized version of the MARCO AMBIGUOUS PLUS algorithm.
-        To get the Minimal Unambiguous Constraint Subsets (MUASes) and Maximal Ambiguous Constraint Subsets (MASes).
+        Bit optimized version of the MARCO AMBIGUOUS PLUS algorithm, see marco_ambiguous_plus and
+        marco_ambiguous_bit_optimized.
         This algorithm is best for finding few MASes, since it tries biggest subsets first.
-        MUAS: Set of constraints such that they produce a unique solution and removing any constraints would
-        increase the number of solutions.
-        MAS: Set of constraints such that they have multiple (> 1) solutions and adding any constraint would
-        make it either unambiguous (unique solution) or unsatisfiable (no solution)
-        Will stop after finding min_mas_to_find MASes and min_muas_to_find MUASes, if these many exist.
-        Stops once the map has been completely explored.
-        Based on the algorithm in: Fast, Flexible MUS Enumeration by Liffiton et. al.
-        (https://sun.iwu.edu/~mliffito/marco/)
-        :param cmap: A ConstraintMap object to explore
+        """
+        return DiagnosisAlgorithms.marco_ambiguous_bit_optimized(cmap, cnf_prog, min_mas_to_find=min_mas_to_find,
+                                                                 min_muas_to_find=min_muas_to_find,
+                                                                 max_retries=max_retries,
+                                                                 retry_limit_factor=retry_limit_factor,
+                                                                 return_unknown=return_unknown,
+                                                                 progress_callback=progress_callback,
+                                                                 result_callback=result_callback,
+                                                                 seed_strategy=LargestFirst())
+
+    @staticmethod
+    def brute_force_bit_optimized(cmap: BitConstraintMap, cnf_prog: LogicProgram, check_ambiguity=False):
+        """
+        Evaluate the whole lattice with a single LogicProgram.get_sat_activation_patterns call, fill the cmap with the
+        status of every node and derive the MUSes and MSSes (and the MUASes and MASes) from them.
+        Cheaper than MARCO for small numbers of constraints (upto ~12), but materialises all 2^n nodes.
+        :param cmap: A BitConstraintMap object to fill
         :param cnf_prog: A LogicProgram to find the MSSes and MUSes for
-        :param min_mas_to_find: Minimum number of MASes to find. (default: infinity i.e. all)
-        :param min_muas_to_find: Minimum number of MUASes to find. (default: infinity i.e. all)
-        :return: (MUASes, MASes) : both are lists, containing sets of constraint subsets
+        :param check_ambiguity: Count upto 2 solutions per node to find the MUASes and MASes as well
+        :return: (MUSes, MSSes, MUASes, MASes) : all are lists, containing sets of constraint subsets. MUASes and MASes
+                 are empty unless check_ambiguity is True. Nodes that hit the solver limits are marked unknown (and left
+                 unexplored). The candidates next to them are not reported, but tentatively blocked (see
+                 BitConstraintMap.block_unknown), so they show up in get_unknown too.
         """
 
+        patterns = cnf_prog.get_sat_activation_patterns(cmap.constraints, count_upto=2 if check_ambiguity else 1)
+        num_pws = {cmap.constraint_set_to_int(pattern): count for pattern, count in patterns.items()}
+        unknown = set([n for n, count in num_pws.items() if count is None])
+        num_pws = {n: count for n, count in num_pws.items() if count is not None}
+        all_nodes = range(2 ** cmap.num_constraints)
+
+        cmap.satisfiable_set.update(num_pws.keys())
+        cmap.unsatisfiable_set.update([n for n in all_nodes if (n not in num_pws) and (n not in unknown)])
+        if check_ambiguity:
+            for n, count in num_pws.items():
+                if count >= 2:
+                    cmap.ambiguous_set.add(n)
+                else:
+                    cmap.update_num_pws(n, num_pws=1, num_pws_eval_type=NumPWSType.exact)
+        cmap.unexplored_set.clear()
+        cmap.unexplored_set.update(unknown)
+        cmap.explored_set.update([n for n in all_nodes if n not in unknown])
+        for n in unknown:
+            cmap.mark_unknown(n)
+
+        undecided = set([])  # Candidates next to unknown nodes
+        mus_es = []
+        mss_es = []
         muas_es = []  # Minimal Unambiguous Subsets
-        mas_es = []  # Maximal Ambiguous Subsets
-
-        seed, seed_int = cmap.get_unexplored_max(return_seed_int=True)  # OPT1
-        while (seed is not None) and ((len(muas_es) < min_muas_to_find) or (len(mas_es) < min_mas_to_find)):
-
-            amb_check = DiagnosisAlgorithmsHelpers.check_ambiguity_bit_optimized(seed=seed, seed_int=seed_int,
-                                                                                 cmap=cmap, cnf_prog=cnf_prog)
-
-            if amb_check == NodeAmbiguityType.unambiguous:
-                # OPT2
-                muas, muas_int = cmap.shrink_unambiguous(seed, cnf_prog, seed_int=seed_int, return_muas_int=True)
-                muas_es.append(muas)
-                cmap.block_up(constraints=muas, constraints_int=muas_int)  # OPT3
-            elif amb_check == NodeAmbiguityType.ambiguous:
-                mas, mas_int = seed, seed_int  # OPT2
-                mas_es.append(mas)
-                cmap.block_down(constraints=mas, constraints_int=mas_int)  # OPT3
-            else:  # amb_check == NodeAmbiguityType.unsat
-                mus, mus_int = cmap.shrink(seed, cnf_prog, seed_int=seed_int, return_mus_int=True)  # OPT2
-                cmap.block_up(constraints=mus, constraints_int=mus_int)  # OPT3
-
-            seed, seed_int = cmap.get_unexplored_max(return_seed_int=True)  # OPT1
+        mas_es = []   # Maximal Ambiguous Subsets
 
-        return muas_es, mas_es
+        for n in all_nodes:
+            if n in unknown:
+                continue
+            parents = PowersetBitLib.get_parents(n, cmap.num_constraints)
+            children = PowersetBitLib.get_children(n, cmap.num_constraints)
+            if n in num_pws:
+                if all(c not in num_pws for c in children):
+                    if any(c in unknown for c in children):
+                        undecided.add(n)
+                    else:
+                        cmap.maximal_satisfiable_constraint_subsets.add(n)
+                        mss_es.append(set(cmap.int_to_constraint_set(n)))
+                if check_ambiguity:
+                    if (num_pws[n] >= 2) and all(num_pws.get(c, 0) < 2 for c in children):
+                        if any(c in unknown for c in children):
+                            undecided.add(n)
+                        else:
+                            cmap.maximal_ambiguous_constraint_subsets.add(n)
+                            mas_es.append(set(cmap.int_to_constraint_set(n)))
+                    elif (num_pws[n] == 1) and all((p in unknown) or (num_pws.get(p, 0) >= 2) for p in parents):
+                        if any(p in unknown for p in parents):
+                            undecided.add(n)
+                        else:
+                            cmap.minimal_unambiguous_constraint_subsets.add(n)
+                            muas_es.append(set(cmap.int_to_constraint_set(n)))
+            elif all((p in num_pws) or (p in unknown) for p in parents):
+                if any(p in unknown for p in parents):
+                    undecided.add(n)
+                else:
+                    cmap.minimal_unsatisfiable_constraint_subsets.add(n)
+                    mus_es.append(set(cmap.int_to_constraint_set(n)))
+
+        cmap.explored_set.difference_update(undecided)
+        for n in undecided:
+            cmap.block_unknown(n)
+        cmap.log_change('all')
+        cmap.recount_level_stats()
+
+        return mus_es, mss_es, muas_es, mas_es
@@ -0,0 +1,343 @@
+from .BitConstraintMap import BitConstraintMap
+from .ConstraintEquivalence import ConstraintEquivalence
+from .ASP_LogicProgram import ASP_LogicProgram
+from .DiagnosisSetup import DiagnosisSetup
+from .PartitionedDiagnosis import PartitionedDiagnosis
+from .SeedStrategies import SeedStrategies
+from .SharedBitConstraintMap import SharedBitConstraintMap
+import argparse
+import functools
+import json
+import math
+import multiprocessing
+import os
+import sys
+import time
+
+
+class _TimeBudgetExhausted_(Exception):
+    pass
+
+
+class DiagnosisCLI:
+    """
+    Command-line runner for the diagnosis algorithms. Every result is written out as a JSON line as soon as the
+    algorithm confirms it, along with periodic 'stats' records, so that batch pipelines can consume the output as a
+    stream. Record types:
+        {"type": "start", "algorithm": ..., "constraints": [...]}  ("equivalent": [[...], ...] w/ --collapse-equivalent,
+                                                                    "partition_bits": ... w/ --workers > 1)
+        {"type": "MUS" / "MSS" / "MUAS" / "MAS", "constraints": [...]}     ("seeded": true for the --warm-start ones)
+        {"type": "stats", "explored": ..., "total": ..., "fraction": ..., "elapsed": ..., "eta": ..., "num_...": ...,
+         "levels": [{"level": ..., "explored": ..., "sat": ..., ...}, ...]}
+        {"type": "done", "num_...": ..., "unknown": [[...], ...], "elapsed": ..., "stopped": null / "time_budget"}
+    """
+
+    @staticmethod
+    def get_arg_parser():
+        parser = argparse.ArgumentParser(prog='pwe-diagnose',
+                                         description="Find the MUSes/MSSes (or MUASes/MASes) of a logic program with "
+                                                     "switchable constraints. Results are streamed out as JSON lines.")
+        parser.add_argument('encoding', help="Encoding file, w/o any of the constraints turned on")
+        parser.add_argument('-c', '--constraints', nargs='+', default=[], help="Constraints to switch on/off")
+        parser.add_argument('--constraints-file', help="File with the constraints, one per line")
+        parser.add_argument('-k', '--constraint-keyword', default='comp',
+                            help="Arity 1 relation name to use to turn constraints on (default: comp)")
+        parser.add_argument('-r', '--reasoner', default='clingo', choices=['clingo', 'dlv'])
+        parser.add_argument('-a', '--algorithm', default='marco', choices=sorted(DiagnosisSetup.ALGORITHMS.keys()))
+        parser.add_argument('--projection', nargs='+', default=None,
+                            help="Relations (name/arity) to project the solutions onto, for the ambiguity checks")
+        parser.add_argument('--num-minimal', type=int, default=None,
+                            help="Stop once these many MUSes (MUASes) are found (default: all)")
+        parser.add_argument('--num-maximal', type=int, default=None,
+                            help="Stop once these many MSSes (MASes) are found (default: all)")
+        parser.add_argument('--time-budget', type=float, default=None,
+                            help="Stop after these many seconds, keeping the results found so far")
+        parser.add_argument('--timeout', type=float, default=None, help="Per solver call timeout, in seconds")
+        parser.add_argument('--conflict-limit', type=int, default=None, help="Per solver call conflict limit")
+        parser.add_argument('--max-retries', type=int, default=1,
+                            help="Extra rounds for the nodes that hit the solver limits (default: 1)")
+        parser.add_argument('--retry-limit-factor', type=float, default=2,
+                            help="Factor to relax the solver limits by, for every retry round (default: 2)")
+        parser.add_argument('--seed-strategy', default=None, choices=sorted(SeedStrategies.STRATEGIES.keys()),
+                            help="Order to try the subsets in (default: random; the _plus algorithms are always "
+                                 "largest first)")
+        parser.add_argument('--random-seed', type=int, default=None,
+                            help="Seed for the random seed strategy, for reproducible runs")
+        parser.add_argument('--stats-interval', type=float, default=1.0,
+                            help="Seconds between 'stats' records (default: 1, 0 --> after every step)")
+        parser.add_argument('--warm-start', default=None,
+                            help="JSON lines output of an earlier run, to start from its results (re-checked against "
+                                 "the encoding, unless --trust-warm-start)")
+        parser.add_argument('--trust-warm-start', action='store_true',
+                            help="Use the --warm-start results as they are, w/o re-checking them")
+        parser.add_argument('--collapse-equivalent', action='store_true',
+                            help="Detect equivalent constraints and diagnose over one constraint per class, the "
+                                 "results are expanded back out")
+        parser.add_argument('--workers', type=int, default=1,
+                            help="Number of worker processes, > 1 splits the lattice into sublattices explored in "
+                                 "parallel (default: 1)")
+        parser.add_argument('--shared-map', action='store_true',
+                            help="W/ --workers > 1, have the workers explore the whole lattice together, on a map in "
+                                 "shared memory, instead of splitting it into sublattices")
+        parser.add_argument('--partition-bits', type=int, default=None,
+                            help="Number of constraints to fix per sublattice, for 2^k of them (default: enough for "
+                                 "4 per worker)")
+        parser.add_argument('--partition-dir', default=None,
+                            help="Job directory of the sublattices, e.g. shared w/ the workers of other machines "
+                                 "(python -m PWE_Diagnostic_Lattice_Tool.PartitionedDiagnosis worker DIR). Waits "
+                                 "for all the sublattices to be done (default: a temporary one)")
+        parser.add_argument('-o', '--output', default=None, help="File to write the JSON lines to (default: stdout)")
+        return parser
+
+    @staticmethod
+    def read_constraints(args):
+        constraints = list(args.constraints)
+        if args.constraints_file is not None:
+            with open(args.constraints_file, 'r') as f:
+                constraints.extend([line.strip() for line in f if line.strip() != ''])
+        # Keep the order they were given in, drop the duplicates
+        return list(dict.fromkeys(constraints))
+
+    @staticmethod
+    def read_warm_start(path: str, constraints: list):
+        """
+        :param path: JSON lines output of an earlier run
+        :param constraints: Constraints of this run, results with other constraints are dropped
+        :return: Dict: 'MUS', 'MSS', 'MUAS', 'MAS' --> list of constraint sets
+        """
+        constraints = set(constraints)
+        known = {'MUS': [], 'MSS': [], 'MUAS': [], 'MAS': []}
+        with open(path, 'r') as f:
+            for line in f:
+                if line.strip() == '':
+                    continue
+                record = json.loads(line)
+                if (record.get('type') in known) and constraints.issuperset(record['constraints']):
+                    known[record['type']].append(set(record['constraints']))
+        return known
+
+    @staticmethod
+    def write_record(out, record: dict):
+        out.write(json.dumps(record) + "\n")
+        out.flush()
+
+    @staticmethod
+    def get_program(args, constraints: list, encoding: str=None):
+        """
+        :param encoding: (Optional) The encoding itself, instead of reading it from the args.encoding file
+        :return: ASP_LogicProgram for the parsed args, w/ their solver limits (see DiagnosisSetup.get_program)
+        """
+        if encoding is None:
+            with open(args.encoding, 'r') as f:
+                encoding = f.read()
+        return DiagnosisSetup.get_program(encoding, constraints, vars(args))
+
+    @staticmethod
+    def run(args, out, result_callback=None, prog: ASP_LogicProgram=None):
+        """
+        Run the diagnosis described by the parsed args, writing the JSON lines to out.
+        :param result_callback: (Optional) Also called with (type, result) for every result, see
+                                DiagnosisAlgorithms.marco_bit_optimized
+        :param prog: (Optional) Program to use, instead of building one from the args (e.g. an already grounded one)
+        :return: The 'done' record
+        """
+        constraints = DiagnosisCLI.read_constraints(args)
+        if prog is None:
+            prog = DiagnosisCLI.get_program(args, constraints)
+        # Always set, prog might carry the limits of an earlier run
+        prog.set_limits(timeout=args.timeout, conflict_limit=args.conflict_limit)
+        groups = None
+        if args.collapse_equivalent:
+            prog = ConstraintEquivalence.get_grouped_program(prog, ConstraintEquivalence.get_classes(prog, constraints))
+            groups = prog.groups
+        cmap = BitConstraintMap(constraints if groups is None else prog.constraints)
+
+        algorithm, result_types, budget_args = DiagnosisSetup.ALGORITHMS[args.algorithm]
+        budgets = [args.num_minimal, args.num_maximal]
+        if any(b is not None for b in budgets):
+            # Only the given budgets count, the other kind of results are found along the way
+            budgets = [b if b is not None else 0 for b in budgets]
+        else:
+            budgets = [math.inf, math.inf]
+
+        start_time = time.time()
+        last_stats = [None]
+        num_found = dict([(t, 0) for t in result_types])
+
+        def on_result(result_type, result):
+            expanded = [result] if groups is None else ConstraintEquivalence.expand_result(result, result_type, groups)
+            for r in expanded:
+                num_found[result_type] += 1
+                DiagnosisCLI.write_record(out, {'type': result_type, 'constraints': sorted(r)})
+                if result_callback is not None:
+                    result_callback(result_type, r)
+
+        def on_progress(progress):
+            now = time.time()
+            if (last_stats[0] is None) or (now - last_stats[0] >= args.stats_interval):
+                last_stats[0] = now
+                record = {'type': 'stats'}
+                record.update(progress)
+                DiagnosisCLI.write_record(out, record)
+            if (args.time_budget is not None) and (now - start_time >= args.time_budget):
+                raise _TimeBudgetExhausted_()
+
+        start = {'type': 'start', 'algorithm': args.algorithm, 'constraints': constraints}
+        if groups is not None:
+            start['equivalent'] = [members for members in groups.values() if len(members) > 1]
+        DiagnosisCLI.write_record(out, start)
+        if (args.warm_start is not None) and (groups is not None):
+            print("--warm-start is ignored with --collapse-equivalent.", file=sys.stderr)
+        elif args.warm_start is not None:
+            known = DiagnosisCLI.read_warm_start(args.warm_start, constraints)
+            seeded = cmap.seed_map(mss_es=known['MSS'], mus_es=known['MUS'], mas_es=known['MAS'],
+                                   muas_es=known['MUAS'], cnf_prog=None if args.trust_warm_start else prog,
+                                   search='sat' if result_types == ('MUS', 'MSS') else 'ambiguity')
+            for result_type in result_types:
+                for n in seeded[result_type]['accepted']:
+                    num_found[result_type] += 1
+                    DiagnosisCLI.write_record(out, {'type': result_type, 'seeded': True,
+                                                    'constraints': sorted(cmap.int_to_constraint_set(n))})
+            # The seeded results count towards the budgets
+            budgets = [max(b - num_found[t], 0) for b, t in zip(budgets, result_types)]
+        kwargs = dict(zip(budget_args, budgets))
+        if (args.seed_strategy is not None) and args.algorithm.endswith('_plus'):
+            print("--seed-strategy is ignored with {}, it is always largest first.".format(args.algorithm),
+                  file=sys.stderr)
+        elif (args.seed_strategy is not None) or (args.random_seed is not None):
+            kwargs['seed_strategy'] = SeedStrategies.get_strategy(args.seed_strategy or 'random', seed=args.random_seed)
+        stopped = None
+        try:
+            _, _, unknown = algorithm(cmap, prog, max_retries=args.max_retries,
+                                      retry_limit_factor=args.retry_limit_factor, return_unknown=True,
+                                      progress_callback=on_progress, result_callback=on_result, **kwargs)
+        except _TimeBudgetExhausted_:
+            stopped = 'time_budget'
+            unknown = cmap.get_unknown()
+
+        done = {'type': 'done'}
+        done.update([('num_{}'.format(t.lower()), n) for t, n in num_found.items()])
+        if groups is not None:
+            unknown = [prog.get_members(u) for u in unknown]
+        done.update({'unknown': [sorted(u) for u in unknown], 'explored': cmap.get_num_explored(),
+                     'total': 2 ** cmap.num_constraints, 'elapsed': time.time() - start_time, 'stopped': stopped})
+        DiagnosisCLI.write_record(out, done)
+        return done
+
+    @staticmethod
+    def _get_worker_options_(args, mode: str):
+        """
+        Print a message for the options the worker processes can't honour.
+        :return: Dict of the options they can, see PartitionedDiagnosis.create_jobs
+        """
+        for option in ['num_minimal', 'num_maximal', 'time_budget', 'warm_start']:
+            if getattr(args, option) is not None:
+                print("--{} is ignored {}.".format(option.replace('_', '-'), mode), file=sys.stderr)
+        if args.collapse_equivalent:
+            print("--collapse-equivalent is ignored {}.".format(mode), file=sys.stderr)
+        if (args.seed_strategy is not None) and args.algorithm.endswith('_plus'):
+            print("--seed-strategy is ignored with {}, it is always largest first.".format(args.algorithm),
+                  file=sys.stderr)
+        return dict([(k, getattr(args, k)) for k in ['constraint_keyword', 'reasoner', 'projection', 'timeout',
+                                                     'conflict_limit', 'max_retries', 'retry_limit_factor',
+                                                     'seed_strategy', 'random_seed']])
+
+    @staticmethod
+    def run_shared(args, out):
+        """
+        Run the diagnosis w/ args.workers processes sharing one map (see SharedBitConstraintMap). The results are
+        written out as soon as a worker confirms them.
+        :return: The 'done' record
+        """
+        constraints = DiagnosisCLI.read_constraints(args)
+        options = DiagnosisCLI._get_worker_options_(args, 'w/ --shared-map')
+        _, result_types, _ = DiagnosisSetup.ALGORITHMS[args.algorithm]
+        num_found = dict([(t, 0) for t in result_types])
+
+        def on_result(result_type, result):
+            num_found[result_type] += 1
+            DiagnosisCLI.write_record(out, {'type': result_type, 'constraints': sorted(result)})
+
+        start_time = time.time()
+        DiagnosisCLI.write_record(out, {'type': 'start', 'algorithm': args.algorithm, 'constraints': constraints})
+        shared = SharedBitConstraintMap.run(functools.partial(DiagnosisCLI.get_program, args, constraints),
+                                            constraints, algorithm=args.algorithm, num_workers=args.workers,
+                                            options=options, result_callback=on_result)
+        done = {'type': 'done'}
+        done.update([('num_{}'.format(t.lower()), n) for t, n in num_found.items()])
+        done.update({'unknown': [sorted(u) for u in shared['unknown']], 'explored': shared['explored'],
+                     'total': shared['total'], 'elapsed': time.time() - start_time, 'stopped': None})
+        DiagnosisCLI.write_record(out, done)
+        return done
+
+    @staticmethod
+    def run_partitioned(args, out):
+        """
+        Run the diagnosis over sublattices explored by args.workers processes (see PartitionedDiagnosis). The results
+        are only written out once they are all merged.
+        :return: The 'done' record
+        """
+        constraints = DiagnosisCLI.read_constraints(args)
+        options = DiagnosisCLI._get_worker_options_(args, 'when partitioning')
+        num_fixed = args.partition_bits
+        if num_fixed is None:
+            num_fixed = math.ceil(math.log2(max(args.workers, 1) * 4))
+        num_fixed = max(0, min(num_fixed, len(constraints)))
+        _, result_types, _ = DiagnosisSetup.ALGORITHMS[args.algorithm]
+
+        with open(args.encoding, 'r') as f:
+            options['encoding'] = f.read()
+
+        start_time = time.time()
+        DiagnosisCLI.write_record(out, {'type': 'start', 'algorithm': args.algorithm, 'constraints': constraints,
+                                        'partition_bits': num_fixed})
+        if args.partition_dir is None:
+            merged = PartitionedDiagnosis.run(None, constraints, num_fixed, algorithm=args.algorithm,
+                                              num_workers=args.workers, options=options)
+        else:
+            if not os.path.exists(os.path.join(args.partition_dir, 'job.json')):
+                PartitionedDiagnosis.create_jobs(args.partition_dir, constraints, num_fixed, algorithm=args.algorithm,
+                                                 options=options)
+            workers = [multiprocessing.Process(target=PartitionedDiagnosis.run_worker, args=(args.partition_dir,))
+                       for _ in range(args.workers)]
+            for worker in workers:
+                worker.start()
+            for worker in workers:
+                worker.join()
+            PartitionedDiagnosis.wait(args.partition_dir)
+            merged = PartitionedDiagnosis.merge(args.partition_dir)
+
+        for result_type in result_types:
+            for r in merged['results'][result_type]:
+                DiagnosisCLI.write_record(out, {'type': result_type, 'constraints': sorted(r)})
+        done = {'type': 'done'}
+        done.update([('num_{}'.format(t.lower()), len(merged['results'][t])) for t in result_types])
+        done.update({'unknown': [sorted(u) for u in merged['unknown']], 'explored': merged['explored'],
+                     'total': merged['total'], 'elapsed': time.time() - start_time, 'stopped': None})
+        DiagnosisCLI.write_record(out, done)
+        return done
+
+
+def main(argv=None):
+    parser = DiagnosisCLI.get_arg_parser()
+    args = parser.parse_args(argv)
+    if len(DiagnosisCLI.read_constraints(args)) == 0:
+        parser.error("No constraints given (--constraints / --constraints-file).")
+    run = DiagnosisCLI.run
+    if args.shared_map and (args.partition_dir is not None):
+        print("--partition-dir is ignored w/ --shared-map.", file=sys.stderr)
+    if args.shared_map and (args.workers > 1):
+        run = DiagnosisCLI.run_shared
+    elif (args.workers > 1) or (args.partition_dir is not None):
+        run = DiagnosisCLI.run_partitioned
+
+    if args.output is None:
+        run(args, sys.stdout)
+    else:
+        with open(args.output, 'w') as out:
+            run(args, out)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
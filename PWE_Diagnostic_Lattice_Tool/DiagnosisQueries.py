@@ -0,0 +1,205 @@
+from .BitConstraintMap import BitConstraintMap
+from .ConstraintMap import ConstraintMap
+from .DiagnosisAlgorithms import DiagnosisAlgorithmsHelpers
+from .LogicProgram import LogicProgram
+
+
+class DiagnosisQueries:
+    """
+    Targeted questions about the (SAT) lattice that stop as soon as the answer is known, instead of enumerating all the
+    MUSes and MSSes:
+        - relevance: is constraint c in some MUS (find_mus_containing / is_in_some_mus)
+        - necessity: is constraint c in every MSS (find_mss_without / is_in_every_mss). The MUSes and the complements
+          of the MSSes cover the same constraints, so c is in every MSS iff it is in no MUS
+        - the minimum cardinality MUS (get_minimum_mus)
+    The seeds are the smallest unexplored nodes (see get_unexplored_min, a #minimize for the ASPConstraintMap), only
+    the ones containing c for the relevance questions. The cmap is explored (and blocked) as by the marco functions and
+    the MUSes found are recorded in it, so it can be shared between queries (or come from a marco run), and whatever
+    they settle is never asked for again.
+    When the cnf_prog has solver limits (see LogicProgram.set_limits), the unresolved nodes are retried max_retries
+    times, with the limits relaxed by retry_limit_factor every round, as in the marco functions. The answers are only
+    definite if no unknown nodes are left.
+    """
+
+    @staticmethod
+    def _shrink_keeping_(seed, keep, cmap: ConstraintMap, cnf_prog: LogicProgram):
+        """
+        Shrink an UNSAT seed without ever removing the constraints in keep.
+        :return: UNSAT subset of seed, none of whose parents w/ all of keep is UNSAT (unless it is unknown)
+        """
+        seed = set(seed)
+        for c in [c for c in cmap.constraints if (c in seed) and (c not in keep)]:
+            if DiagnosisAlgorithmsHelpers.check_sat(seed=seed.difference({c}), cmap=cmap, cnf_prog=cnf_prog) is False:
+                seed.remove(c)
+        return seed
+
+    @staticmethod
+    def _get_mus_es_(cmap: ConstraintMap):
+        """
+        :return: List of the MUSes recorded in the cmap, as sets of constraints
+        """
+        if isinstance(cmap, BitConstraintMap):
+            return [set(cmap.int_to_constraint_set(n)) for n in cmap.minimal_unsatisfiable_constraint_subsets]
+        return [set(mus) for mus in cmap.minimal_unsatisfiable_constraint_subsets]
+
+    @staticmethod
+    def _record_mus_(mus, cmap: ConstraintMap, cnf_prog: LogicProgram):
+        """
+        Record a confirmed MUS in the cmap (through shrink, which finds nothing to remove), and block it up.
+        :return: The MUS
+        """
+        mus = cmap.shrink(mus, cnf_prog)
+        cmap.block_up(mus)
+        return mus
+
+    @staticmethod
+    def _explore_sat_seed_(seed, cmap: ConstraintMap, cnf_prog: LogicProgram):
+        mss = cmap.grow(seed, cnf_prog)
+        if cmap.has_unknown_children(mss):  # Not confirmed maximal, retried later
+            cmap.block_down(mss, strict=True)
+            cmap.block_unknown(mss)
+        else:
+            cmap.block_down(mss)
+
+    @staticmethod
+    def _retry_(cmap: ConstraintMap, cnf_prog: LogicProgram, num_retries, max_retries, retry_limit_factor):
+        """
+        :return: bool, whether another round can be started
+        """
+        return (num_retries < max_retries) and \
+            DiagnosisAlgorithmsHelpers.retry_unknown(cmap, cnf_prog, retry_limit_factor=retry_limit_factor)
+
+    @staticmethod
+    def find_mus_containing(cmap: ConstraintMap, cnf_prog: LogicProgram, constraint, max_retries=1,
+                            retry_limit_factor=2, return_unknown=False):
+        """
+        Find a MUS containing constraint, if there is one. Every seed contains the constraint:
+            - SAT seeds are grown into MSSes and blocked down, nothing below them is a MUS w/ the constraint
+            - UNSAT seeds are shrunk without removing the constraint, into a core. If the core w/o the constraint is
+              SAT, the core is a MUS. Else it is UNSAT, and no node above it can be a MUS w/ the constraint
+        Stops at the first MUS found (a MUS already recorded in the cmap is returned right away), or once every node
+        w/ the constraint is explored.
+        :param cmap: A ConstraintMap object to explore
+        :param cnf_prog: A LogicProgram
+        :param constraint: The constraint to find a MUS for
+        :param return_unknown: Also return the nodes that are still unresolved once the retries are exhausted
+        :return: MUS (set of constraints), None if no MUS contains the constraint
+                 (MUS, Unknown) if return_unknown
+        """
+        limits = DiagnosisAlgorithmsHelpers.get_limits(cnf_prog)
+        num_retries = 0
+        mus = next((m for m in DiagnosisQueries._get_mus_es_(cmap) if constraint in m), None)
+
+        seed = cmap.get_unexplored_min(required=[constraint]) if mus is None else None
+        while seed is not None:
+
+            sat_check = DiagnosisAlgorithmsHelpers.check_sat(seed=seed, cmap=cmap, cnf_prog=cnf_prog)
+            if sat_check is None:  # Hit the solver limits, retried later
+                cmap.block_unknown(seed)
+            elif sat_check:
+                DiagnosisQueries._explore_sat_seed_(seed, cmap, cnf_prog)
+            else:  # if Unsatisfiable
+                core = DiagnosisQueries._shrink_keeping_(seed, {constraint}, cmap, cnf_prog)
+                rest = core.difference({constraint})
+                rest_sat_check = DiagnosisAlgorithmsHelpers.check_sat(seed=rest, cmap=cmap, cnf_prog=cnf_prog)
+                if rest_sat_check is False:
+                    cmap.block_up(rest, strict=True)
+                elif (rest_sat_check is None) or cmap.has_unknown_parents(core):  # Not confirmed minimal
+                    cmap.block_up(core, strict=True)
+                    cmap.block_unknown(core)
+                else:
+                    mus = DiagnosisQueries._record_mus_(core, cmap, cnf_prog)
+                    break
+
+            seed = cmap.get_unexplored_min(required=[constraint])
+            if (seed is None) and DiagnosisQueries._retry_(cmap, cnf_prog, num_retries, max_retries,
+                                                           retry_limit_factor):
+                num_retries += 1
+                seed = cmap.get_unexplored_min(required=[constraint])
+
+        if num_retries > 0:
+            cnf_prog.timeout, cnf_prog.conflict_limit = limits
+        if return_unknown:
+            return mus, cmap.get_unknown()
+        return mus
+
+    @staticmethod
+    def is_in_some_mus(cmap: ConstraintMap, cnf_prog: LogicProgram, constraint, max_retries=1, retry_limit_factor=2):
+        """
+        :return: bool (None if it couldn't be determined within the solver limits)
+        """
+        mus, unknown = DiagnosisQueries.find_mus_containing(cmap, cnf_prog, constraint, max_retries=max_retries,
+                                                            retry_limit_factor=retry_limit_factor, return_unknown=True)
+        if mus is not None:
+            return True
+        return None if len(unknown) > 0 else False
+
+    @staticmethod
+    def find_mss_without(cmap: ConstraintMap, cnf_prog: LogicProgram, constraint, max_retries=1,
+                         retry_limit_factor=2):
+        """
+        Find an MSS that doesn't contain constraint, if there is one: a MUS w/ the constraint, grown from the MUS w/o
+        the constraint (which can never add it back).
+        :return: MSS (set of constraints), None if every MSS contains the constraint (or if it couldn't be determined
+                 within the solver limits). The MSS isn't confirmed maximal if it has unknown children.
+        """
+        mus = DiagnosisQueries.find_mus_containing(cmap, cnf_prog, constraint, max_retries=max_retries,
+                                                   retry_limit_factor=retry_limit_factor)
+        if mus is None:
+            return None
+        return cmap.grow(mus.difference({constraint}), cnf_prog)
+
+    @staticmethod
+    def is_in_every_mss(cmap: ConstraintMap, cnf_prog: LogicProgram, constraint, max_retries=1, retry_limit_factor=2):
+        """
+        :return: bool (None if it couldn't be determined within the solver limits)
+        """
+        in_some_mus = DiagnosisQueries.is_in_some_mus(cmap, cnf_prog, constraint, max_retries=max_retries,
+                                                      retry_limit_factor=retry_limit_factor)
+        return None if in_some_mus is None else not in_some_mus
+
+    @staticmethod
+    def get_minimum_mus(cmap: ConstraintMap, cnf_prog: LogicProgram, max_retries=1, retry_limit_factor=2,
+                        return_unknown=False):
+        """
+        Find a minimum cardinality MUS. Seeds are the smallest unexplored nodes, SAT ones are grown and blocked down.
+        No MUS is ever explored before it is found (and recorded in the cmap), so the first UNSAT seed is a MUS (all
+        its parents are below some MSS) and no unexplored MUS is smaller than it. Stops there, or once the seeds are
+        no smaller than the smallest recorded MUS. Unknown nodes can hide smaller MUSes, unless they are resolved by
+        the retries.
+        :param cmap: A ConstraintMap object to explore
+        :param cnf_prog: A LogicProgram
+        :param return_unknown: Also return the nodes that are still unresolved once the retries are exhausted
+        :return: MUS (set of constraints), None if there is no MUS (i.e. all the constraints together are SAT)
+                 (MUS, Unknown) if return_unknown
+        """
+        limits = DiagnosisAlgorithmsHelpers.get_limits(cnf_prog)
+        num_retries = 0
+        mus = min(DiagnosisQueries._get_mus_es_(cmap), key=len, default=None)
+
+        seed = cmap.get_unexplored_min()
+        while (seed is not None) and ((mus is None) or (len(seed) < len(mus))):
+
+            sat_check = DiagnosisAlgorithmsHelpers.check_sat(seed=seed, cmap=cmap, cnf_prog=cnf_prog)
+            if sat_check is None:  # Hit the solver limits, retried later
+                cmap.block_unknown(seed)
+            elif sat_check:
+                DiagnosisQueries._explore_sat_seed_(seed, cmap, cnf_prog)
+            elif cmap.has_unknown_parents(seed):  # Not confirmed minimal, retried later
+                cmap.block_up(seed, strict=True)
+                cmap.block_unknown(seed)
+            else:
+                mus = DiagnosisQueries._record_mus_(seed, cmap, cnf_prog)
+                break
+
+            seed = cmap.get_unexplored_min()
+            if (seed is None) and DiagnosisQueries._retry_(cmap, cnf_prog, num_retries, max_retries,
+                                                           retry_limit_factor):
+                num_retries += 1
+                seed = cmap.get_unexplored_min()
+
+        if num_retries > 0:
+            cnf_prog.timeout, cnf_prog.conflict_limit = limits
+        if return_unknown:
+            return mus, cmap.get_unknown()
+        return mus
@@ -0,0 +1,322 @@
+from .DiagnosisCLI import DiagnosisCLI
+from .DiagnosisSetup import DiagnosisSetup
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+import argparse
+import itertools
+import json
+import queue
+import sys
+import threading
+
+
+class DiagnosisJob:
+    """
+    A queued/running/finished diagnosis. The JSON lines written by DiagnosisCLI.run are kept as they come in, so that
+    any number of readers can stream them (from the start or from where they left off) while the job runs.
+    """
+
+    def __init__(self, job_id: str, options: dict):
+        self.job_id = job_id
+        self.options = options
+        self.status = 'queued'  # queued --> running --> done / failed
+        self.records = []
+        self.cond = threading.Condition()
+
+    def write(self, line: str):
+        line = line.strip()
+        if line == '':
+            return
+        with self.cond:
+            self.records.append(line)
+            self.cond.notify_all()
+
+    def flush(self):
+        pass
+
+    def set_status(self, status: str):
+        with self.cond:
+            self.status = status
+            self.cond.notify_all()
+
+    def is_finished(self):
+        return self.status in ['done', 'failed']
+
+    def iter_records(self, start: int=0):
+        """
+        :return: Generator over the JSON lines of the job, from the start-th one. Blocks until the job has written
+                 more of them, ends once the job is finished.
+        """
+        idx = start
+        while True:
+            with self.cond:
+                while (idx >= len(self.records)) and (not self.is_finished()):
+                    self.cond.wait()
+                new_records = self.records[idx:]
+                finished = self.is_finished()
+            for record in new_records:
+                yield record
+            idx += len(new_records)
+            if finished and (idx >= len(self.records)):
+                return
+
+    def get_summary(self):
+        with self.cond:
+            return {'job_id': self.job_id, 'status': self.status, 'num_records': len(self.records)}
+
+
+class DiagnosisService:
+    """
+    Long-running local diagnosis service. Jobs (encoding + constraints + DiagnosisCLI options) are queued and run by a
+    fixed pool of worker threads. Grounded programs are kept warm between jobs: a job on an encoding (with the same
+    constraints, keyword, reasoner and projection) that was seen before re-uses an idle grounded ASP_LogicProgram
+    instead of parsing and grounding it again. A program is only ever used by one job at a time.
+    HTTP API (JSON, bound to localhost by default):
+        POST /jobs                  Submit a job, returns {"job_id": ...}. With ?stream=1, streams its JSON lines.
+        GET  /jobs/<id>             Status of the job
+        GET  /jobs/<id>/results     Stream the JSON lines of the job (?start=N to skip the first N), until it's done
+        GET  /stats                 Queue, job and program cache counts
+    """
+
+    PROGRAM_OPTIONS = ['constraint_keyword', 'reasoner', 'projection']
+
+    def __init__(self, num_workers: int=2, max_idle_programs: int=16, max_finished_jobs: int=1000):
+        """
+        :param num_workers: Number of jobs that run at the same time
+        :param max_idle_programs: Number of grounded programs to keep warm (least recently used ones are dropped)
+        :param max_finished_jobs: Number of finished jobs to keep the results of
+        """
+        self.max_idle_programs = max_idle_programs
+        self.max_finished_jobs = max_finished_jobs
+        self.idle_programs = OrderedDict()  # program key --> list of idle ASP_LogicPrograms
+        self.num_idle_programs = 0
+        self.program_hits = 0
+        self.program_misses = 0
+        self.jobs = OrderedDict()  # job_id --> DiagnosisJob
+        self.job_ids = itertools.count(1)
+        self.job_queue = queue.Queue()
+        self.lock = threading.Lock()
+        self.workers = []
+        for _ in range(num_workers):
+            worker = threading.Thread(target=self._worker_loop_, daemon=True)
+            worker.start()
+            self.workers.append(worker)
+
+    @staticmethod
+    def get_job_args(options: dict):
+        """
+        :param options: Job options, named like the DiagnosisCLI long options (e.g. 'num_minimal', 'time_budget'),
+                        with 'encoding' holding the encoding itself and 'constraints' a list
+        :return: DiagnosisCLI args for the job
+        """
+        args = DiagnosisCLI.get_arg_parser().parse_args(['-'])
+        for k, v in options.items():
+            if hasattr(args, k):
+                setattr(args, k, v)
+        args.constraints = [str(c) for c in options.get('constraints', [])]
+        args.constraints_file = None
+        return args
+
+    @staticmethod
+    def validate_job(options):
+        """
+        :return: What's wrong with the job options, None if they're fine
+        """
+        if not isinstance(options, dict):
+            return "Job must be a JSON object."
+        if not isinstance(options.get('encoding'), str):
+            return "Job needs an 'encoding' (string)."
+        if (not isinstance(options.get('constraints'), list)) or (len(options['constraints']) == 0):
+            return "Job needs 'constraints' (non-empty list)."
+        if options.get('algorithm', 'marco') not in DiagnosisSetup.ALGORITHMS:
+            return "Unknown algorithm, choices: {}".format(", ".join(sorted(DiagnosisSetup.ALGORITHMS.keys())))
+        return None
+
+    def _get_program_key_(self, args):
+        projection = tuple(args.projection) if args.projection is not None else None
+        return args.encoding, tuple(DiagnosisCLI.read_constraints(args)), args.constraint_keyword, args.reasoner, \
+            projection
+
+    def _checkout_program_(self, args):
+        key = self._get_program_key_(args)
+        with self.lock:
+            programs = self.idle_programs.get(key)
+            if programs:
+                self.program_hits += 1
+                self.num_idle_programs -= 1
+                prog = programs.pop()
+                if len(programs) == 0:
+                    del self.idle_programs[key]
+                return key, prog
+            self.program_misses += 1
+        return key, DiagnosisCLI.get_program(args, DiagnosisCLI.read_constraints(args), encoding=args.encoding)
+
+    def _checkin_program_(self, key, prog):
+        with self.lock:
+            self.idle_programs.setdefault(key, []).append(prog)
+            self.idle_programs.move_to_end(key)
+            self.num_idle_programs += 1
+            while self.num_idle_programs > self.max_idle_programs:
+                oldest_key = next(iter(self.idle_programs))
+                self.idle_programs[oldest_key].pop(0)
+                if len(self.idle_programs[oldest_key]) == 0:
+                    del self.idle_programs[oldest_key]
+                self.num_idle_programs -= 1
+
+    def _worker_loop_(self):
+        while True:
+            job = self.job_queue.get()
+            if job is None:
+                return
+            self.run_job(job)
+
+    def run_job(self, job: DiagnosisJob):
+        job.set_status('running')
+        try:
+            args = self.get_job_args(job.options)
+            key, prog = self._checkout_program_(args)
+            DiagnosisCLI.run(args, job, prog=prog)
+        except Exception as e:
+            # The program is dropped, it might be in a bad state
+            DiagnosisCLI.write_record(job, {'type': 'error', 'message': "{}: {}".format(type(e).__name__, e)})
+            job.set_status('failed')
+            return
+        self._checkin_program_(key, prog)
+        job.set_status('done')
+
+    def submit(self, options: dict):
+        """
+        Queue a job, see get_job_args for the options.
+        :return: DiagnosisJob (None if the options are invalid)
+        """
+        error = self.validate_job(options)
+        if error is not None:
+            print(error)
+            return None
+        with self.lock:
+            job = DiagnosisJob(str(next(self.job_ids)), options)
+            self.jobs[job.job_id] = job
+            finished = [job_id for job_id, j in self.jobs.items() if j.is_finished()]
+            for job_id in finished[:max(len(finished) - self.max_finished_jobs, 0)]:
+                del self.jobs[job_id]
+        self.job_queue.put(job)
+        return job
+
+    def get_job(self, job_id: str):
+        with self.lock:
+            return self.jobs.get(job_id)
+
+    def get_stats(self):
+        with self.lock:
+            statuses = [job.status for job in self.jobs.values()]
+            return {'queued': self.job_queue.qsize(), 'workers': len(self.workers),
+                    'jobs': dict([(s, statuses.count(s)) for s in set(statuses)]),
+                    'idle_programs': self.num_idle_programs, 'program_hits': self.program_hits,
+                    'program_misses': self.program_misses}
+
+    def shutdown(self):
+        """
+        Stop the workers, once they are done with the jobs already queued.
+        """
+        for _ in self.workers:
+            self.job_queue.put(None)
+        for worker in self.workers:
+            worker.join()
+
+    def get_http_server(self, host: str='127.0.0.1', port: int=8765):
+        service = self
+
+        class Handler(_DiagnosisRequestHandler_):
+            pass
+        Handler.service = service
+        return ThreadingHTTPServer((host, port), Handler)
+
+    def serve(self, host: str='127.0.0.1', port: int=8765):
+        server = self.get_http_server(host, port)
+        print("Diagnosis service listening on http://{}:{}".format(*server.server_address[:2]), file=sys.stderr)
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
+
+
+class _DiagnosisRequestHandler_(BaseHTTPRequestHandler):
+
+    service = None  # Set by DiagnosisService.get_http_server
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json_(self, code, obj):
+        body = (json.dumps(obj) + "\n").encode('utf-8')
+        self.send_response(code)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _stream_job_(self, job: DiagnosisJob, start: int=0):
+        # No Content-Length, the end of the stream is the connection closing
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/x-ndjson')
+        self.send_header('Connection', 'close')
+        self.end_headers()
+        self.close_connection = True
+        try:
+            for record in job.iter_records(start):
+                self.wfile.write((record + "\n").encode('utf-8'))
+                self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            pass  # Client went away, the job keeps running
+
+    def do_POST(self):
+        url = urlparse(self.path)
+        if url.path.rstrip('/') != '/jobs':
+            return self._send_json_(404, {'error': "Not found."})
+        try:
+            options = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))).decode('utf-8'))
+        except ValueError:
+            return self._send_json_(400, {'error': "Body must be JSON."})
+        error = self.service.validate_job(options)
+        if error is not None:
+            return self._send_json_(400, {'error': error})
+        job = self.service.submit(options)
+        if parse_qs(url.query).get('stream', ['0'])[0] not in ['0', 'false']:
+            return self._stream_job_(job)
+        self._send_json_(202, job.get_summary())
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        parts = [p for p in url.path.split('/') if p != '']
+        if parts == ['stats']:
+            return self._send_json_(200, self.service.get_stats())
+        if (len(parts) in [2, 3]) and (parts[0] == 'jobs'):
+            job = self.service.get_job(parts[1])
+            if job is None:
+                return self._send_json_(404, {'error': "No such job."})
+            if len(parts) == 2:
+                return self._send_json_(200, job.get_summary())
+            if parts[2] == 'results':
+                return self._stream_job_(job, start=int(parse_qs(url.query).get('start', ['0'])[0]))
+        self._send_json_(404, {'error': "Not found."})
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='pwe-diagnose-service',
+                                     description="Local diagnosis service, keeps grounded programs warm across jobs.")
+    parser.add_argument('--host', default='127.0.0.1', help="Address to bind to (default: 127.0.0.1)")
+    parser.add_argument('--port', type=int, default=8765, help="Port to listen on (default: 8765)")
+    parser.add_argument('--workers', type=int, default=2, help="Number of jobs that run at the same time (default: 2)")
+    parser.add_argument('--max-idle-programs', type=int, default=16,
+                        help="Number of grounded programs to keep warm (default: 16)")
+    args = parser.parse_args(argv)
+
+    DiagnosisService(num_workers=args.workers, max_idle_programs=args.max_idle_programs).serve(args.host, args.port)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,44 @@
+from .ASP_LogicProgram import ASP_LogicProgram
+from .DiagnosisAlgorithms import DiagnosisAlgorithms
+
+
+class DiagnosisSetup:
+    """
+    What the diagnosis runners (DiagnosisCLI, HierarchicalDiagnosis, PartitionedDiagnosis, SharedBitConstraintMap)
+    share: the algorithms they can run, and how they build an ASP_LogicProgram from their options.
+    """
+
+    # algorithm --> (DiagnosisAlgorithms function, (result types), (budget args))
+    ALGORITHMS = {
+        'marco': (DiagnosisAlgorithms.marco_bit_optimized, ('MUS', 'MSS'), ('min_mus_to_find', 'min_mss_to_find')),
+        'marco_plus': (DiagnosisAlgorithms.marco_plus_bit_optimized, ('MUS', 'MSS'),
+                       ('min_mus_to_find', 'min_mss_to_find')),
+        'marco_ambiguous': (DiagnosisAlgorithms.marco_ambiguous_bit_optimized, ('MUAS', 'MAS'),
+                            ('min_muas_to_find', 'min_mas_to_find')),
+        'marco_ambiguous_plus': (DiagnosisAlgorithms.marco_ambiguous_plus_bit_optimized, ('MUAS', 'MAS'),
+                                 ('min_muas_to_find', 'min_mas_to_find')),
+    }
+
+    # Program option --> default, named like the DiagnosisCLI long options
+    PROGRAM_OPTIONS = {
+        'constraint_keyword': 'comp',
+        'reasoner': 'clingo',
+        'projection': None,
+        'timeout': None,
+        'conflict_limit': None,
+    }
+
+    @staticmethod
+    def get_program(encoding: str, constraints: list, options: dict=None):
+        """
+        :param encoding: The encoding, w/o any of the constraints turned on
+        :param options: (Optional) Dict w/ any of the PROGRAM_OPTIONS (the rest is ignored)
+        :return: ASP_LogicProgram over the constraints, w/ the solver limits of the options
+        """
+        options = options if options is not None else {}
+        options = dict([(k, options.get(k, default)) for k, default in DiagnosisSetup.PROGRAM_OPTIONS.items()])
+        prog = ASP_LogicProgram(encoding, constraint_keyword=options['constraint_keyword'],
+                                reasoner=options['reasoner'], constraints=constraints,
+                                projection=options['projection'])
+        prog.set_limits(timeout=options['timeout'], conflict_limit=options['conflict_limit'])
+        return prog
@@ -0,0 +1,70 @@
+from .LogicProgram import LogicProgram
+from .LatticeNode import NodeAmbiguityType
+
+
+class GroupedLogicProgram(LogicProgram):
+    """
+    A LogicProgram whose constraints are groups of the constraints of another one: turning a group on turns all of its
+    members on. The maps and the algorithms can be run on it as on any LogicProgram, over the (smaller) lattice of the
+    groups. The solver limits are the ones of the wrapped program.
+    """
+
+    def __init__(self, prog: LogicProgram, groups: dict, always_on=()):
+        """
+        :param prog: LogicProgram over the individual constraints
+        :param groups: Dict: group name --> list of the constraints (of prog) in the group
+        :param always_on: Constraints (of prog) that are on whatever the groups are, e.g. the fixed constraints of a
+                          sublattice (see PartitionedDiagnosis)
+        """
+        # Not calling LogicProgram.__init__, the limits are the wrapped program's (see the properties below)
+        self.prog = prog
+        self.groups = dict([(g, list(members)) for g, members in groups.items()])
+        self.constraints = list(self.groups.keys())
+        self.always_on = set(always_on)
+
+    @property
+    def timeout(self):
+        return self.prog.timeout
+
+    @timeout.setter
+    def timeout(self, timeout):
+        self.prog.timeout = timeout
+
+    @property
+    def conflict_limit(self):
+        return self.prog.conflict_limit
+
+    @conflict_limit.setter
+    def conflict_limit(self, conflict_limit):
+        self.prog.conflict_limit = conflict_limit
+
+    def set_limits(self, timeout: float=None, conflict_limit: int=None):
+        self.prog.set_limits(timeout=timeout, conflict_limit=conflict_limit)
+
+    def get_members(self, groups) -> set:
+        """
+        :param groups: Group names
+        :return: Set of the constraints in those groups (and the always_on ones)
+        """
+        members = set(self.always_on)
+        for g in groups:
+            members.update(self.groups[g])
+        return members
+
+    def check_sat(self, constraints) -> bool:
+        return self.prog.check_sat(self.get_members(constraints))
+
+    def check_ambiguity(self, constraints) -> NodeAmbiguityType:
+        return self.prog.check_ambiguity(self.get_members(constraints))
+
+    def get_num_solutions(self, constraints) -> int:
+        return self.prog.get_num_solutions(self.get_members(constraints))
+
+    def count_solutions(self, constraints, max_count: int=0) -> tuple:
+        return self.prog.count_solutions(self.get_members(constraints), max_count=max_count)
+
+    def check_sat_many(self, constraints_list: list) -> list:
+        return self.prog.check_sat_many([self.get_members(constraints) for constraints in constraints_list])
+
+    def check_ambiguity_many(self, constraints_list: list) -> list:
+        return self.prog.check_ambiguity_many([self.get_members(constraints) for constraints in constraints_list])
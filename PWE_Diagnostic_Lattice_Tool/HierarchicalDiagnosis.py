@@ -0,0 +1,117 @@
+from .BitConstraintMap import BitConstraintMap
+from .DiagnosisSetup import DiagnosisSetup
+from .GroupedLogicProgram import GroupedLogicProgram
+from .LogicProgram import LogicProgram
+
+
+class HierarchicalDiagnosis:
+    """
+    Coarse-to-fine diagnosis over user-defined groups of constraints (modules, rule families, ...):
+        1. group level: the results over the groups, turning a group on turns all of its members on (see
+           GroupedLogicProgram). The lattice has one node per set of groups, so the first answers come fast.
+        2. drill down: the fine MUSes (MUASes) behind a group level MUS (MUAS), only searching the constraints in its
+           groups. These are MUSes (MUASes) of the whole program, minimality only depends on the subsets.
+        3. (optional) everything else, on a map of the individual constraints warm started with the group level
+           results (see get_fine_map) and the drilled down ones, so the regions they settle aren't explored again.
+    Groups that never show up in a group level MUS (MUAS) are never drilled into.
+    """
+
+    @staticmethod
+    def get_search(algorithm: str):
+        """
+        :param algorithm: Key of DiagnosisSetup.ALGORITHMS
+        :return: 'sat' or 'ambiguity', see BitConstraintMap.seed_map
+        """
+        return 'sat' if DiagnosisSetup.ALGORITHMS[algorithm][1] == ('MUS', 'MSS') else 'ambiguity'
+
+    @staticmethod
+    def run_group_level(cnf_prog: LogicProgram, groups: dict, algorithm: str='marco', **kwargs):
+        """
+        :param groups: Dict: group name --> list of constraints
+        :param algorithm: Key of DiagnosisSetup.ALGORITHMS
+        :param kwargs: Passed on to the algorithm
+        :return: (group BitConstraintMap, dict: result type --> list of sets of group names)
+        """
+        func, result_types, _ = DiagnosisSetup.ALGORITHMS[algorithm]
+        grouped = GroupedLogicProgram(cnf_prog, groups)
+        gmap = BitConstraintMap(grouped.constraints)
+        results = func(gmap, grouped, **kwargs)
+        return gmap, dict(zip(result_types, results))
+
+    @staticmethod
+    def get_members(groups: dict, group_names):
+        """
+        :return: List of the constraints in the named groups, in group order
+        """
+        group_names = set(group_names)
+        return list(dict.fromkeys([c for g, members in groups.items() if g in group_names for c in members]))
+
+    @staticmethod
+    def drill_down(cnf_prog: LogicProgram, groups: dict, group_result, algorithm: str='marco', **kwargs):
+        """
+        Find the fine MUSes (MUASes) behind a group level MUS (MUAS), on the lattice of the constraints in its groups.
+        :param group_result: Set of group names
+        :return: List of MUSes (MUASes), sets of constraints
+        """
+        func, _, _ = DiagnosisSetup.ALGORITHMS[algorithm]
+        constraints = HierarchicalDiagnosis.get_members(groups, group_result)
+        return func(BitConstraintMap(constraints), cnf_prog, **kwargs)[0]
+
+    @staticmethod
+    def get_fine_map(gmap: BitConstraintMap, groups: dict, constraints: list=None, search: str='sat'):
+        """
+        Map of the individual constraints, with what the group level map found marked: a group level MSS (MAS) is a
+        SAT (ambiguous) node of the fine lattice and a group level MUS (MUAS) an UNSAT (unambiguous) one, see
+        BitConstraintMap.seed_statuses. Only the extremal sets of gmap are used, they imply the rest.
+        :param constraints: (Optional) Constraints of the fine map (default: all the members, in group order)
+        """
+        constraints = constraints if constraints is not None else HierarchicalDiagnosis.get_members(groups, groups)
+        fine_map = BitConstraintMap(constraints)
+
+        def to_fine(group_ints):
+            return [HierarchicalDiagnosis.get_members(groups, gmap.int_to_constraint_set(n)) for n in group_ints]
+
+        fine_map.seed_statuses(sat_nodes=to_fine(gmap.maximal_satisfiable_constraint_subsets),
+                               unsat_nodes=to_fine(gmap.minimal_unsatisfiable_constraint_subsets),
+                               ambiguous_nodes=to_fine(gmap.maximal_ambiguous_constraint_subsets),
+                               unambiguous_nodes=to_fine(gmap.minimal_unambiguous_constraint_subsets), search=search)
+        return fine_map
+
+    @staticmethod
+    def run(cnf_prog: LogicProgram, groups: dict, algorithm: str='marco', complete: bool=False,
+            result_callback=None):
+        """
+        :param groups: Dict: group name --> list of constraints
+        :param algorithm: Key of DiagnosisSetup.ALGORITHMS
+        :param complete: Also find all the fine results (step 3), not just the drilled down ones
+        :param result_callback: (Optional) Function to call with (level, type, result) as soon as a result is found,
+                                level being 'group' (result is a set of group names) or 'fine'
+        :return: Dict: 'group' / 'fine' --> dict: result type --> list of results
+        """
+        func, result_types, _ = DiagnosisSetup.ALGORITHMS[algorithm]
+        minimal_type = result_types[0]
+        search = HierarchicalDiagnosis.get_search(algorithm)
+
+        def report(level):
+            if result_callback is None:
+                return None
+            return lambda result_type, result: result_callback(level, result_type, result)
+
+        gmap, group_results = HierarchicalDiagnosis.run_group_level(cnf_prog, groups, algorithm,
+                                                                    result_callback=report('group'))
+        fine_results = dict([(t, []) for t in result_types])
+        seen = set([])
+        for group_result in group_results[minimal_type]:
+            for r in HierarchicalDiagnosis.drill_down(cnf_prog, groups, group_result, algorithm):
+                if frozenset(r) not in seen:
+                    seen.add(frozenset(r))
+                    fine_results[minimal_type].append(r)
+                    if result_callback is not None:
+                        result_callback('fine', minimal_type, r)
+
+        if complete:
+            fine_map = HierarchicalDiagnosis.get_fine_map(gmap, groups, search=search)
+            fine_map.seed_map(search=search, **{'{}_es'.format(minimal_type.lower()): fine_results[minimal_type]})
+            for result_type, found in zip(result_types, func(fine_map, cnf_prog, result_callback=report('fine'))):
+                fine_results[result_type].extend(found)
+        return {'group': group_results, 'fine': fine_results}
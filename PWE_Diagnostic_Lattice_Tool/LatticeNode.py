@@ -4,6 +4,7 @@ import enum
 class NodeEvalState(enum.Enum):
     unevaluated = 0
     evaluated = 1
+    unknown = 2  # Evaluation was attempted but hit the solver limits (timeout / conflict limit)
 
 
 class NumPWSType(enum.Enum):
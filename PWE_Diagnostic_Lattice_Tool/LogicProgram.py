@@ -1,10 +1,22 @@
-from .LatticeNode import NodeAmbiguityType
+from .LatticeNode import NodeAmbiguityType, NumPWSType
+import itertools
 
 
 class LogicProgram:
 
     def __init__(self):
-        pass
+        self.timeout = None
+        self.conflict_limit = None
+
+    def set_limits(self, timeout: float=None, conflict_limit: int=None):
+        """
+        Limit the effort spent on every query. A query that hits a limit is answered with None (check_sat,
+        check_ambiguity) instead of a result.
+        :param timeout: Maximum time (in seconds) per query. None --> no limit
+        :param conflict_limit: Maximum number of solver conflicts per query. None --> no limit
+        """
+        self.timeout = timeout
+        self.conflict_limit = conflict_limit
 
     def check_sat(self, constraints) -> bool:
         pass
@@ -19,3 +31,58 @@ class LogicProgram:
 
     def get_num_solutions(self, constraints) -> int:
         pass
+
+    def count_solutions(self, constraints, max_count: int=0) -> tuple:
+        """
+        Count the solutions, stopping at max_count. Subclasses that can stream the solutions (instead of
+        materialising all of them) should override this; the default relies on get_num_solutions.
+        :param constraints: Constraints to turn on
+        :param max_count: Stop counting after these many solutions (0 --> count all)
+        :return: (num_pws, NumPWSType.exact) or (max_count, NumPWSType.atleast) if the cap was hit
+        """
+        num_pws = self.get_num_solutions(constraints)
+        if (max_count > 0) and (num_pws > max_count):
+            return max_count, NumPWSType.atleast
+        return num_pws, NumPWSType.exact
+
+    def get_sat_activation_patterns(self, constraints: list, count_upto: int=1) -> dict:
+        """
+        Get every satisfiable activation pattern of the constraints, i.e. every satisfiable node of the powerset
+        lattice. Subclasses that can enumerate all the patterns in a single run should override this; the default
+        evaluates every subset one by one.
+        :param constraints: All the constraints that can be switched on/off
+        :param count_upto: Count the solutions of each pattern upto this number (1 --> SAT, 2 --> ambiguity)
+        :return: Dict: frozenset of the constraints turned on --> number of solutions (capped at count_upto), or None
+                 if evaluating the pattern hit the solver limits (see set_limits). Patterns that are not in the dict
+                 are UNSAT.
+        """
+        patterns = {}
+        for r in range(len(constraints) + 1):
+            for pattern in itertools.combinations(constraints, r):
+                if count_upto >= 2:
+                    amb_check = self.check_ambiguity(pattern)
+                    num_pws = amb_check.value if amb_check is not None else None
+                else:
+                    sat_check = self.check_sat(pattern)
+                    num_pws = (1 if sat_check else 0) if sat_check is not None else None
+                if (num_pws is None) or (num_pws > 0):
+                    patterns[frozenset(pattern)] = num_pws
+        return patterns
+
+    def check_sat_many(self, constraints_list: list) -> list:
+        """
+        Batched version of check_sat. Subclasses that can share work across queries (a single reasoner process,
+        a single grounding, etc.) should override this; the default simply loops.
+        :param constraints_list: List of constraint subsets
+        :return: List of bools, one per constraint subset (in the same order)
+        """
+        return [self.check_sat(constraints) for constraints in constraints_list]
+
+    def check_ambiguity_many(self, constraints_list: list) -> list:
+        """
+        Batched version of check_ambiguity. Subclasses that can share work across queries should override this;
+        the default simply loops.
+        :param constraints_list: List of constraint subsets
+        :return: List of NodeAmbiguityType, one per constraint subset (in the same order)
+        """
+        return [self.check_ambiguity(constraints) for constraints in constraints_list]
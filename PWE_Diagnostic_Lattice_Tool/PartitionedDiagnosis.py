@@ -0,0 +1,315 @@
+from .BitConstraintMap import BitConstraintMap
+from .DiagnosisSetup import DiagnosisSetup
+from .GroupedLogicProgram import GroupedLogicProgram
+from .LogicProgram import LogicProgram
+from .SeedStrategies import SeedStrategies
+import argparse
+import json
+import multiprocessing
+import os
+import socket
+import sys
+import tempfile
+import time
+
+
+class PartitionedDiagnosis:
+    """
+    Splits the lattice into 2^k disjoint sublattices (cubes) by fixing the first k constraints (the top k bits of a
+    BitConstraintMap) on or off, and explores every cube separately, on a BitConstraintMap of the free constraints
+    only (the fixed on ones are always added, see GroupedLogicProgram's always_on). The cubes are independent jobs,
+    the workers only coordinate through files in a job directory, so they can be local processes or run on other
+    machines sharing the directory:
+        job.json        the constraints, k, the algorithm and the options to build the program with (see get_program)
+        todo/           one file per cube not yet claimed
+        claimed/        the cubes being explored (claimed by renaming the file, which only one worker can do)
+        results/        the results per cube
+    The cubes cover the lattice, so the minimal (maximal) sets of the whole lattice are the minimal (maximal) ones
+    among the per cube results: every one of them is minimal (maximal) in its own cube, and any other per cube result
+    is above (below) one of them. The merge (see merge_results) needs no oracle calls.
+    """
+
+    @staticmethod
+    def get_cube_ids(num_fixed: int):
+        """
+        :return: List of the cube ids, strings of '0'/'1' (off/on) for the fixed constraints
+        """
+        return [format(i, '0{}b'.format(num_fixed)) if num_fixed > 0 else '' for i in range(2 ** num_fixed)]
+
+    @staticmethod
+    def get_cube(constraints: list, num_fixed: int, cube_id: str):
+        """
+        :return: (fixed on constraints, free constraints) of the cube
+        """
+        fixed_on = [c for c, bit in zip(constraints[:num_fixed], cube_id) if bit == '1']
+        return fixed_on, list(constraints[num_fixed:])
+
+    @staticmethod
+    def _write_json_(path: str, obj):
+        # Written next to its final path and renamed, so that readers never see half a file
+        tmp_path = '{}.{}.{}.tmp'.format(path, socket.gethostname(), os.getpid())
+        with open(tmp_path, 'w') as f:
+            json.dump(obj, f)
+        os.replace(tmp_path, path)
+
+    @staticmethod
+    def _read_json_(path: str):
+        with open(path, 'r') as f:
+            return json.load(f)
+
+    @staticmethod
+    def _get_cube_path_(job_dir: str, state: str, cube_id: str):
+        return os.path.join(job_dir, state, 'cube_{}.json'.format(cube_id))
+
+    @staticmethod
+    def create_jobs(job_dir: str, constraints: list, num_fixed: int, algorithm: str='marco', options: dict=None):
+        """
+        :param job_dir: Directory to create the jobs in (shared with the workers)
+        :param num_fixed: Number of constraints to fix (k), for 2^k cubes
+        :param algorithm: Key of DiagnosisSetup.ALGORITHMS
+        :param options: (Optional) Dict, named like the DiagnosisCLI long options: 'encoding' (the encoding itself)
+                        and the rest of the options the workers build the program with (see get_program), and
+                        'max_retries', 'retry_limit_factor', 'seed_strategy', 'random_seed' for the algorithm
+        :return: The job config (as in job.json)
+        """
+        num_fixed = max(0, min(num_fixed, len(constraints)))
+        job = {'constraints': list(constraints), 'num_fixed': num_fixed, 'algorithm': algorithm,
+               'options': dict(options) if options is not None else {}}
+        for state in ['todo', 'claimed', 'results']:
+            os.makedirs(os.path.join(job_dir, state), exist_ok=True)
+        PartitionedDiagnosis._write_json_(os.path.join(job_dir, 'job.json'), job)
+        for cube_id in PartitionedDiagnosis.get_cube_ids(num_fixed):
+            PartitionedDiagnosis._write_json_(PartitionedDiagnosis._get_cube_path_(job_dir, 'todo', cube_id),
+                                              {'cube': cube_id})
+        return job
+
+    @staticmethod
+    def read_job(job_dir: str):
+        return PartitionedDiagnosis._read_json_(os.path.join(job_dir, 'job.json'))
+
+    @staticmethod
+    def get_program(job: dict):
+        """
+        :return: ASP_LogicProgram built from the job options, see DiagnosisSetup.get_program
+        """
+        return DiagnosisSetup.get_program(job['options']['encoding'], job['constraints'], job['options'])
+
+    @staticmethod
+    def claim_cube(job_dir: str):
+        """
+        :return: Id of a cube that nobody else is exploring, None if there are none left to claim
+        """
+        todo_dir = os.path.join(job_dir, 'todo')
+        for name in sorted(os.listdir(todo_dir)):
+            if not (name.startswith('cube_') and name.endswith('.json')):
+                continue
+            cube_id = name[len('cube_'):-len('.json')]
+            claimed_path = PartitionedDiagnosis._get_cube_path_(job_dir, 'claimed', cube_id)
+            try:
+                os.rename(os.path.join(todo_dir, name), claimed_path)
+            except FileNotFoundError:  # Claimed by another worker in the meantime
+                continue
+            os.utime(claimed_path)  # For requeue_stale
+            return cube_id
+        return None
+
+    @staticmethod
+    def requeue_stale(job_dir: str, max_age: float):
+        """
+        Put the cubes claimed more than max_age seconds ago (and not done since, e.g. their worker died) back in todo.
+        :return: List of the requeued cube ids
+        """
+        requeued = []
+        claimed_dir = os.path.join(job_dir, 'claimed')
+        for name in os.listdir(claimed_dir):
+            path = os.path.join(claimed_dir, name)
+            try:
+                if time.time() - os.path.getmtime(path) > max_age:
+                    os.rename(path, os.path.join(job_dir, 'todo', name))
+                    requeued.append(name[len('cube_'):-len('.json')])
+            except FileNotFoundError:  # Done in the meantime
+                continue
+        return requeued
+
+    @staticmethod
+    def run_cube(cnf_prog: LogicProgram, job: dict, cube_id: str):
+        """
+        Explore one cube.
+        :param cnf_prog: LogicProgram over all the constraints
+        :return: Dict: 'cube', 'results' (result type --> list of sorted constraint lists, the fixed on constraints
+                 included), 'unknown', 'explored', 'total', 'elapsed'
+        """
+        start_time = time.time()
+        options = job['options']
+        func, result_types, _ = DiagnosisSetup.ALGORITHMS[job['algorithm']]
+        fixed_on, free = PartitionedDiagnosis.get_cube(job['constraints'], job['num_fixed'], cube_id)
+        cube_prog = GroupedLogicProgram(cnf_prog, dict([(c, [c]) for c in free]), always_on=fixed_on)
+        cmap = BitConstraintMap(free)
+
+        kwargs = {}
+        if ((options.get('seed_strategy') is not None) or (options.get('random_seed') is not None)) and \
+                not job['algorithm'].endswith('_plus'):
+            kwargs['seed_strategy'] = SeedStrategies.get_strategy(options.get('seed_strategy') or 'random',
+                                                                  seed=options.get('random_seed'))
+        minimal, maximal, unknown = func(cmap, cube_prog, max_retries=options.get('max_retries', 1),
+                                         retry_limit_factor=options.get('retry_limit_factor', 2),
+                                         return_unknown=True, **kwargs)
+        minimal = [cube_prog.get_members(r) for r in minimal]
+        maximal = [cube_prog.get_members(r) for r in maximal]
+        unknown = [cube_prog.get_members(u) for u in unknown]
+
+        return {'cube': cube_id, 'results': {result_types[0]: [sorted(r) for r in minimal],
+                                             result_types[1]: [sorted(r) for r in maximal]},
+                'unknown': [sorted(u) for u in unknown], 'explored': cmap.get_num_explored(),
+                'total': 2 ** cmap.num_constraints, 'elapsed': time.time() - start_time}
+
+    @staticmethod
+    def run_worker(job_dir: str, cnf_prog: LogicProgram=None, max_cubes: int=None):
+        """
+        Claim and explore cubes until there are none left (or max_cubes are done).
+        :param cnf_prog: (Optional) LogicProgram over all the constraints (default: built from the job options, see
+                         get_program)
+        :return: List of the ids of the cubes explored
+        """
+        job = PartitionedDiagnosis.read_job(job_dir)
+        done = []
+        while (max_cubes is None) or (len(done) < max_cubes):
+            cube_id = PartitionedDiagnosis.claim_cube(job_dir)
+            if cube_id is None:
+                break
+            if cnf_prog is None:
+                cnf_prog = PartitionedDiagnosis.get_program(job)
+            result = PartitionedDiagnosis.run_cube(cnf_prog, job, cube_id)
+            result['worker'] = '{}:{}'.format(socket.gethostname(), os.getpid())
+            PartitionedDiagnosis._write_json_(PartitionedDiagnosis._get_cube_path_(job_dir, 'results', cube_id),
+                                              result)
+            try:
+                os.remove(PartitionedDiagnosis._get_cube_path_(job_dir, 'claimed', cube_id))
+            except FileNotFoundError:  # Requeued (and maybe done again) in the meantime
+                pass
+            done.append(cube_id)
+        return done
+
+    @staticmethod
+    def merge_results(result_types, candidates: dict):
+        """
+        :param result_types: (minimal result type, maximal result type), e.g. ('MUS', 'MSS')
+        :param candidates: Dict: result type --> list of the per cube results (sets of constraints)
+        :return: Dict: result type --> list of the results of the whole lattice, i.e. the minimal (maximal) ones
+        """
+        merged = {}
+        for result_type in result_types:
+            is_minimal = result_type == result_types[0]
+            kept = []
+            for r in sorted(set([frozenset(r) for r in candidates.get(result_type, [])]), key=len,
+                            reverse=not is_minimal):
+                if not any((k < r) if is_minimal else (k > r) for k in kept):
+                    kept.append(r)
+            merged[result_type] = [set(r) for r in kept]
+        return merged
+
+    @staticmethod
+    def merge(job_dir: str):
+        """
+        :return: Dict: 'results' (result type --> list of sets of constraints), 'unknown', 'missing' (ids of the cubes
+                 w/o results yet, the results are only complete once there are none), 'explored', 'total'
+        """
+        job = PartitionedDiagnosis.read_job(job_dir)
+        _, result_types, _ = DiagnosisSetup.ALGORITHMS[job['algorithm']]
+        candidates = dict([(t, []) for t in result_types])
+        unknown = []
+        missing = []
+        explored = 0
+        for cube_id in PartitionedDiagnosis.get_cube_ids(job['num_fixed']):
+            path = PartitionedDiagnosis._get_cube_path_(job_dir, 'results', cube_id)
+            if not os.path.exists(path):
+                missing.append(cube_id)
+                continue
+            result = PartitionedDiagnosis._read_json_(path)
+            for t in result_types:
+                candidates[t].extend(result['results'][t])
+            unknown.extend([set(u) for u in result['unknown']])
+            explored += result['explored']
+        return {'results': PartitionedDiagnosis.merge_results(result_types, candidates), 'unknown': unknown,
+                'missing': missing, 'explored': explored, 'total': 2 ** len(job['constraints'])}
+
+    @staticmethod
+    def wait(job_dir: str, poll_interval: float=1.0, stale_after: float=None):
+        """
+        Wait until every cube has its results.
+        :param stale_after: (Optional) Requeue the cubes claimed longer ago than this, see requeue_stale
+        """
+        job = PartitionedDiagnosis.read_job(job_dir)
+        # Only the finished results, not the temporary files they are written to (see _write_json_)
+        result_paths = [PartitionedDiagnosis._get_cube_path_(job_dir, 'results', cube_id)
+                        for cube_id in PartitionedDiagnosis.get_cube_ids(job['num_fixed'])]
+        while not all(os.path.exists(path) for path in result_paths):
+            if stale_after is not None:
+                PartitionedDiagnosis.requeue_stale(job_dir, stale_after)
+            time.sleep(poll_interval)
+
+    @staticmethod
+    def run(cnf_prog: LogicProgram, constraints: list, num_fixed: int, algorithm: str='marco', num_workers: int=1,
+            job_dir: str=None, options: dict=None):
+        """
+        Create the jobs, explore them w/ num_workers local processes, and merge the results.
+        :param cnf_prog: LogicProgram over all the constraints, passed on to the worker processes (inherited w/ the
+                         'fork' start method, pickled otherwise). None --> every worker builds its own, from the
+                         options (see get_program)
+        :param job_dir: (Optional) Job directory, e.g. shared w/ workers on other machines (default: a temporary one)
+        :param constraints: All the constraints, the first num_fixed are the fixed ones
+        :param options: See create_jobs
+        :return: See merge
+        """
+        with tempfile.TemporaryDirectory(prefix='pwe-partitions-') as tmp_dir:
+            job_dir = job_dir if job_dir is not None else tmp_dir
+            PartitionedDiagnosis.create_jobs(job_dir, constraints, num_fixed, algorithm=algorithm, options=options)
+            if num_workers <= 1:
+                PartitionedDiagnosis.run_worker(job_dir, cnf_prog)
+            else:
+                workers = [multiprocessing.Process(target=PartitionedDiagnosis.run_worker, args=(job_dir, cnf_prog))
+                           for _ in range(num_workers)]
+                for worker in workers:
+                    worker.start()
+                for worker in workers:
+                    worker.join()
+            return PartitionedDiagnosis.merge(job_dir)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Workers and merging for partitioned diagnosis jobs, see "
+                                                 "pwe-diagnose --partition-dir to create them.")
+    subparsers = parser.add_subparsers(dest='command')
+    worker_parser = subparsers.add_parser('worker', help="Explore cubes until there are none left")
+    worker_parser.add_argument('job_dir')
+    worker_parser.add_argument('--max-cubes', type=int, default=None)
+    requeue_parser = subparsers.add_parser('requeue', help="Requeue the cubes of dead workers")
+    requeue_parser.add_argument('job_dir')
+    requeue_parser.add_argument('--max-age', type=float, required=True,
+                                help="Seconds after which a claimed cube w/o results is requeued")
+    merge_parser = subparsers.add_parser('merge', help="Write the merged results as JSON lines")
+    merge_parser.add_argument('job_dir')
+    args = parser.parse_args(argv)
+
+    if args.command == 'worker':
+        done = PartitionedDiagnosis.run_worker(args.job_dir, max_cubes=args.max_cubes)
+        print("{} cube(s) explored.".format(len(done)), file=sys.stderr)
+    elif args.command == 'requeue':
+        print("{} cube(s) requeued.".format(len(PartitionedDiagnosis.requeue_stale(args.job_dir, args.max_age))),
+              file=sys.stderr)
+    elif args.command == 'merge':
+        merged = PartitionedDiagnosis.merge(args.job_dir)
+        for result_type, results in merged['results'].items():
+            for r in results:
+                print(json.dumps({'type': result_type, 'constraints': sorted(r)}))
+        print(json.dumps({'type': 'done', 'unknown': [sorted(u) for u in merged['unknown']],
+                          'missing': merged['missing'], 'explored': merged['explored'], 'total': merged['total']}))
+        return 1 if len(merged['missing']) > 0 else 0
+    else:
+        parser.print_help()
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,3 +1,6 @@
+from collections import Counter
+
+
 class PowersetBitLib:
 
     @staticmethod
@@ -64,6 +67,22 @@ class PowersetBitLib:
     def is_child(n1: int, n2: int) -> bool:
         return PowersetBitLib.is_parent(n2, n1)
 
+    @staticmethod
+    def insert_bit(n: int, i: int, bit: int=0) -> int:
+        """
+        Insert bit at position i of n, i.e. the bits of n from position i upwards move up by one
+        """
+        low = n & ((1 << i) - 1)
+        return (((n >> i) << 1 | bit) << i) | low
+
+    @staticmethod
+    def remove_bit(n: int, i: int) -> int:
+        """
+        Remove the bit at position i of n, i.e. the bits of n above position i move down by one
+        """
+        low = n & ((1 << i) - 1)
+        return ((n >> (i + 1)) << i) | low
+
     @staticmethod
     def get_descendants(n: int, num_cons: int) -> list:
 
@@ -131,6 +150,16 @@ class PowersetBitLib:
         """
         return bin(n)[2:].count('1')
 
+    @staticmethod
+    def count_levels(nodes) -> Counter:
+        """
+        Count the nodes per level (number of set bits), in one pass. Uses int.bit_count where available (python 3.10+),
+        which is several times faster than get_num_set_bits.
+        :param nodes: iterable of integers
+        :return: Counter: level --> number of nodes
+        """
+        return Counter(map(getattr(int, 'bit_count', PowersetBitLib.get_num_set_bits), nodes))
+
     # Naive Way
     # @staticmethod
     # def get_num_set_bits2(n):
@@ -2,7 +2,6 @@ from .ConstraintMap import ConstraintMap
 from .BitConstraintMap import BitConstraintMap
 from .PowersetBitLib import PowersetBitLib
 from .LatticeNode import NumPWSType
-import networkx as nx
 
 
 class PowersetFullLatticeViz:
@@ -77,12 +76,52 @@ class PowersetFullLatticeViz:
         self.full_lattice = self.create_full_lattice(self.cmap.num_constraints)
         self.num_pws = {}
         self.sat_status = {}
+        self.change_idx = None  # Position in the cmap's change log the lattice is synced upto
+        self.dirty_nodes = None  # Nodes to restyle (None --> all), since the last color_and_label_lattice
+        self.last_coloring = None  # Arguments of the last color_and_label_lattice
         self.resync_lattice()
 
-    def resync_lattice(self):
+    def resync_lattice(self, incremental=True):
+        """
+        Catch up with the cmap. Only the nodes touched since the last resync (according to the cmap's change log) are
+        looked up again, unless incremental is False.
+        """
+        changed = None
+        if incremental and (self.change_idx is not None):
+            changes, self.change_idx = self.cmap.get_changes_since(self.change_idx)
+            changed = self.cmap.get_changed_nodes(changes)
+        else:
+            self.change_idx = self.cmap.get_change_index()
+
+        if changed is None:
+            self.num_pws = self.cmap.get_all_nodes_num_pws()
+            self.sat_status = self.cmap.get_all_nodes_sat()
+            self.dirty_nodes = None
+            return
+
+        for n in changed:
+            self.num_pws[n] = self.cmap.get_node_num_pws(n)
+            self.sat_status[n] = self.cmap.get_node_sat(n)
+        if self.dirty_nodes is not None:
+            self.dirty_nodes.update(changed)
+
+    def get_highlighted_node_style(self, node, to_highlight=('MUS', 'MSS'), colorscheme=None):
+        """
+        Style of the node, once the highlights are applied on top of its SAT status. Later highlights take precedence:
+        MSS < MUS < MAS < MUAS.
+        """
+        if colorscheme is None:
+            colorscheme = self.DEFAULT_COLOR_SCHEME
 
-        self.num_pws = self.cmap.get_all_nodes_num_pws()
-        self.sat_status = self.cmap.get_all_nodes_sat()
+        style = self.get_node_style(node, colorscheme)
+        highlights = [('MSS', self.cmap.maximal_satisfiable_constraint_subsets, 'mss_node'),
+                      ('MUS', self.cmap.minimal_unsatisfiable_constraint_subsets, 'mus_node'),
+                      ('MAS', self.cmap.maximal_ambiguous_constraint_subsets, 'mas_node'),
+                      ('MUAS', self.cmap.minimal_unambiguous_constraint_subsets, 'muas_node')]
+        for name, nodes, highlight_style in highlights:
+            if (name in to_highlight) and (node in nodes):
+                style = dict(style, **colorscheme[highlight_style])
+        return style
 
     def get_node_style(self, node, colorscheme=None):
 
@@ -142,24 +181,26 @@ class PowersetFullLatticeViz:
         if colorscheme is None:
             colorscheme = self.DEFAULT_COLOR_SCHEME
 
-        for n in self.full_lattice.nodes:
-            self.update_node_style(n, self.get_node_style(n, colorscheme))
+        coloring = (display_num_pws, label_format, tuple(to_highlight), colorscheme)
+        if (self.dirty_nodes is not None) and (coloring == self.last_coloring):
+            # Only restyle what changed since the last time
+            nodes = self.dirty_nodes
+            edges = set([])
+            for n in nodes:
+                edges.update([(n, c) for c in PowersetBitLib.get_children(n, self.cmap.num_constraints)])
+                edges.update([(p, n) for p in PowersetBitLib.get_parents(n, self.cmap.num_constraints)])
+        else:
+            nodes = self.full_lattice.nodes
+            edges = self.full_lattice.edges
+
+        for n in nodes:
+            self.update_node_style(n, self.get_highlighted_node_style(n, to_highlight, colorscheme))
             self.update_labels({n: self.get_node_label(n, label_format, display_num_pws)})
-        for e in self.full_lattice.edges:
+        for e in edges:
             self.update_edge_style(e, self.get_edge_style(e, colorscheme))
 
-        if 'MSS' in to_highlight:
-            for n in self.cmap.maximal_satisfiable_constraint_subsets:
-                self.update_node_style(n, colorscheme['mss_node'])
-        if 'MUS' in to_highlight:
-            for n in self.cmap.minimal_unsatisfiable_constraint_subsets:
-                self.update_node_style(n, colorscheme['mus_node'])
-        if 'MAS' in to_highlight:
-            for n in self.cmap.maximal_ambiguous_constraint_subsets:
-                self.update_node_style(n, colorscheme['mas_node'])
-        if 'MUAS' in to_highlight:
-            for n in self.cmap.minimal_unambiguous_constraint_subsets:
-                self.update_node_style(n, colorscheme['muas_node'])
+        self.dirty_nodes = set([])
+        self.last_coloring = coloring
 
     # def _propagate_(self, seed, prop_func, node_style, edge_style, max_level=np.infty):
     #
@@ -236,12 +277,14 @@ class PowersetFullLatticeViz:
             self.update_node_style(n, self.DEFAULT_COLOR_SCHEME['unevaluated_node'])
         for e in self.full_lattice.edges:
             self.update_edge_style(e, self.DEFAULT_COLOR_SCHEME['unevaluated_edge'])
+        self.dirty_nodes = None
 
     def create_full_lattice(self, num_constraints, colorscheme=None):
 
         if colorscheme is None:
             colorscheme = self.DEFAULT_COLOR_SCHEME
 
+        import networkx as nx
         g = nx.Graph()
 
         g.add_nodes_from(reversed(range(2**num_constraints)))
@@ -0,0 +1,154 @@
+from .BitConstraintMap import BitConstraintMap
+from .PowersetBitLib import PowersetBitLib
+from .PowersetFullLatticeViz import PowersetFullLatticeViz
+import itertools
+
+
+class _NodeStatusCache(dict):
+    """
+    Dict that looks up (and remembers) the status of a node the first time it is asked for.
+    """
+
+    def __init__(self, lookup_func):
+        dict.__init__(self)
+        self.lookup_func = lookup_func
+
+    def __missing__(self, node):
+        self[node] = self.lookup_func(node)
+        return self[node]
+
+
+class PowersetLatticeWindowViz(PowersetFullLatticeViz):
+    """
+    Lazy version of PowersetFullLatticeViz. Only a window of the lattice is built and styled: a range of levels, the
+    neighbourhood of some nodes or the interval between two nodes. The node statuses are read off the cmap as they are
+    needed, instead of for all the 2^n nodes upfront.
+    """
+
+    def __init__(self, cmap: BitConstraintMap, max_nodes: int=5000):
+        """
+        :param cmap: BitConstraintMap to visualize
+        :param max_nodes: Refuse to build windows with more nodes than this
+        """
+        self.cmap = cmap
+        self.max_nodes = max_nodes
+        import networkx as nx
+        self.full_lattice = nx.Graph()  # Only holds the current window
+        self.num_pws = _NodeStatusCache(self.cmap.get_node_num_pws)
+        self.sat_status = _NodeStatusCache(self.cmap.get_node_sat)
+        self.change_idx = self.cmap.get_change_index()
+
+    def resync_lattice(self, incremental=True):
+        """
+        Forget the cached statuses of the nodes touched since the last resync (all of them, unless incremental).
+        """
+        changes, self.change_idx = self.cmap.get_changes_since(self.change_idx)
+        if not incremental:
+            self.num_pws.clear()
+            self.sat_status.clear()
+            return
+        cached = set(self.num_pws.keys()).union(self.sat_status.keys())
+        for n in self.cmap.get_changed_nodes(changes, nodes=cached):
+            self.num_pws.pop(n, None)
+            self.sat_status.pop(n, None)
+
+    def _to_int_(self, node):
+        return node if isinstance(node, int) else self.cmap.constraint_set_to_int(node)
+
+    def get_level_nodes(self, level):
+        """
+        :return: Generator over all the nodes with exactly level constraints turned on
+        """
+        n = self.cmap.num_constraints
+        for bits in itertools.combinations(range(n), level):
+            yield sum(1 << i for i in bits)
+
+    def get_neighbourhood_nodes(self, nodes, radius=1):
+        """
+        :return: Set of the nodes within radius parent/child steps of any of the given nodes
+        """
+        window = set([self._to_int_(node) for node in nodes])
+        frontier = set(window)
+        for _ in range(radius):
+            next_frontier = set([])
+            for node in frontier:
+                next_frontier.update(PowersetBitLib.get_parents(node, self.cmap.num_constraints))
+                next_frontier.update(PowersetBitLib.get_children(node, self.cmap.num_constraints))
+            frontier = next_frontier.difference(window)
+            window.update(frontier)
+        return window
+
+    def get_interval_nodes(self, lower, upper):
+        """
+        :return: Generator over all the nodes that are descendants of lower and ancestors of upper (both inclusive)
+        """
+        lower, upper = self._to_int_(lower), self._to_int_(upper)
+        if not PowersetBitLib.is_ancestor(lower, upper):
+            print("lower is not an ancestor of upper, the interval is empty.")
+            return
+        free_bits = upper & ~lower
+        sub = free_bits
+        while True:
+            yield lower | sub
+            if sub == 0:
+                break
+            sub = (sub - 1) & free_bits
+
+    def set_window(self, nodes):
+        """
+        Build the window out of the given nodes, along with the lattice edges between them.
+        :param nodes: Iterable of nodes (ints or constraint sets)
+        :return: bool, whether the window was built
+        """
+        window = set([])
+        for node in nodes:
+            window.add(self._to_int_(node))
+            if len(window) > self.max_nodes:
+                print("Window has more than {} nodes (max_nodes), not building it.".format(self.max_nodes))
+                return False
+
+        import networkx as nx
+        g = nx.Graph()
+        g.add_nodes_from(sorted(window, reverse=True))
+        for node in window:
+            g.add_edges_from([(node, c) for c in PowersetBitLib.get_children(node, self.cmap.num_constraints)
+                              if c in window])
+        self.full_lattice = g
+        self.reset_lattice()
+        return True
+
+    def set_window_levels(self, min_level, max_level):
+        """
+        Window over the nodes with min_level to max_level (both inclusive) constraints turned on.
+        """
+        min_level, max_level = max(min_level, 0), min(max_level, self.cmap.num_constraints)
+        return self.set_window(itertools.chain.from_iterable(self.get_level_nodes(level)
+                                                             for level in range(min_level, max_level + 1)))
+
+    def set_window_neighbourhood(self, nodes, radius=1):
+        """
+        Window over the nodes within radius parent/child steps of any of the given nodes.
+        """
+        return self.set_window(self.get_neighbourhood_nodes(nodes, radius=radius))
+
+    def set_window_interval(self, lower, upper):
+        """
+        Window over the interval [lower, upper] of the lattice.
+        """
+        return self.set_window(self.get_interval_nodes(lower, upper))
+
+    def color_and_label_lattice(self, display_num_pws=False, label_format='bitstring', to_highlight=('MUS', 'MSS'),
+                                colorscheme=None):
+
+        if colorscheme is None:
+            colorscheme = self.DEFAULT_COLOR_SCHEME
+
+        for n in self.full_lattice.nodes:
+            self.update_node_style(n, self.get_highlighted_node_style(n, to_highlight, colorscheme))
+            self.update_labels({n: self.get_node_label(n, label_format, display_num_pws)})
+        for e in self.full_lattice.edges:
+            self.update_edge_style(e, self.get_edge_style(e, colorscheme))
+
+    def get_window(self, display_num_pws=False, label_format='bitstring', to_highlight=('MUS', 'MSS'),
+                   colorscheme=None):
+        return self.get_full_lattice(display_num_pws, label_format, to_highlight, colorscheme)
@@ -0,0 +1,173 @@
+from .BitConstraintMap import BitConstraintMap
+from .PowersetBitLib import PowersetBitLib
+from .PowersetFullLatticeViz import PowersetFullLatticeViz
+from .LatticeNode import NumPWSType
+import json
+
+
+class PowersetLatticeWriter:
+    """
+    Writes the lattice of a BitConstraintMap straight to a DOT or JSON-lines file, one node/edge at a time, without
+    building a networkx graph first. Every node/edge gets a style class (the keys of the colorscheme, e.g. 'sat_node'),
+    the styles themselves are only written once per class (DOT subgraph w/ the class' 'node [...]' / 'edge [...]'
+    defaults, JSON-lines 'styles' record). Memory use doesn't depend on the size of the lattice (unless a subset of the
+    nodes is written): the DOT writer makes a pass over the nodes/edges per class instead of grouping them in memory.
+    """
+
+    # Style classes get_node_class / get_edge_class can return (all of them must be in the colorscheme)
+    NODE_CLASSES = ['unevaluated_node', 'sat_node', 'unsat_node', 'mss_node', 'mus_node', 'mas_node', 'muas_node']
+    EDGE_CLASSES = ['unevaluated_edge', 'sat_sat_edge', 'unsat_unsat_edge', 'sat_unsat_edge']
+
+    def __init__(self, cmap: BitConstraintMap, colorscheme=None):
+        """
+        :param cmap: BitConstraintMap to write out
+        :param colorscheme: Styles per class, see PowersetFullLatticeViz.DEFAULT_COLOR_SCHEME (default)
+        """
+        self.cmap = cmap
+        self.colorscheme = colorscheme if colorscheme is not None else PowersetFullLatticeViz.DEFAULT_COLOR_SCHEME
+
+    def get_node_class(self, n, to_highlight=('MUS', 'MSS')):
+        """
+        Same precedence as PowersetFullLatticeViz.color_and_label_lattice: SAT status, then MSS, MUS, MAS, MUAS
+        (the later ones win).
+        """
+        node_class = {None: 'unevaluated_node', True: 'sat_node', False: 'unsat_node'}[self.cmap.get_node_sat(n)]
+        highlights = [('MSS', self.cmap.maximal_satisfiable_constraint_subsets, 'mss_node'),
+                      ('MUS', self.cmap.minimal_unsatisfiable_constraint_subsets, 'mus_node'),
+                      ('MAS', self.cmap.maximal_ambiguous_constraint_subsets, 'mas_node'),
+                      ('MUAS', self.cmap.minimal_unambiguous_constraint_subsets, 'muas_node')]
+        for name, nodes, style in highlights:
+            if (name in to_highlight) and (n in nodes):
+                node_class = style
+        return node_class
+
+    def get_edge_class(self, n1, n2):
+        sat1, sat2 = self.cmap.get_node_sat(n1), self.cmap.get_node_sat(n2)
+        if (sat1 is None) or (sat2 is None):
+            return 'unevaluated_edge'
+        if sat1 != sat2:
+            return 'sat_unsat_edge'
+        return 'sat_sat_edge' if sat1 else 'unsat_unsat_edge'
+
+    @staticmethod
+    def num_pws_to_str(num_pws: int, num_pws_type: NumPWSType):
+        if (num_pws is None) or (num_pws_type == NumPWSType.unevaluated):
+            return "?"
+        elif num_pws_type == NumPWSType.exact:
+            return str(num_pws)
+        elif num_pws_type == NumPWSType.atleast:
+            return ">= {}".format(str(num_pws))
+
+    def get_node_label(self, n, label_format='bitstring', display_num_pws=False):
+
+        label_format_to_func = {
+            'bitstring': lambda x: PowersetFullLatticeViz.int_to_bit_string(x, self.cmap.num_constraints),
+            'int': lambda x: str(x),
+            'comp_string': lambda x: "{{{}}}".format(", ".join(self.cmap.int_to_constraint_set(x))),
+        }
+        label = label_format_to_func[label_format](n)
+        if display_num_pws:
+            label += '\n({})'.format(self.num_pws_to_str(*self.cmap.get_node_num_pws(n)))
+        return label
+
+    def iter_nodes(self, nodes=None):
+        """
+        :param nodes: Set of ints to restrict the nodes to (None --> the whole lattice)
+        :return: Generator over the nodes, biggest first
+        """
+        if nodes is not None:
+            return iter(sorted(nodes, reverse=True))
+        return reversed(range(2 ** self.cmap.num_constraints))
+
+    def iter_edges(self, nodes=None):
+        """
+        :param nodes: Set of ints to restrict the edges to (None --> the whole lattice)
+        :return: Generator over (parent, child) tuples
+        """
+        for n in self.iter_nodes(nodes):
+            for c in PowersetBitLib.get_children(n, self.cmap.num_constraints):
+                if (nodes is None) or (c in nodes):
+                    yield n, c
+
+    @staticmethod
+    def _dot_quote_(val):
+        return '"{}"'.format(str(val).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n'))
+
+    def _dot_attrs_(self, attrs: dict):
+        return ", ".join(["{}={}".format(k, self._dot_quote_(v)) for k, v in attrs.items()])
+
+    def write_dot(self, out, nodes=None, to_highlight=('MUS', 'MSS'), label_format='bitstring', display_num_pws=False,
+                  graph_name='lattice'):
+        """
+        Write the lattice (or the sub-lattice induced by nodes) in the DOT format.
+        :param out: File path or a writable file object
+        :param nodes: (Optional) Nodes (ints) to restrict the output to, e.g. a PowersetLatticeWindowViz window
+        :param to_highlight: Extremal sets to highlight. Choices: 'MUS', 'MSS', 'MAS', 'MUAS'
+        :param label_format: 'bitstring', 'int' or 'comp_string'
+        :param display_num_pws: Add the (known) number of PWs to the labels
+        :param graph_name: Name of the DOT graph
+        """
+        if isinstance(out, str):
+            with open(out, 'w') as f:
+                return self.write_dot(f, nodes, to_highlight, label_format, display_num_pws, graph_name)
+
+        nodes = set(nodes) if nodes is not None else None
+        out.write("graph {} {{\n".format(graph_name))
+
+        # A subgraph per class, so its defaults don't carry over to the next class
+        self._write_dot_subgraphs_(out, 'node', self.NODE_CLASSES, lambda: self.iter_nodes(nodes),
+                                   lambda n: self.get_node_class(n, to_highlight),
+                                   lambda n: "{} [label={}]".format(n, self._dot_quote_(
+                                       self.get_node_label(n, label_format, display_num_pws))))
+        self._write_dot_subgraphs_(out, 'edge', self.EDGE_CLASSES, lambda: self.iter_edges(nodes),
+                                   lambda e: self.get_edge_class(*e), lambda e: "{} -- {}".format(*e))
+
+        out.write("}\n")
+
+    def _write_dot_subgraphs_(self, out, kind, classes, get_items, get_class, to_dot):
+        """
+        Write the items in a subgraph per class, w/ the class' style as the kind defaults.
+        :param kind: 'node' or 'edge'
+        :param classes: NODE_CLASSES or EDGE_CLASSES
+        :param get_items: Function returning a fresh iterator over the items (one pass per class)
+        :param get_class: Function: item --> class
+        :param to_dot: Function: item --> DOT statement
+        """
+        for item_class in classes:
+            in_subgraph = False
+            for item in get_items():
+                if get_class(item) != item_class:
+                    continue
+                if not in_subgraph:
+                    out.write("  subgraph {{\n    {} [{}];\n".format(kind,
+                                                                      self._dot_attrs_(self.colorscheme[item_class])))
+                    in_subgraph = True
+                out.write("    {};\n".format(to_dot(item)))
+            if in_subgraph:
+                out.write("  }\n")
+
+    def write_jsonl(self, out, nodes=None, to_highlight=('MUS', 'MSS'), label_format='bitstring'):
+        """
+        Write the lattice (or the sub-lattice induced by nodes) as JSON lines. The first record holds the styles per
+        class, followed by a record per node (with its class, label and number of PWs) and a record per edge.
+        :param out: File path or a writable file object
+        :param nodes: (Optional) Nodes (ints) to restrict the output to
+        :param to_highlight: Extremal sets to highlight. Choices: 'MUS', 'MSS', 'MAS', 'MUAS'
+        :param label_format: 'bitstring', 'int' or 'comp_string'
+        """
+        if isinstance(out, str):
+            with open(out, 'w') as f:
+                return self.write_jsonl(f, nodes, to_highlight, label_format)
+
+        nodes = set(nodes) if nodes is not None else None
+        out.write(json.dumps({'type': 'styles', 'styles': self.colorscheme}) + "\n")
+
+        for n in self.iter_nodes(nodes):
+            num_pws, num_pws_type = self.cmap.get_node_num_pws(n)
+            out.write(json.dumps({'type': 'node', 'id': n, 'class': self.get_node_class(n, to_highlight),
+                                  'label': self.get_node_label(n, label_format),
+                                  'num_pws': num_pws,
+                                  'num_pws_type': num_pws_type.value if num_pws_type is not None else None}) + "\n")
+        for n1, n2 in self.iter_edges(nodes):
+            out.write(json.dumps({'type': 'edge', 'source': n1, 'target': n2,
+                                  'class': self.get_edge_class(n1, n2)}) + "\n")
@@ -1,7 +1,6 @@
 from .BitConstraintMap import BitConstraintMap
 from .PowersetBitLib import PowersetBitLib
 from .LatticeNode import NumPWSType
-import networkx as nx
 
 
 class PowersetSummaryLatticeViz:
@@ -85,13 +84,19 @@ class PowersetSummaryLatticeViz:
         self.num_pws = {}
         self.num_set_bits = {}
         self.sat_status = {}
+        self.change_idx = None  # Position in the cmap's change log the lattice is synced upto
         self.resync_lattice()
 
     def reset_lattice(self):
+        import networkx as nx
         self.summary_lattice = nx.Graph()
         self.lattice_nodes = set([])
 
-    def resync_lattice(self):
+    def resync_lattice(self, incremental=True):
+        """
+        Catch up with the cmap. Only the summary nodes touched since the last resync (according to the cmap's change
+        log) are looked up again, unless incremental is False.
+        """
 
         self.mus_es = self.cmap.minimal_unsatisfiable_constraint_subsets
         self.mss_es = self.cmap.maximal_satisfiable_constraint_subsets
@@ -99,9 +104,21 @@ class PowersetSummaryLatticeViz:
         self.mas_es = self.cmap.maximal_ambiguous_constraint_subsets
         pot_nodes = self.mus_es.union(self.mss_es).union(self.muas_es).union(self.mas_es).union({self.null_node,
                                                                                                  self.all_node})
-        self.num_pws = {n: self.cmap.check_node_num_pws(n) for n in pot_nodes}
-        self.num_set_bits = {n: PowersetBitLib.get_num_set_bits(n) for n in pot_nodes}
-        self.sat_status = {n: self.cmap.check_sat(n) for n in pot_nodes}
+        if incremental and (self.change_idx is not None):
+            changes, self.change_idx = self.cmap.get_changes_since(self.change_idx)
+            to_update = self.cmap.get_changed_nodes(changes, nodes=pot_nodes).union(
+                pot_nodes.difference(self.num_pws.keys()))
+            for n in set(self.num_pws.keys()).difference(pot_nodes):
+                del self.num_pws[n], self.num_set_bits[n], self.sat_status[n]
+        else:
+            self.change_idx = self.cmap.get_change_index()
+            to_update = pot_nodes
+            self.num_pws, self.num_set_bits, self.sat_status = {}, {}, {}
+
+        for n in to_update:
+            self.num_pws[n] = self.cmap.check_node_num_pws(n)
+            self.num_set_bits[n] = PowersetBitLib.get_num_set_bits(n)
+            self.sat_status[n] = self.cmap.check_sat(n)
 
     def get_node_label(self, n, label_format='bitstring', display_num_pws=False):
 
@@ -167,8 +184,35 @@ class PowersetSummaryLatticeViz:
     def int_to_bit_string(self, num):
         return "".join(['1' if c else '0' for c in PowersetBitLib.int_to_bitlist(num, self.cmap.num_constraints)])
 
+    def get_summary_edges(self, nodes, edge_mode='cover'):
+        """
+        Get the edges between the summary nodes with pairwise subset tests on the bitmasks (n is a subset of d iff
+        n & d == n), instead of enumerating the descendants of every node.
+        :param nodes: Iterable of ints, the summary nodes
+        :param edge_mode: 'cover' --> only the cover relation (Hasse diagram, i.e. the transitive reduction),
+                          'comparability' --> an edge between every pair of comparable nodes
+        :return: List of (n, d) tuples, n being a proper subset of d
+        """
+        nodes = sorted(set(nodes), key=PowersetBitLib.get_num_set_bits)
+        edges = []
+        for i, n in enumerate(nodes):
+            covers = []
+            # Nodes are sorted by size, so any node between n and d has been seen before d, and is either a cover of n
+            # itself or above one of them
+            for d in nodes[i+1:]:
+                if (n & d) != n or n == d:
+                    continue
+                if (edge_mode == 'comparability') or all((c & d) != c for c in covers):
+                    covers.append(d)
+            edges.extend([(n, d) for d in covers])
+        return edges
+
     def get_lattice(self, to_highlight=('MUS', 'MSS'), label_format='bitstring', display_num_pws=False,
-                    add_edge_labels=True, colorscheme=None):
+                    add_edge_labels=True, colorscheme=None, edge_mode='cover'):
+        """
+        :param edge_mode: 'cover' (default) --> Hasse diagram of the summary nodes, 'comparability' --> an edge between
+                          every pair of comparable summary nodes
+        """
 
         if colorscheme is None:
             colorscheme = self.DEFAULT_COLOR_SCHEME
@@ -194,20 +238,16 @@ class PowersetSummaryLatticeViz:
         self.summary_lattice.add_node(self.null_node, **colorscheme['sat_node'])  # Must be SAT
 
         for n in self.lattice_nodes:
-
             self.summary_lattice.nodes[n]['label'] = self.get_node_label(n, label_format=label_format,
                                                                          display_num_pws=display_num_pws)
-            descendants = set(PowersetBitLib.get_descendants(n, self.cmap.num_constraints))
-            descendants = descendants.intersection(self.lattice_nodes)
-            descendants.remove(n)
-
-            for d in descendants:
-                edge_len = self.num_set_bits[d]-self.num_set_bits[n]
-                if add_edge_labels:
-                    self.summary_lattice.add_edge(n, d, minlen=edge_len, label=str(edge_len),
-                                                  **self.get_edge_style((n, d), colorscheme))
-                else:
-                    self.summary_lattice.add_edge(n, d, minlen=edge_len, **self.get_edge_style((n, d), colorscheme))
+
+        for n, d in self.get_summary_edges(self.lattice_nodes, edge_mode=edge_mode):
+            edge_len = self.num_set_bits[d]-self.num_set_bits[n]
+            if add_edge_labels:
+                self.summary_lattice.add_edge(n, d, minlen=edge_len, label=str(edge_len),
+                                              **self.get_edge_style((n, d), colorscheme))
+            else:
+                self.summary_lattice.add_edge(n, d, minlen=edge_len, **self.get_edge_style((n, d), colorscheme))
 
         return self.summary_lattice
 
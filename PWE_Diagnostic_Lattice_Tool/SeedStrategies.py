@@ -0,0 +1,184 @@
+from .ConstraintMap import ConstraintMap
+import random
+
+
+class SeedStrategy:
+    """
+    Picks the next seed of a MARCO loop (see DiagnosisAlgorithms) among the unexplored nodes of the map. The seed order
+    doesn't change the results, only how many oracle calls it takes to find them.
+    A strategy is told what the run is looking for (start) and about every result as it is confirmed (update). After
+    every get_seed, extremal says whether the seed is a largest ('max') or a smallest ('min') unexplored node, if it is:
+        - a largest unexplored node that is SAT (ambiguous) is an MSS (MAS), no need to grow it
+        - a smallest unexplored node that is UNSAT (unambiguous) is a MUS (MUAS), no need to shrink it
+    (unless it has unknown neighbours, which the loops check for anyway).
+    """
+
+    name = None
+
+    def __init__(self):
+        self.extremal = None
+        self.targets = {}
+        self.num_found = {}
+
+    def start(self, targets: dict):
+        """
+        :param targets: Dict: result type --> number of results to find (math.inf for all), the minimal result type
+                        (MUS / MUAS) first
+        """
+        self.extremal = None
+        self.targets = dict(targets)
+        self.num_found = dict([(t, 0) for t in targets])
+
+    def update(self, result_type: str, result):
+        self.num_found[result_type] = self.num_found.get(result_type, 0) + 1
+
+    def get_seed(self, cmap: ConstraintMap, return_seed_int=False):
+        """
+        :param return_seed_int: Also return the int representation of the seed (BitConstraintMaps only)
+        :return: Seed (set of constraints), None once the map is completely explored. (Seed, Seed int) if
+                 return_seed_int.
+        """
+        raise NotImplementedError
+
+    @staticmethod
+    def _get_(cmap: ConstraintMap, method: str, return_seed_int=False, **kwargs):
+        if return_seed_int:
+            return getattr(cmap, method)(return_seed_int=True, **kwargs)
+        return getattr(cmap, method)(**kwargs)
+
+
+class RandomSeed(SeedStrategy):
+    """
+    Any unexplored node (see ConstraintMap.get_unexplored), the MARCO default.
+    """
+
+    name = 'random'
+
+    def __init__(self, seed=None):
+        """
+        :param seed: (Optional) Seed of the strategy's own random.Random, for reproducible runs. W/o it, the map picks
+                     the node (with the random module, for the BitConstraintMap)
+        """
+        SeedStrategy.__init__(self)
+        self.rng = random.Random(seed) if seed is not None else None
+
+    def get_seed(self, cmap: ConstraintMap, return_seed_int=False):
+        self.extremal = None
+        if self.rng is None:
+            return self._get_(cmap, 'get_unexplored', return_seed_int)
+        return self._get_(cmap, 'get_unexplored', return_seed_int, rng=self.rng)
+
+
+class LargestFirst(SeedStrategy):
+    """
+    The unexplored node w/ the most constraints (see ConstraintMap.get_unexplored_max), the MARCO PLUS order. Biased
+    towards the MUSes (MUASes): large seeds are mostly UNSAT (unambiguous), and shrunk into a MUS (MUAS).
+    """
+
+    name = 'largest'
+
+    def get_seed(self, cmap: ConstraintMap, return_seed_int=False):
+        self.extremal = 'max'
+        return self._get_(cmap, 'get_unexplored_max', return_seed_int)
+
+
+class SmallestFirst(SeedStrategy):
+    """
+    The unexplored node w/ the fewest constraints (see ConstraintMap.get_unexplored_min). Biased towards the MSSes
+    (MASes): small seeds are mostly SAT (ambiguous), and grown into an MSS (MAS).
+    """
+
+    name = 'smallest'
+
+    def get_seed(self, cmap: ConstraintMap, return_seed_int=False):
+        self.extremal = 'min'
+        return self._get_(cmap, 'get_unexplored_min', return_seed_int)
+
+
+class ClosestToMUS(SeedStrategy):
+    """
+    The unexplored node closest to the last MUS (MUAS) found (see ConstraintMap.get_unexplored_closest), as MUSes
+    tend to share most of their constraints. Largest first until the first one is found.
+    """
+
+    name = 'closest_mus'
+
+    def __init__(self):
+        SeedStrategy.__init__(self)
+        self.last_minimal = None
+
+    def start(self, targets: dict):
+        SeedStrategy.start(self, targets)
+        self.last_minimal = None
+
+    def update(self, result_type: str, result):
+        SeedStrategy.update(self, result_type, result)
+        if result_type in ['MUS', 'MUAS']:
+            self.last_minimal = set(result)
+
+    def get_seed(self, cmap: ConstraintMap, return_seed_int=False):
+        if self.last_minimal is None:
+            self.extremal = 'max'
+            return self._get_(cmap, 'get_unexplored_max', return_seed_int)
+        self.extremal = None
+        return self._get_(cmap, 'get_unexplored_closest', return_seed_int, target=self.last_minimal)
+
+
+class AlternatingUpDown(SeedStrategy):
+    """
+    Largest and smallest unexplored nodes in turn, for both kinds of results at an even pace.
+    """
+
+    name = 'alternating'
+
+    def get_seed(self, cmap: ConstraintMap, return_seed_int=False):
+        if self.extremal == 'max':
+            self.extremal = 'min'
+            return self._get_(cmap, 'get_unexplored_min', return_seed_int)
+        self.extremal = 'max'
+        return self._get_(cmap, 'get_unexplored_max', return_seed_int)
+
+
+class Adaptive(AlternatingUpDown):
+    """
+    Picks the order from the results that are still missing: largest first once only MUSes (MUASes) are missing,
+    smallest first once only MSSes (MASes) are, alternating while both are.
+    """
+
+    name = 'adaptive'
+
+    def get_missing(self):
+        """
+        :return: List of the result types that haven't reached their target yet
+        """
+        return [t for t, target in self.targets.items() if self.num_found.get(t, 0) < target]
+
+    def get_seed(self, cmap: ConstraintMap, return_seed_int=False):
+        missing = self.get_missing()
+        if len(missing) == 1:
+            minimal_type = list(self.targets.keys())[0]
+            self.extremal = 'max' if missing[0] == minimal_type else 'min'
+            method = 'get_unexplored_max' if self.extremal == 'max' else 'get_unexplored_min'
+            return self._get_(cmap, method, return_seed_int)
+        return AlternatingUpDown.get_seed(self, cmap, return_seed_int)
+
+
+class SeedStrategies:
+
+    # name --> SeedStrategy class
+    STRATEGIES = dict([(s.name, s) for s in [RandomSeed, LargestFirst, SmallestFirst, ClosestToMUS,
+                                             AlternatingUpDown, Adaptive]])
+
+    @staticmethod
+    def get_strategy(name: str, seed=None):
+        """
+        :param name: Key of STRATEGIES
+        :param seed: (Optional) Seed for the 'random' strategy
+        :return: A new SeedStrategy
+        """
+        if name not in SeedStrategies.STRATEGIES:
+            print("Unknown seed strategy: {}, using 'random'.".format(name))
+            name = 'random'
+        if name == 'random':
+            return RandomSeed(seed=seed)
+        return SeedStrategies.STRATEGIES[name]()
@@ -0,0 +1,316 @@
+from .BitConstraintMap import BitConstraintMap
+from .DiagnosisSetup import DiagnosisSetup
+from .LatticeNode import NodeAmbiguityType, NumPWSType
+from .PowersetBitLib import PowersetBitLib
+from .SeedStrategies import SeedStrategies
+from .SharedNodeBitmaps import SharedNodeBitmaps
+import multiprocessing
+import queue
+import random
+import time
+
+
+class SharedBitConstraintMap(BitConstraintMap):
+    """
+    A BitConstraintMap for one of several worker processes exploring the same lattice on one host. Every process has
+    its own map, but what they find is written through to SharedNodeBitmaps, shared by all of them:
+        - the explored nodes (blocks), caught up with before every seed (see sync)
+        - the SAT/UNSAT/ambiguous/unambiguous nodes, read when the map is checked for a node's status, so a node
+          evaluated (or inferred) by any of the workers is never sent to the solver again
+        - the nodes that hit the solver limits, so that no worker confirms a result next to one (see
+          has_unknown_children). Every worker's retries take over the ones left by the others (see reopen_unknown)
+        - the seeds, claimed before they are explored so that no two workers explore the same one. The unexplored
+          nodes claimed by another worker are skipped, or waited for if the seed strategy needs the largest (smallest)
+          unexplored node: they are either explored or unknown once that worker is done w/ them, and then left to it
+    There is no coordinator, the workers (see run) only share the bitmaps. The same result can still be found by two
+    workers at once (from different seeds), only the first one to record it reports it (see record_result).
+    The number of constraints is fixed: add_constraint and remove_constraint aren't supported.
+    """
+
+    def __init__(self, constraints: list, bitmaps: SharedNodeBitmaps=None, poll_interval: float=0.01):
+        """
+        :param bitmaps: (Optional) The SharedNodeBitmaps of the other workers (default: new ones)
+        :param poll_interval: Seconds to wait for the seeds claimed by other workers
+        """
+        BitConstraintMap.__init__(self, constraints)
+        self.bitmaps = bitmaps if bitmaps is not None else SharedNodeBitmaps(len(constraints))
+        self.poll_interval = poll_interval
+        self.claimed_set = set([])  # Seeds claimed by this worker
+        self.sync()
+
+    def sync(self):
+        """
+        Take the nodes explored by the other workers out of the unexplored set.
+        """
+        explored = [n for n in self.unexplored_set if self.bitmaps.test('explored', n)]
+        BitConstraintMap._add_to_status_set_(self, 'explored', explored)
+
+    def _add_to_status_set_(self, status, nodes):
+        nodes = list(nodes)
+        self.bitmaps.set(status, nodes)
+        BitConstraintMap._add_to_status_set_(self, status, nodes)
+
+    def block_down(self, constraints, constraints_int: int=None, strict=False):
+        """
+        :param strict: Only block the proper ancestors, i.e. leave the node itself as is.
+        """
+        if constraints_int is None:
+            constraints_int = self.constraint_set_to_int(constraints)
+        ancestors = PowersetBitLib.get_ancestors(constraints_int, self.num_constraints)
+        if strict:
+            ancestors.remove(constraints_int)
+        # Smallest first, so that a worker that sees a node blocked also sees every node below it blocked (see
+        # _get_seed_)
+        self.bitmaps.set('explored', sorted(ancestors, key=PowersetBitLib.get_num_set_bits), ordered=True)
+        BitConstraintMap._add_to_status_set_(self, 'explored', ancestors)
+        self.log_change('down', constraints_int)
+
+    def block_up(self, constraints, constraints_int: int=None, strict=False):
+        """
+        :param strict: Only block the proper descendants, i.e. leave the node itself as is.
+        """
+        if constraints_int is None:
+            constraints_int = self.constraint_set_to_int(constraints)
+        descendants = PowersetBitLib.get_descendants(constraints_int, self.num_constraints)
+        if strict:
+            descendants.remove(constraints_int)
+        # Largest first, see block_down
+        self.bitmaps.set('explored', sorted(descendants, key=PowersetBitLib.get_num_set_bits, reverse=True),
+                         ordered=True)
+        BitConstraintMap._add_to_status_set_(self, 'explored', descendants)
+        self.log_change('up', constraints_int)
+
+    def update_num_pws(self, constraints, num_pws, num_pws_eval_type: NumPWSType):
+        n = self.__constraints_to_int_helper__(constraints)
+        BitConstraintMap.update_num_pws(self, n, num_pws, num_pws_eval_type)
+        if num_pws_eval_type == NumPWSType.unevaluated:
+            return
+        if num_pws == 0:
+            self.bitmaps.set('unsat', [n])
+        else:
+            self.bitmaps.set('sat', [n])
+        if num_pws >= 2:
+            self.bitmaps.set('ambiguous', [n])
+        elif (num_pws == 1) and (num_pws_eval_type == NumPWSType.exact):
+            self.bitmaps.set('unambiguous', [n])
+        self.bitmaps.clear('unknown', [n])
+
+    def mark_unknown(self, constraints):
+        n = self.__constraints_to_int_helper__(constraints)
+        BitConstraintMap.mark_unknown(self, n)
+        self.bitmaps.set('unknown', [n])
+
+    def reopen_unknown(self):
+        """
+        Also takes over the nodes of the other workers that are still unknown (they may be done retrying already), so
+        the results next to them can be confirmed.
+        """
+        adopted = [n for n in self.bitmaps.get_nodes('unknown') if not self.bitmaps.test('explored', n)]
+        self.unknown_set.update(adopted)
+        self.claimed_set.update(adopted)
+        unknown = list(self.unknown_set)
+        reopened = BitConstraintMap.reopen_unknown(self)
+        self.bitmaps.clear('unknown', unknown)
+        return reopened
+
+    def _is_shared_unknown_(self, n):
+        return self.bitmaps.test('unknown', n) and not self.bitmaps.test('explored', n)
+
+    def is_unknown(self, constraints):
+        n = self.__constraints_to_int_helper__(constraints)
+        return (n in self.unknown_set) or self._is_shared_unknown_(n)
+
+    def has_unknown_children(self, constraints):
+        n = self.__constraints_to_int_helper__(constraints)
+        return BitConstraintMap.has_unknown_children(self, n) or \
+            any(self._is_shared_unknown_(c) for c in PowersetBitLib.get_children(n, self.num_constraints))
+
+    def has_unknown_parents(self, constraints):
+        n = self.__constraints_to_int_helper__(constraints)
+        return BitConstraintMap.has_unknown_parents(self, n) or \
+            any(self._is_shared_unknown_(p) for p in PowersetBitLib.get_parents(n, self.num_constraints))
+
+    def _check_node_sat_explicit_(self, constraints, check_against_memoized_sets=True):
+        n = self.__constraints_to_int_helper__(constraints)
+        k = BitConstraintMap._check_node_sat_explicit_(self, n, check_against_memoized_sets)
+        if (k is None) and check_against_memoized_sets:
+            if self.bitmaps.test('sat', n):
+                return True
+            if self.bitmaps.test('unsat', n):
+                return False
+        return k
+
+    def _check_node_ambiguity_explicit_(self, constraints, check_against_memoized_sets=True):
+        n = self.__constraints_to_int_helper__(constraints)
+        k = BitConstraintMap._check_node_ambiguity_explicit_(self, n, check_against_memoized_sets)
+        if (k is None) and check_against_memoized_sets:
+            if self.bitmaps.test('ambiguous', n):
+                return NodeAmbiguityType.ambiguous
+            if self.bitmaps.test('unsat', n):
+                return NodeAmbiguityType.unsat
+            if self.bitmaps.test('unambiguous', n):
+                return NodeAmbiguityType.unambiguous
+        return k
+
+    def _get_seed_(self, pick, extremal=None, return_seed_int=False, required=None):
+        """
+        Claim an unexplored node.
+        :param pick: Function picking the seed from a (non-empty) list of candidate ints
+        :param extremal: None, 'max' or 'min': only the largest (smallest) unexplored nodes are candidates, waiting for
+                         the other workers if they have claimed them all
+        :param required: (Optional) Constraints the seed must contain
+        """
+        required_int = self.constraint_set_to_int(required) if required is not None else 0
+        seed = None
+        while seed is None:
+            self.sync()
+            available, pending = [], []
+            for n in self.unexplored_set:
+                if n & required_int != required_int:
+                    continue
+                if (n in self.claimed_set) or not self.bitmaps.test('claimed', n):
+                    available.append(n)
+                elif not self.bitmaps.test('unknown', n):  # Not done w/ yet by the worker that claimed it
+                    pending.append(n)
+            # The unknown nodes claimed by other workers are theirs to retry
+            self.unexplored_set.difference_update([n for n in self.unexplored_set if (n & required_int == required_int)
+                                                   and (n not in self.claimed_set) and self.bitmaps.test('claimed', n)
+                                                   and self.bitmaps.test('unknown', n)])
+            if extremal is not None:
+                sign = 1 if extremal == 'max' else -1
+                sizes = [sign * PowersetBitLib.get_num_set_bits(n) for n in available + pending]
+                if len(sizes) > 0:
+                    available = [n for n in available if sign * PowersetBitLib.get_num_set_bits(n) == max(sizes)]
+            if len(available) > 0:
+                n = pick(available)
+                if (n in self.claimed_set) or not self.bitmaps.test_and_set('claimed', n):
+                    self.claimed_set.add(n)
+                    # Blocked while picking it (w/ a node above (below) it, which made it look like the largest
+                    # (smallest) one): the blocks are written in order, so it is blocked by now
+                    if not self.bitmaps.test('explored', n):
+                        seed = n
+            elif len(pending) > 0:
+                time.sleep(self.poll_interval)
+            else:
+                break
+
+        if seed is None:
+            if return_seed_int:
+                return None, None
+            return None
+        if return_seed_int:
+            return self.int_to_constraint_set(seed), seed
+        return self.int_to_constraint_set(seed)
+
+    def get_unexplored(self, return_seed_int=False, rng: random.Random=None):
+        return self._get_seed_((rng if rng is not None else random).choice, return_seed_int=return_seed_int)
+
+    def get_unexplored_max(self, return_seed_int=False):
+        return self._get_seed_(lambda nodes: nodes[0], extremal='max', return_seed_int=return_seed_int)
+
+    def get_unexplored_min(self, return_seed_int=False, required=None):
+        return self._get_seed_(lambda nodes: nodes[0], extremal='min', return_seed_int=return_seed_int,
+                               required=required)
+
+    def get_unexplored_closest(self, target, return_seed_int=False):
+        target_int = self.__constraints_to_int_helper__(target)
+        return self._get_seed_(lambda nodes: min(nodes, key=lambda n: PowersetBitLib.get_num_set_bits(n ^ target_int)),
+                               return_seed_int=return_seed_int)
+
+    def record_result(self, result_type: str, result) -> bool:
+        """
+        :param result_type: 'MUS', 'MSS', 'MUAS' or 'MAS'
+        :return: bool, whether this worker is the first one to record it
+        """
+        return not self.bitmaps.test_and_set(result_type, self.__constraints_to_int_helper__(result))
+
+    def get_unknown(self, return_ints=False):
+        """
+        :return: The nodes that hit the solver limits (for any of the workers) and haven't been explored since
+        """
+        unknown = [n for n in self.bitmaps.get_nodes('unknown') if not self.bitmaps.test('explored', n)]
+        if return_ints:
+            return unknown
+        return [set(self.int_to_constraint_set(n)) for n in unknown]
+
+    def get_num_explored(self):
+        return self.bitmaps.count('explored')
+
+    def add_constraint(self, constraint, index: int=None, search: str=None):
+        print("Constraints can't be added to a SharedBitConstraintMap.")
+
+    def remove_constraint(self, constraint):
+        print("Constraints can't be removed from a SharedBitConstraintMap.")
+
+    @staticmethod
+    def _run_worker_(bitmaps: SharedNodeBitmaps, constraints: list, cnf_prog, algorithm: str, options: dict,
+                     worker_index: int, results):
+        cmap = SharedBitConstraintMap(constraints, bitmaps=bitmaps)
+        cnf_prog = cnf_prog() if callable(cnf_prog) else cnf_prog
+        func, _, _ = DiagnosisSetup.ALGORITHMS[algorithm]
+
+        def on_result(result_type, result):
+            if cmap.record_result(result_type, result):
+                results.put(('result', result_type, sorted(result)))
+
+        kwargs = {}
+        if ((options.get('seed_strategy') is not None) or (options.get('random_seed') is not None)) and \
+                not algorithm.endswith('_plus'):
+            seed = options.get('random_seed')
+            seed = seed + worker_index if seed is not None else None
+            kwargs['seed_strategy'] = SeedStrategies.get_strategy(options.get('seed_strategy') or 'random', seed=seed)
+        try:
+            func(cmap, cnf_prog, max_retries=options.get('max_retries', 1),
+                 retry_limit_factor=options.get('retry_limit_factor', 2), result_callback=on_result, **kwargs)
+        finally:
+            results.put(('done', worker_index, None))
+            cmap.bitmaps.close()
+
+    @staticmethod
+    def run(cnf_prog, constraints: list, algorithm: str='marco', num_workers: int=2, options: dict=None,
+            result_callback=None):
+        """
+        Explore the lattice w/ num_workers processes sharing one map.
+        :param cnf_prog: LogicProgram over the constraints, passed on to the worker processes (inherited w/ the 'fork'
+                         start method, pickled otherwise), or a function returning one, called in every worker (e.g.
+                         to build its own ASP_LogicProgram)
+        :param algorithm: Key of DiagnosisSetup.ALGORITHMS
+        :param options: (Optional) Dict w/ 'max_retries', 'retry_limit_factor', 'seed_strategy' and 'random_seed' (the
+                        workers' random seeds are random_seed + the worker's index)
+        :param result_callback: (Optional) Function to call with (type, result) for every result, as soon as a worker
+                                reports it
+        :return: Dict: 'results' (result type --> list of sets of constraints), 'unknown', 'explored', 'total'
+        """
+        _, result_types, _ = DiagnosisSetup.ALGORITHMS[algorithm]
+        options = options if options is not None else {}
+        bitmaps = SharedNodeBitmaps(len(constraints))
+        results = multiprocessing.Queue()
+        found = dict([(t, []) for t in result_types])
+        try:
+            workers = [multiprocessing.Process(target=SharedBitConstraintMap._run_worker_,
+                                               args=(bitmaps, constraints, cnf_prog, algorithm, options, i, results))
+                       for i in range(num_workers)]
+            for worker in workers:
+                worker.start()
+            num_done = 0
+            while num_done < num_workers:
+                try:
+                    kind, result_type, result = results.get(timeout=1)
+                except queue.Empty:
+                    if all(not worker.is_alive() for worker in workers):
+                        break
+                    continue
+                if kind == 'done':
+                    num_done += 1
+                else:
+                    found[result_type].append(set(result))
+                    if result_callback is not None:
+                        result_callback(result_type, set(result))
+            for worker in workers:
+                worker.join()
+            cmap = SharedBitConstraintMap(constraints, bitmaps=bitmaps)
+            return {'results': found, 'unknown': cmap.get_unknown(), 'explored': cmap.get_num_explored(),
+                    'total': 2 ** len(constraints)}
+        finally:
+            bitmaps.close()
+            bitmaps.unlink()
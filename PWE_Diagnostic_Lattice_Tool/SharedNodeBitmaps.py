@@ -0,0 +1,131 @@
+from .PowersetBitLib import PowersetBitLib
+from collections import defaultdict
+from multiprocessing import shared_memory
+import multiprocessing
+
+
+class SharedNodeBitmaps:
+    """
+    One bit per node of the lattice and status, in a multiprocessing.shared_memory block, so that the processes of one
+    host see each other's updates right away (see SharedBitConstraintMap). Bits are only read w/o locking (a byte read
+    is atomic), every read-modify-write of a byte is done under the lock of its region: the bitmaps are split into
+    regions of region_bytes bytes, mapped onto num_locks locks round robin, so that workers updating different parts
+    of the lattice rarely wait on each other.
+    """
+
+    # Node statuses, one bitmap each, in this order in the shared block
+    STATUSES = ['explored', 'sat', 'unsat', 'ambiguous', 'unambiguous', 'unknown', 'claimed', 'MSS', 'MUS', 'MAS',
+                'MUAS']
+
+    def __init__(self, num_constraints: int, num_locks: int=64, region_bytes: int=4096, name: str=None):
+        """
+        :param num_constraints: Number of constraints, for 2^num_constraints nodes
+        :param num_locks: Number of locks the regions are striped over
+        :param region_bytes: Number of bytes per region
+        :param name: (Optional) Name of the shared memory block (default: a new one)
+        """
+        self.num_constraints = num_constraints
+        self.bitmap_bytes = max(1, (2 ** num_constraints) // 8)
+        self.region_bytes = region_bytes
+        self.shm = shared_memory.SharedMemory(name=name, create=True, size=self.bitmap_bytes * len(self.STATUSES))
+        self.shm.buf[:self.shm.size] = bytes(self.shm.size)
+        self.locks = [multiprocessing.Lock() for _ in range(num_locks)]
+        self.offsets = dict([(s, i * self.bitmap_bytes) for i, s in enumerate(self.STATUSES)])
+
+    def __getstate__(self):
+        # For the worker processes, which attach to the same block (the locks can only be passed on to them when they
+        # are started, e.g. as multiprocessing.Process args)
+        state = dict(self.__dict__)
+        state['shm'] = self.shm.name
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.shm = shared_memory.SharedMemory(name=state['shm'])
+
+    def _get_byte_(self, status: str, n: int):
+        return self.offsets[status] + (n >> 3), 1 << (n & 7)
+
+    def _get_lock_(self, i: int):
+        return self.locks[(i // self.region_bytes) % len(self.locks)]
+
+    def test(self, status: str, n: int) -> bool:
+        i, mask = self._get_byte_(status, n)
+        return (self.shm.buf[i] & mask) != 0
+
+    def test_any(self, status: str, nodes) -> bool:
+        return any(self.test(status, n) for n in nodes)
+
+    def set(self, status: str, nodes, ordered=False):
+        """
+        Set the bits of the nodes, taking every region's lock once.
+        :param ordered: Set them in the order of nodes instead, i.e. whoever sees one of them set also sees the ones
+                        before it set (taking the locks once per run of nodes in the same region)
+        """
+        if ordered:
+            buf = self.shm.buf
+            run_lock, run = None, []
+            for n in list(nodes) + [None]:
+                i, mask = self._get_byte_(status, n) if n is not None else (None, 0)
+                lock_index = (i // self.region_bytes) % len(self.locks) if n is not None else None
+                if (lock_index != run_lock) and (len(run) > 0):
+                    with self.locks[run_lock]:
+                        for j, m in run:
+                            buf[j] |= m
+                    run = []
+                run_lock = lock_index
+                run.append((i, mask))
+            return
+        by_lock = defaultdict(lambda: defaultdict(int))
+        for n in nodes:
+            i, mask = self._get_byte_(status, n)
+            by_lock[(i // self.region_bytes) % len(self.locks)][i] |= mask
+        buf = self.shm.buf
+        for lock_index, masks in by_lock.items():
+            with self.locks[lock_index]:
+                for i, mask in masks.items():
+                    buf[i] |= mask
+
+    def clear(self, status: str, nodes):
+        buf = self.shm.buf
+        for n in nodes:
+            i, mask = self._get_byte_(status, n)
+            if buf[i] & mask:
+                with self._get_lock_(i):
+                    buf[i] &= ~mask & 0xFF
+
+    def test_and_set(self, status: str, n: int) -> bool:
+        """
+        Set the node's bit, atomically.
+        :return: bool, whether it was set already (i.e. False for the one process that set it)
+        """
+        i, mask = self._get_byte_(status, n)
+        buf = self.shm.buf
+        if buf[i] & mask:
+            return True
+        with self._get_lock_(i):
+            was_set = (buf[i] & mask) != 0
+            buf[i] |= mask
+        return was_set
+
+    def get_nodes(self, status: str) -> list:
+        """
+        :return: List of ints, the nodes w/ the status's bit set
+        """
+        start = self.offsets[status]
+        bitmap = bytes(self.shm.buf[start:start + self.bitmap_bytes])
+        return [(i << 3) + b for i, byte in enumerate(bitmap) if byte for b in range(8) if (byte >> b) & 1]
+
+    def count(self, status: str) -> int:
+        start = self.offsets[status]
+        return PowersetBitLib.get_num_set_bits(int.from_bytes(bytes(self.shm.buf[start:start + self.bitmap_bytes]),
+                                                              'little'))
+
+    def close(self):
+        self.shm.close()
+
+    def unlink(self):
+        """
+        Free the shared memory block, once all the processes are done w/ it (by the process that created it).
+        """
+        self.shm.unlink()
@@ -0,0 +1,259 @@
+from PWE_Diagnostic_Lattice_Tool.BitConstraintMap import BitConstraintMap
+from PWE_Diagnostic_Lattice_Tool.DiagnosisAlgorithms import DiagnosisAlgorithms
+from PWE_Diagnostic_Lattice_Tool.SeedStrategies import SeedStrategies
+from .SyntheticLogicProgram import SyntheticLogicProgram
+from collections import defaultdict
+import argparse
+import json
+import os
+import platform
+import random
+import sys
+import time
+import tracemalloc
+
+
+class BenchmarkRunner:
+    """
+    Runs every marco* variant on SyntheticLogicPrograms of increasing size and records, per run: wall time, number of
+    oracle calls, time spent picking seeds (the get_unexplored* methods of the map), peak memory (traced in a separate
+    run, so that tracing doesn't inflate the wall time) and whether the results match the planted ground truth.
+    Results can be stored as a baseline and later runs compared against it:
+        python -m benchmarks.BenchmarkRunner --output benchmarks/baseline.json
+        python -m benchmarks.BenchmarkRunner --compare benchmarks/baseline.json
+    """
+
+    # variant --> (DiagnosisAlgorithms function, (result types, in the order the function returns them))
+    VARIANTS = {
+        'marco': (DiagnosisAlgorithms.marco, ('MUS', 'MSS')),
+        'marco_bit_optimized': (DiagnosisAlgorithms.marco_bit_optimized, ('MUS', 'MSS')),
+        'marco_plus': (DiagnosisAlgorithms.marco_plus, ('MUS', 'MSS')),
+        'marco_plus_bit_optimized': (DiagnosisAlgorithms.marco_plus_bit_optimized, ('MUS', 'MSS')),
+        'marco_ambiguous': (DiagnosisAlgorithms.marco_ambiguous, ('MUAS', 'MAS')),
+        'marco_ambiguous_bit_optimized': (DiagnosisAlgorithms.marco_ambiguous_bit_optimized, ('MUAS', 'MAS')),
+        'marco_ambiguous_plus': (DiagnosisAlgorithms.marco_ambiguous_plus, ('MUAS', 'MAS')),
+        'marco_ambiguous_plus_bit_optimized': (DiagnosisAlgorithms.marco_ambiguous_plus_bit_optimized,
+                                               ('MUAS', 'MAS')),
+    }
+    # Variants that take a seed_strategy (the _plus ones are largest first)
+    STRATEGY_VARIANTS = ['marco', 'marco_bit_optimized', 'marco_ambiguous', 'marco_ambiguous_bit_optimized']
+    ORACLE_METHODS = ['check_sat', 'check_ambiguity', 'count_solutions']
+    SEED_METHODS = ['get_unexplored', 'get_unexplored_max', 'get_unexplored_min', 'get_unexplored_closest']
+    DEFAULT_SIZES = [5, 8, 10, 12, 14, 16, 18, 20]
+    MAX_GROUND_TRUTH_SIZE = 16
+
+    @staticmethod
+    def count_oracle_calls(prog):
+        """
+        Count the queries made to prog (batched queries count once per subset).
+        :return: Dict: method name --> number of calls, kept up to date
+        """
+        counts = defaultdict(int)
+
+        def counted(name, func):
+            def wrapper(*args, **kwargs):
+                counts[name] += 1
+                return func(*args, **kwargs)
+            return wrapper
+
+        for name in BenchmarkRunner.ORACLE_METHODS:
+            setattr(prog, name, counted(name, getattr(prog, name)))
+        return counts
+
+    @staticmethod
+    def time_seed_selection(cmap):
+        """
+        :return: Dict: 'calls', 'time' spent in cmap's seed selection, kept up to date
+        """
+        timings = {'calls': 0, 'time': 0.}
+
+        def timed(func):
+            def wrapper(*args, **kwargs):
+                start = time.perf_counter()
+                try:
+                    return func(*args, **kwargs)
+                finally:
+                    timings['time'] += time.perf_counter() - start
+                    timings['calls'] += 1
+            return wrapper
+
+        for name in BenchmarkRunner.SEED_METHODS:
+            setattr(cmap, name, timed(getattr(cmap, name)))
+        return timings
+
+    @staticmethod
+    def _get_map_(prog, map_type):
+        if map_type == 'asp':
+            from PWE_Diagnostic_Lattice_Tool.ASPConstraintMap import ASPConstraintMap
+            return ASPConstraintMap(prog.constraints)
+        return BitConstraintMap(prog.constraints)
+
+    @staticmethod
+    def run_one(variant: str, prog, map_type='bit', seed=0, measure_memory=True, ground_truth=None,
+                seed_strategy: str=None):
+        """
+        :param variant: Key of VARIANTS
+        :param prog: LogicProgram with a constraints attribute (e.g. a SyntheticLogicProgram)
+        :param map_type: 'bit' (BitConstraintMap) or 'asp' (ASPConstraintMap, only for the plain variants)
+        :param seed: Seed for the random seed selection of the maps
+        :param ground_truth: (Optional) See SyntheticLogicProgram.get_ground_truth, to check the results against
+        :param seed_strategy: (Optional) Key of SeedStrategies.STRATEGIES, for the STRATEGY_VARIANTS
+        :return: Dict with the measurements
+        """
+        func, result_types = BenchmarkRunner.VARIANTS[variant]
+
+        def get_kwargs():
+            if seed_strategy is None:
+                return {}
+            return {'seed_strategy': SeedStrategies.get_strategy(seed_strategy, seed=seed)}
+
+        random.seed(seed)
+        cmap = BenchmarkRunner._get_map_(prog, map_type)
+        oracle_calls = BenchmarkRunner.count_oracle_calls(prog)
+        seed_timings = BenchmarkRunner.time_seed_selection(cmap)
+        start = time.perf_counter()
+        results = func(cmap, prog, **get_kwargs())
+        wall_time = time.perf_counter() - start
+        for name in BenchmarkRunner.ORACLE_METHODS:
+            delattr(prog, name)
+
+        record = {
+            'variant': variant, 'seed_strategy': seed_strategy, 'map': map_type, 'n': len(prog.constraints),
+            'seed': seed,
+            'wall_time': wall_time, 'oracle_calls': sum(oracle_calls.values()), 'oracle_calls_by_method':
+            dict(oracle_calls), 'seed_selection_time': seed_timings['time'], 'seed_selection_calls':
+            seed_timings['calls'],
+        }
+        for result_type, found in zip(result_types, results):
+            record['num_{}'.format(result_type.lower())] = len(found)
+        record['correct'] = None
+        if ground_truth is not None:
+            record['correct'] = all(set([frozenset(r) for r in found]) == ground_truth[result_type]
+                                    for result_type, found in zip(result_types, results))
+
+        record['peak_memory'] = None
+        if measure_memory:
+            random.seed(seed)
+            tracemalloc.start()
+            func(BenchmarkRunner._get_map_(prog, map_type), prog, **get_kwargs())
+            record['peak_memory'] = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+        return record
+
+    @staticmethod
+    def run_suite(sizes=None, seeds=(0,), variants=None, use_asp=False, map_type='bit', measure_memory=True,
+                  max_nodes=2 ** 20, log=None, seed_strategies=(None,)):
+        """
+        :param sizes: Numbers of constraints to benchmark (default: DEFAULT_SIZES)
+        :param seeds: Seeds, one synthetic program (and one run per variant) per seed and size
+        :param variants: Keys of VARIANTS to run (default: all)
+        :param use_asp: Query the ASP version of the synthetic programs (needs clingo) instead of the pure-Python one
+        :param map_type: 'bit' or 'asp', see run_one
+        :param max_nodes: Skip the sizes whose lattice has more nodes than this (the maps keep them all in memory)
+        :param log: (Optional) Function to call with every record, as it is measured
+        :param seed_strategies: Keys of SeedStrategies.STRATEGIES to run the STRATEGY_VARIANTS with (None for their
+                                default)
+        :return: List of records, see run_one
+        """
+        sizes = sizes if sizes is not None else BenchmarkRunner.DEFAULT_SIZES
+        variants = variants if variants is not None else list(BenchmarkRunner.VARIANTS.keys())
+        records = []
+        for n in sizes:
+            if 2 ** n > max_nodes:
+                print("Skipping n = {}, the lattice has more than {} (max_nodes) nodes.".format(n, max_nodes),
+                      file=sys.stderr)
+                continue
+            for seed in seeds:
+                synthetic = SyntheticLogicProgram.generate(n, num_mus=max(2, n // 3),
+                                                           num_unambiguous_cores=max(2, n // 4), seed=seed)
+                ground_truth = synthetic.get_ground_truth() if n <= BenchmarkRunner.MAX_GROUND_TRUTH_SIZE else None
+                prog = synthetic.get_asp_program() if use_asp else synthetic
+                for variant in variants:
+                    if (map_type == 'asp') and variant.endswith('_bit_optimized'):
+                        continue
+                    for strategy in (seed_strategies if variant in BenchmarkRunner.STRATEGY_VARIANTS else [None]):
+                        record = BenchmarkRunner.run_one(variant, prog, map_type=map_type, seed=seed,
+                                                         measure_memory=measure_memory, ground_truth=ground_truth,
+                                                         seed_strategy=strategy)
+                        record['oracle'] = 'asp' if use_asp else 'python'
+                        records.append(record)
+                        if log is not None:
+                            log(record)
+        return records
+
+    @staticmethod
+    def get_record_key(record):
+        return record['variant'], record['map'], record.get('oracle', 'python'), record['n'], record['seed'], \
+            record.get('seed_strategy')
+
+    @staticmethod
+    def compare(records: list, baseline: list, threshold=1.25, min_time=0.01):
+        """
+        Compare the records against the baseline ones (matched on variant, map, oracle, n, seed and seed strategy).
+        :param threshold: Ratio (new / baseline) above which a measurement is flagged as a regression
+        :param min_time: Timings (in seconds) below this in the baseline are too noisy to flag
+        :return: List of (key, metric, baseline value, new value, ratio) for the regressions
+        """
+        baseline = dict([(BenchmarkRunner.get_record_key(r), r) for r in baseline])
+        regressions = []
+        for record in records:
+            key = BenchmarkRunner.get_record_key(record)
+            if key not in baseline:
+                continue
+            for metric in ['wall_time', 'oracle_calls', 'seed_selection_time', 'peak_memory']:
+                old, new = baseline[key].get(metric), record.get(metric)
+                if (old is None) or (new is None) or (old <= 0):
+                    continue
+                if metric.endswith('_time') and (old < min_time):
+                    continue
+                ratio = new / old
+                print("{:<36} n={:<3} seed={:<3} {:<20} {:>14.6g} -> {:>14.6g} ({:.2f}x)".format(
+                    key[0], key[3], key[4], metric, old, new, ratio))
+                if ratio > threshold:
+                    regressions.append((key, metric, old, new, ratio))
+            if baseline[key].get('correct') and (record.get('correct') is False):
+                regressions.append((key, 'correct', True, False, None))
+        return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the marco* variants on synthetic planted-MUS programs.")
+    parser.add_argument('--sizes', type=int, nargs='+', default=BenchmarkRunner.DEFAULT_SIZES,
+                        help="Numbers of constraints (default: {})".format(BenchmarkRunner.DEFAULT_SIZES))
+    parser.add_argument('--seeds', type=int, nargs='+', default=[0])
+    parser.add_argument('--variants', nargs='+', default=None, choices=sorted(BenchmarkRunner.VARIANTS.keys()))
+    parser.add_argument('--seed-strategies', nargs='+', default=[None],
+                        choices=sorted(SeedStrategies.STRATEGIES.keys()),
+                        help="Seed strategies to run the variants that take one with (default: their default)")
+    parser.add_argument('--asp', action='store_true', help="Query the ASP version of the programs (needs clingo)")
+    parser.add_argument('--map', default='bit', choices=['bit', 'asp'])
+    parser.add_argument('--no-memory', action='store_true', help="Skip the (separate) peak memory runs")
+    parser.add_argument('--max-nodes', type=int, default=2 ** 20)
+    parser.add_argument('--output', default=None, help="Store the results (as a baseline) in this JSON file")
+    parser.add_argument('--compare', default=None, help="Baseline JSON file to compare the results against")
+    parser.add_argument('--threshold', type=float, default=1.25)
+    args = parser.parse_args(argv)
+
+    def log(record):
+        name = record['variant'] if record['seed_strategy'] is None else '{variant}/{seed_strategy}'.format(**record)
+        print("{name:<48} n={n:<3} seed={seed:<3} wall={wall_time:.4f}s calls={oracle_calls:<6} "
+              "seed_sel={seed_selection_time:.4f}s correct={correct}".format(name=name, **record), file=sys.stderr)
+
+    records = BenchmarkRunner.run_suite(sizes=args.sizes, seeds=args.seeds, variants=args.variants, use_asp=args.asp,
+                                        map_type=args.map, measure_memory=not args.no_memory,
+                                        max_nodes=args.max_nodes, log=log, seed_strategies=args.seed_strategies)
+    if args.output is not None:
+        with open(args.output, 'w') as f:
+            json.dump({'python': platform.python_version(), 'machine': platform.machine(), 'cpu_count': os.cpu_count(),
+                       'records': records}, f, indent=1)
+    if args.compare is not None:
+        with open(args.compare, 'r') as f:
+            regressions = BenchmarkRunner.compare(records, json.load(f)['records'], threshold=args.threshold)
+        for key, metric, old, new, ratio in regressions:
+            print("REGRESSION {} {}: {} -> {}".format(key, metric, old, new))
+        return 1 if len(regressions) > 0 else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
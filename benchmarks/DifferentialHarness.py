@@ -0,0 +1,334 @@
+from PWE_Diagnostic_Lattice_Tool.BitConstraintMap import BitConstraintMap
+from PWE_Diagnostic_Lattice_Tool.DiagnosisAlgorithms import DiagnosisAlgorithms
+from PWE_Diagnostic_Lattice_Tool.DiagnosisQueries import DiagnosisQueries
+from PWE_Diagnostic_Lattice_Tool.PowersetBitLib import PowersetBitLib
+from PWE_Diagnostic_Lattice_Tool.PowersetLatticeWriter import PowersetLatticeWriter
+from PWE_Diagnostic_Lattice_Tool.SeedStrategies import SeedStrategies
+from .BenchmarkRunner import BenchmarkRunner
+from .SyntheticLogicProgram import SyntheticLogicProgram
+from collections import Counter
+import argparse
+import io
+import math
+import random
+import sys
+
+
+class DifferentialHarness:
+    """
+    Differential correctness checks for the maps and the algorithms. Every algorithm is run with every map on randomly
+    generated (monotone) SyntheticLogicPrograms, and the results are checked against the brute-forced ground truth,
+    which makes all the combinations agree with each other: plain vs bit optimized, BitConstraintMap vs
+    ASPConstraintMap, and whatever else is registered in MAPS. The oracle queries are recorded too, to catch
+    memoisation regressions:
+        - a bit optimized variant must not make more queries than its plain version (same map, same seed)
+        - no subset should be queried more than once (per query type) within a run
+    The variants that take a seed strategy are also run with every one of the seed_strategies (see SeedStrategies).
+    The DiagnosisQueries are checked on a map reused from a marco run, and on a fresh one (see check_queries).
+    A run w/o any views must not grow the BitConstraintMap change log past its cap (see check_change_log).
+    Whatever the seed strategy, the results must be recorded in the map w/ their statuses (see check_extremal_records).
+    The DOT output of PowersetLatticeWriter must style every node w/ its own class only (see check_write_dot).
+    Run with: python -m benchmarks.DifferentialHarness
+    """
+
+    # map name --> function: constraints --> ConstraintMap. Maps that can't be built here (missing dependencies) are
+    # skipped, see get_available_maps
+    MAPS = {
+        'bit': lambda constraints: BitConstraintMap(constraints),
+        'asp': lambda constraints: DifferentialHarness._get_asp_map_(constraints),
+    }
+    # Maps that implement the BitConstraintMap API, for the bit optimized variants
+    BIT_MAPS = ['bit']
+
+    @staticmethod
+    def _get_asp_map_(constraints):
+        import PW_explorer  # Only imported by the map once it is queried, fail early instead
+        from PWE_Diagnostic_Lattice_Tool.ASPConstraintMap import ASPConstraintMap
+        return ASPConstraintMap(constraints)
+
+    @staticmethod
+    def get_available_maps(map_names=None):
+        available = []
+        for name in (map_names if map_names is not None else DifferentialHarness.MAPS.keys()):
+            try:
+                DifferentialHarness.MAPS[name](['a'])
+            except ImportError as e:
+                print("Skipping the '{}' map: {}".format(name, e), file=sys.stderr)
+                continue
+            available.append(name)
+        return available
+
+    @staticmethod
+    def record_queries(prog):
+        """
+        Record the queries made to prog.
+        :return: List of (method name, frozenset of constraints), kept up to date
+        """
+        queries = []
+
+        def recorded(name, func):
+            def wrapper(constraints, *args, **kwargs):
+                queries.append((name, frozenset(constraints)))
+                return func(constraints, *args, **kwargs)
+            return wrapper
+
+        for name in BenchmarkRunner.ORACLE_METHODS:
+            setattr(prog, name, recorded(name, getattr(prog, name)))
+        return queries
+
+    @staticmethod
+    def run_case(prog, variant: str, map_name: str, seed=0, seed_strategy: str=None):
+        """
+        :param seed_strategy: (Optional) Key of SeedStrategies.STRATEGIES to run the variant with
+        :return: Dict: 'results' (result type --> set of frozensets), 'num_queries', 'num_duplicate_queries'
+        """
+        func, result_types = BenchmarkRunner.VARIANTS[variant]
+        random.seed(seed)
+        cmap = DifferentialHarness.MAPS[map_name](prog.constraints)
+        kwargs = {}
+        if seed_strategy is not None:
+            kwargs['seed_strategy'] = SeedStrategies.get_strategy(seed_strategy, seed=seed)
+        queries = DifferentialHarness.record_queries(prog)
+        try:
+            results = func(cmap, prog, **kwargs)
+        finally:
+            for name in BenchmarkRunner.ORACLE_METHODS:
+                delattr(prog, name)
+        return {
+            'results': dict([(result_type, set([frozenset(r) for r in found]))
+                             for result_type, found in zip(result_types, results)]),
+            'num_queries': len(queries),
+            'num_duplicate_queries': sum([count - 1 for count in Counter(queries).values()]),
+        }
+
+    @staticmethod
+    def check_queries(prog: SyntheticLogicProgram, desc: str=''):
+        """
+        Ask every DiagnosisQueries question about every constraint, on a BitConstraintMap already explored by
+        marco_bit_optimized (its MUSes recorded) and on a fresh one.
+        :return: List of failure messages (empty if the answers agree w/ the ground truth)
+        """
+        ground_truth = prog.get_ground_truth()
+        relevant = set([c for mus in ground_truth['MUS'] for c in mus])
+        min_size = min([len(mus) for mus in ground_truth['MUS']], default=None)
+        failures = []
+        reused = BitConstraintMap(prog.constraints)
+        DiagnosisAlgorithms.marco_bit_optimized(reused, prog)
+        for map_desc, cmap in [('reused', reused), ('fresh', BitConstraintMap(prog.constraints))]:
+            for c in prog.constraints:
+                mus = DiagnosisQueries.find_mus_containing(cmap, prog, c)
+                if (mus is not None) and not (isinstance(mus, set) and (frozenset(mus) in ground_truth['MUS'])
+                                              and (c in mus)):
+                    failures.append("find_mus_containing({}) on a {} map: {} isn't a MUS w/ it ({})".format(
+                        c, map_desc, mus, desc))
+                if DiagnosisQueries.is_in_some_mus(cmap, prog, c) != (c in relevant):
+                    failures.append("is_in_some_mus({}) on a {} map: wrong answer ({})".format(c, map_desc, desc))
+                mss = DiagnosisQueries.find_mss_without(cmap, prog, c)
+                if (mss is not None) and not ((frozenset(mss) in ground_truth['MSS']) and (c not in mss)):
+                    failures.append("find_mss_without({}) on a {} map: {} isn't an MSS w/o it ({})".format(
+                        c, map_desc, mss, desc))
+                if DiagnosisQueries.is_in_every_mss(cmap, prog, c) != (c not in relevant):
+                    failures.append("is_in_every_mss({}) on a {} map: wrong answer ({})".format(c, map_desc, desc))
+            mus = DiagnosisQueries.get_minimum_mus(cmap, prog)
+            if (mus is None) != (min_size is None) or \
+                    ((mus is not None) and not (isinstance(mus, set) and (frozenset(mus) in ground_truth['MUS'])
+                                                and (len(mus) == min_size))):
+                failures.append("get_minimum_mus on a {} map: {} isn't a minimum MUS ({})".format(map_desc, mus, desc))
+        return failures
+
+    @staticmethod
+    def check_change_log(prog: SyntheticLogicProgram, desc: str='', max_change_log: int=8):
+        """
+        Run marco_ambiguous_bit_optimized on a BitConstraintMap whose change log is capped at max_change_log, w/ a
+        view that never catches up.
+        :return: List of failure messages
+        """
+        failures = []
+        cmap = BitConstraintMap(prog.constraints)
+        cmap.max_change_log = max_change_log
+        view_idx = cmap.get_change_index()
+        DiagnosisAlgorithms.marco_ambiguous_bit_optimized(cmap, prog)
+        if len(cmap.change_log) > max_change_log:
+            failures.append("The change log grew to {} entries, past its cap of {} ({})".format(
+                len(cmap.change_log), max_change_log, desc))
+        changes, _ = cmap.get_changes_since(view_idx)
+        if (cmap.change_log_offset > view_idx) and (changes != [('all', None)]):
+            failures.append("A view behind a trimmed change log got {} instead of a full resync ({})".format(
+                changes, desc))
+        return failures
+
+    @staticmethod
+    def check_extremal_records(prog: SyntheticLogicProgram, desc: str='', seed_strategies=(), seed=0):
+        """
+        Run marco_bit_optimized and marco_ambiguous_bit_optimized on a BitConstraintMap w/ every one of the
+        seed_strategies, and check that every result found is in its set of the map, in the change log, and that the
+        statuses that follow from it are recorded (as grow/shrink/grow_ambiguous/shrink_unambiguous record them), seeds
+        taken as they are (SeedStrategy.extremal) included.
+        :return: List of failure messages
+        """
+        # result type --> (nodes that follow from n, status set they must be in)
+        implied = {
+            'MSS': (lambda n, num: PowersetBitLib.get_ancestors(n, num), 'satisfiable_set'),
+            'MUS': (lambda n, num: PowersetBitLib.get_descendants(n, num), 'unsatisfiable_set'),
+            'MAS': (lambda n, num: PowersetBitLib.get_ancestors(n, num), 'ambiguous_set'),
+            'MUAS': (lambda n, num: set(PowersetBitLib.get_ancestors(n, num)).difference({n}), 'ambiguous_set'),
+        }
+        failures = []
+        for strategy in seed_strategies:
+            for func, result_types in [(DiagnosisAlgorithms.marco_bit_optimized, ('MUS', 'MSS')),
+                                       (DiagnosisAlgorithms.marco_ambiguous_bit_optimized, ('MUAS', 'MAS'))]:
+                cmap = BitConstraintMap(prog.constraints)
+                cmap.max_change_log = math.inf
+                results = func(cmap, prog, seed_strategy=SeedStrategies.get_strategy(strategy, seed=seed))
+                for result_type, found in zip(result_types, results):
+                    recorded = getattr(cmap, cmap.EXTREMAL_SETS[result_type])
+                    logged = set([n for kind, n in cmap.change_log if kind == result_type])
+                    get_implied, status_set = implied[result_type]
+                    for r in found:
+                        n = cmap.__constraints_to_int_helper__(r)
+                        if (n not in recorded) or (n not in logged):
+                            failures.append("{} w/ the '{}' seed strategy: {} {} not recorded in the map ({})".format(
+                                func.__name__, strategy, result_type, sorted(r), desc))
+                        elif not getattr(cmap, status_set).issuperset(get_implied(n, cmap.num_constraints)):
+                            failures.append("{} w/ the '{}' seed strategy: {} {} recorded w/o its {} ({})".format(
+                                func.__name__, strategy, result_type, sorted(r), status_set, desc))
+        return failures
+
+    @staticmethod
+    def check_write_dot(prog: SyntheticLogicProgram, desc: str=''):
+        """
+        Write the lattice of a map a marco_ambiguous_bit_optimized run filled in w/ PowersetLatticeWriter.write_dot, and
+        check that every node is written once, in a subgraph w/ the style of its class.
+        :return: List of failure messages
+        """
+        failures = []
+        cmap = BitConstraintMap(prog.constraints)
+        DiagnosisAlgorithms.marco_ambiguous_bit_optimized(cmap, prog)
+        writer = PowersetLatticeWriter(cmap)
+        out = io.StringIO()
+        writer.write_dot(out, to_highlight=('MUS', 'MSS', 'MAS', 'MUAS'))
+        class_attrs = dict([(writer._dot_attrs_(writer.colorscheme[c]), c) for c in writer.NODE_CLASSES])
+        written = Counter()
+        current_class = None
+        for line in out.getvalue().splitlines():
+            line = line.strip()
+            if line.startswith('node ['):
+                current_class = class_attrs.get(line[len('node ['):-len('];')])
+            elif line == '}':
+                current_class = None
+            elif ' [label=' in line:
+                n = int(line.split(' ')[0])
+                written[n] += 1
+                if current_class != writer.get_node_class(n, ('MUS', 'MSS', 'MAS', 'MUAS')):
+                    failures.append("write_dot: node {} styled as {} ({})".format(n, current_class, desc))
+        if written != Counter(range(2 ** cmap.num_constraints)):
+            failures.append("write_dot: nodes not written exactly once ({})".format(desc))
+        return failures
+
+    @staticmethod
+    def check_program(prog: SyntheticLogicProgram, maps: list, variants: list=None, seed=0, seed_strategies=()):
+        """
+        Run every variant with every map on prog.
+        :param seed_strategies: Keys of SeedStrategies.STRATEGIES to also run the variants that take one with
+        :return: List of failure messages (empty if everything agrees)
+        """
+        variants = variants if variants is not None else list(BenchmarkRunner.VARIANTS.keys())
+        ground_truth = prog.get_ground_truth()
+        desc = "n={} MUSes={} cores={} seed={}".format(prog.num_constraints, [sorted(m) for m in prog.mus_es],
+                                                       [sorted(c) for c in prog.unambiguous_cores], seed)
+        failures = []
+        num_queries = {}
+        for variant in variants:
+            for map_name in maps:
+                if variant.endswith('_bit_optimized') and (map_name not in DifferentialHarness.BIT_MAPS):
+                    continue
+                case = DifferentialHarness.run_case(prog, variant, map_name, seed=seed)
+                num_queries[(variant, map_name)] = case['num_queries']
+                for result_type, found in case['results'].items():
+                    if found != ground_truth[result_type]:
+                        failures.append("{} on the '{}' map: wrong {}es, missing {}, extra {} ({})".format(
+                            variant, map_name, result_type,
+                            [sorted(r) for r in ground_truth[result_type] - found],
+                            [sorted(r) for r in found - ground_truth[result_type]], desc))
+                if case['num_duplicate_queries'] > 0:
+                    failures.append("{} on the '{}' map: {} repeated oracle queries ({})".format(
+                        variant, map_name, case['num_duplicate_queries'], desc))
+                if variant not in BenchmarkRunner.STRATEGY_VARIANTS:
+                    continue
+                for strategy in seed_strategies:
+                    case = DifferentialHarness.run_case(prog, variant, map_name, seed=seed, seed_strategy=strategy)
+                    for result_type, found in case['results'].items():
+                        if found != ground_truth[result_type]:
+                            failures.append("{} w/ the '{}' seed strategy on the '{}' map: wrong {}es, missing {}, "
+                                            "extra {} ({})".format(variant, strategy, map_name, result_type,
+                                                                   [sorted(r) for r in ground_truth[result_type] -
+                                                                    found],
+                                                                   [sorted(r) for r in found -
+                                                                    ground_truth[result_type]], desc))
+                    if case['num_duplicate_queries'] > 0:
+                        failures.append("{} w/ the '{}' seed strategy on the '{}' map: {} repeated oracle queries "
+                                        "({})".format(variant, strategy, map_name, case['num_duplicate_queries'], desc))
+
+        if 'bit' in maps:
+            failures.extend(DifferentialHarness.check_queries(prog, desc))
+            failures.extend(DifferentialHarness.check_change_log(prog, desc))
+            failures.extend(DifferentialHarness.check_extremal_records(prog, desc, seed_strategies, seed=seed))
+            failures.extend(DifferentialHarness.check_write_dot(prog, desc))
+
+        for (variant, map_name), count in num_queries.items():
+            plain = (variant[:-len('_bit_optimized')], map_name)
+            if variant.endswith('_bit_optimized') and (plain in num_queries) and (count > num_queries[plain]):
+                failures.append("{} on the '{}' map: {} oracle queries, more than the {} of {} ({})".format(
+                    variant, map_name, count, num_queries[plain], plain[0], desc))
+        return failures
+
+    @staticmethod
+    def run(num_programs=50, min_size=2, max_size=9, maps=None, variants=None, seed=0, log=None,
+            seed_strategies=None):
+        """
+        Check num_programs random SyntheticLogicPrograms, with min_size to max_size constraints.
+        :param maps: Names of the MAPS to use (default: all the available ones)
+        :param variants: Keys of BenchmarkRunner.VARIANTS to run (default: all)
+        :param seed_strategies: Keys of SeedStrategies.STRATEGIES to also run the variants that take one with
+                                (default: all)
+        :param log: (Optional) Function to call with every failure message, as it is found
+        :return: List of failure messages
+        """
+        maps = DifferentialHarness.get_available_maps(maps)
+        seed_strategies = seed_strategies if seed_strategies is not None else list(SeedStrategies.STRATEGIES.keys())
+        rng = random.Random(seed)
+        failures = []
+        for i in range(num_programs):
+            n = rng.randint(min_size, max_size)
+            prog = SyntheticLogicProgram.generate(n, num_mus=rng.randint(0, n), mus_size=(1, max(1, n - 1)),
+                                                  num_unambiguous_cores=rng.randint(0, n), core_size=(0, n),
+                                                  seed=rng.random())
+            for failure in DifferentialHarness.check_program(prog, maps, variants, seed=i,
+                                                             seed_strategies=seed_strategies):
+                failures.append(failure)
+                if log is not None:
+                    log(failure)
+        return failures
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Check that all the algorithm/map combinations agree.")
+    parser.add_argument('--num-programs', type=int, default=50)
+    parser.add_argument('--min-size', type=int, default=2)
+    parser.add_argument('--max-size', type=int, default=9)
+    parser.add_argument('--maps', nargs='+', default=None, choices=sorted(DifferentialHarness.MAPS.keys()))
+    parser.add_argument('--variants', nargs='+', default=None, choices=sorted(BenchmarkRunner.VARIANTS.keys()))
+    parser.add_argument('--seed-strategies', nargs='*', default=None,
+                        choices=sorted(SeedStrategies.STRATEGIES.keys()))
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args(argv)
+
+    failures = DifferentialHarness.run(num_programs=args.num_programs, min_size=args.min_size,
+                                       max_size=args.max_size, maps=args.maps, variants=args.variants,
+                                       seed=args.seed, log=print, seed_strategies=args.seed_strategies)
+    print("{} program(s) checked, {} failure(s).".format(args.num_programs, len(failures)), file=sys.stderr)
+    return 1 if len(failures) > 0 else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,121 @@
+from PWE_Diagnostic_Lattice_Tool.LogicProgram import LogicProgram
+from PWE_Diagnostic_Lattice_Tool.LatticeNode import NodeAmbiguityType, NumPWSType
+import itertools
+import random
+
+
+class SyntheticLogicProgram(LogicProgram):
+    """
+    Pure-Python LogicProgram over the constraints c0 ... c{n-1}, with planted structure:
+        - a subset is UNSAT iff it contains one of the planted MUSes
+        - a SAT subset has a unique solution iff it contains one of the planted unambiguous cores, 2 solutions otherwise
+    Both are monotone, so (the planted MUSes being an antichain) the MUSes are exactly the planted ones, and the MSSes,
+    MUASes and MASes follow from them (see get_ground_truth).
+    """
+
+    def __init__(self, num_constraints: int, mus_es: list, unambiguous_cores: list=()):
+        """
+        :param num_constraints: Number of constraints n
+        :param mus_es: Planted MUSes, as sets of constraint indices (should be an antichain)
+        :param unambiguous_cores: Subsets (of constraint indices) that make a SAT subset unambiguous
+        """
+        LogicProgram.__init__(self)
+        self.num_constraints = num_constraints
+        self.constraints = ['c{}'.format(i) for i in range(num_constraints)]
+        self.mus_es = [frozenset(['c{}'.format(i) for i in mus]) for mus in mus_es]
+        self.unambiguous_cores = [frozenset(['c{}'.format(i) for i in core]) for core in unambiguous_cores]
+
+    @staticmethod
+    def _random_antichain_(rng, num_constraints, num_sets, size_range, max_tries=1000):
+        sets = []
+        for _ in range(max_tries):
+            if len(sets) >= num_sets:
+                break
+            size = rng.randint(min(size_range[0], num_constraints), min(size_range[1], num_constraints))
+            s = frozenset(rng.sample(range(num_constraints), size))
+            if not any(s.issubset(t) or t.issubset(s) for t in sets):
+                sets.append(s)
+        return sets
+
+    @staticmethod
+    def generate(num_constraints: int, num_mus: int=3, mus_size=(2, 4), num_unambiguous_cores: int=2,
+                 core_size=(1, 3), seed=0):
+        """
+        :param num_mus: Number of MUSes to plant (fewer if the lattice is too small for that many)
+        :param mus_size: (min, max) number of constraints per MUS
+        :param num_unambiguous_cores: Number of unambiguous cores to plant
+        :param core_size: (min, max) number of constraints per unambiguous core
+        :param seed: Seed for the generator, the same arguments always give the same program
+        :return: SyntheticLogicProgram
+        """
+        rng = random.Random(seed)
+        mus_es = SyntheticLogicProgram._random_antichain_(rng, num_constraints, num_mus, mus_size)
+        cores = SyntheticLogicProgram._random_antichain_(rng, num_constraints, num_unambiguous_cores, core_size)
+        return SyntheticLogicProgram(num_constraints, mus_es, cores)
+
+    def _num_solutions_(self, constraints):
+        constraints = set(constraints)
+        if any(mus.issubset(constraints) for mus in self.mus_es):
+            return 0
+        if any(core.issubset(constraints) for core in self.unambiguous_cores):
+            return 1
+        return 2
+
+    def get_num_solutions(self, constraints):
+        return self._num_solutions_(constraints)
+
+    def count_solutions(self, constraints, max_count: int=0):
+        num_pws = self._num_solutions_(constraints)
+        if (max_count > 0) and (num_pws > max_count):
+            return max_count, NumPWSType.atleast
+        return num_pws, NumPWSType.exact
+
+    def check_sat(self, constraints):
+        return self._num_solutions_(constraints) >= 1
+
+    def check_ambiguity(self, constraints):
+        return NodeAmbiguityType(self._num_solutions_(constraints))
+
+    def get_ground_truth(self):
+        """
+        Brute force the whole lattice (2^n subsets, only for small n).
+        :return: Dict: 'MUS', 'MSS', 'MUAS', 'MAS' --> set of frozensets of constraints
+        """
+        num_pws = {}
+        for r in range(self.num_constraints + 1):
+            for subset in itertools.combinations(self.constraints, r):
+                num_pws[frozenset(subset)] = self._num_solutions_(subset)
+
+        def minimal(nodes):
+            return set([n for n in nodes if not any((n - set([c])) in nodes for c in n)])
+
+        def maximal(nodes):
+            return set([n for n in nodes if not any((n | set([c])) in nodes for c in self.constraints if c not in n)])
+
+        return {
+            'MUS': minimal(set([n for n, k in num_pws.items() if k == 0])),
+            'MSS': maximal(set([n for n, k in num_pws.items() if k >= 1])),
+            'MUAS': minimal(set([n for n, k in num_pws.items() if k == 1])),
+            'MAS': maximal(set([n for n, k in num_pws.items() if k >= 2])),
+        }
+
+    def to_asp_encoding(self, constraint_keyword='comp'):
+        """
+        :return: An ASP encoding with the same structure (for ASP_LogicProgram, with the same constraints)
+        """
+        lines = ["sol(1) ; sol(2)."]
+        for mus in self.mus_es:
+            lines.append(":- {}.".format(", ".join(["{}({})".format(constraint_keyword, c) for c in sorted(mus)])))
+        for core in self.unambiguous_cores:
+            lines.append("unambiguous :- {}.".format(", ".join(["{}({})".format(constraint_keyword, c)
+                                                                for c in sorted(core)])))
+        lines.append(":- unambiguous, sol(2).")
+        return "\n".join(lines)
+
+    def get_asp_program(self, constraint_keyword='comp'):
+        """
+        :return: ASP_LogicProgram equivalent of this program (needs a reasoner)
+        """
+        from PWE_Diagnostic_Lattice_Tool.ASP_LogicProgram import ASP_LogicProgram
+        return ASP_LogicProgram(self.to_asp_encoding(constraint_keyword), constraint_keyword=constraint_keyword,
+                                constraints=self.constraints)
@@ -15,8 +15,16 @@ setuptools.setup(
     long_description=long_description,
     long_description_content_type="text/markdown",
     url="https://github.com/idaks/PWE-Diagnostic-Lattice-Tool",
-    packages=setuptools.find_packages(),
+    packages=setuptools.find_packages(exclude=['benchmarks', 'benchmarks.*']),
     install_requires=requirements,
+    extras_require={
+        'clingo': ['clingo>=5.4'],
+        'parquet': ['pyarrow'],
+    },
+    entry_points={
+        'console_scripts': ['pwe-diagnose=PWE_Diagnostic_Lattice_Tool.DiagnosisCLI:main',
+                            'pwe-diagnose-service=PWE_Diagnostic_Lattice_Tool.DiagnosisService:main'],
+    },
     classifiers=[
         "Programming Language :: Python :: 3",
         "License :: OSI Approved :: Apache Software License",